@@ -0,0 +1,322 @@
+# api.py
+"""
+Headless HTTP/JSON service over the data layer, for many reporters at once.
+
+    python api.py [--host 127.0.0.1] [--port 8080] [--db ocean.db] [--threads 4]
+
+Routes (JSON in and out; rows use the get_all_reports fields):
+    GET    /reports?limit=&cursor=          newest first; pass back "next_cursor"
+    GET    /reports/search?q=&limit=&offset=
+    GET    /reports/<id>
+    POST   /reports                         {"location", "waste_type", "description",
+                                             "date_reported", "user_id"} -> 201 {"id"}
+    PUT    /reports/<id>                    same fields
+    DELETE /reports/<id>
+    GET    /health                          pool, thread and writer metrics
+    POST   /sync                            a device's outbox batch (see sync.py) -> {"acked"}
+
+Runs on asyncio with HTTP/1.1 keep-alive; reads go to a bounded thread pool.
+Writes go to db.write_queue(), which commits concurrent writes from all
+clients together in one transaction (group commit).
+Run with --outbox only if this server's own writes will be synced onward to
+another database; a central server does not journal them by default.
+OCEANGUARD_PROFILE=1 profiles the data layer and prints the report at exit
+(see profiler.py).
+There is no authentication: keep the default localhost bind or put it
+behind a proxy that does it.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+
+import db
+import profiler
+import sync
+import utils
+
+HOST = "127.0.0.1"
+PORT = 8080
+DB_THREADS = db.POOL_SIZE   # more threads than pooled connections would only wait on the pool
+MAX_BODY = 64 * 1024
+SYNC_MAX_BODY = 8 * 1024 * 1024  # a compressed outbox batch; sync.py halves its batches when refused
+MAX_HEADERS = 100
+LIST_LIMIT_MAX = 1000
+ROW_FIELDS = ("id", "location", "waste_type", "description", "date_reported", "username")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+def _row(row):
+    return dict(zip(ROW_FIELDS, row))
+
+
+def _encode_cursor(cursor):
+    if cursor is None:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode()
+
+
+def _decode_cursor(text):
+    if not text:
+        return None
+    try:
+        created_at, report_id = json.loads(base64.urlsafe_b64decode(text.encode()))
+        return created_at, int(report_id)
+    except (ValueError, TypeError):
+        raise HTTPError(400, "bad cursor")
+
+
+def _int_arg(query, name, default, low=0, high=None):
+    try:
+        value = int(query.get(name, [default])[0])
+    except ValueError:
+        raise HTTPError(400, f"{name} must be an integer")
+    if value < low or (high is not None and value > high):
+        raise HTTPError(400, f"{name} out of range")
+    return value
+
+
+def _report_fields(body):
+    """Validated (location, waste_type, description, date_reported, user_id) from a request body."""
+    if not isinstance(body, dict):
+        raise HTTPError(400, "expected a JSON object")
+    location = str(body.get("location") or "").strip()
+    waste_type = str(body.get("waste_type") or "").strip()
+    description = body.get("description")
+    date_reported = str(body.get("date_reported") or "").strip()
+    user_id = body.get("user_id")
+    if not utils.validate(location, waste_type, date_reported):
+        raise HTTPError(400, "location and waste_type are required; date_reported must be MM/DD/YYYY")
+    if user_id is not None and not isinstance(user_id, int):
+        raise HTTPError(400, "user_id must be an integer")
+    return location, waste_type, description, date_reported or None, user_id
+
+
+class ReportAPI:
+    """The service: connection handling, routing, the DB thread pool and the insert writer."""
+
+    def __init__(self, threads=DB_THREADS):
+        self.threads = threads
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="api-db")
+        self._server = None
+        self.metrics = {"requests": 0, "errors": 0}
+
+    async def start(self, host=HOST, port=PORT):
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._pool.shutdown(wait=True)
+
+    def _run(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    @staticmethod
+    def _write(queue_fn, *args):
+        # the Future resolves on the db writer thread once its group commits
+        return asyncio.wrap_future(queue_fn(*args))
+
+    # ---- HTTP ----
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await _read_request(reader)
+                except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                    break  # peer closed, or a line longer than the stream limit
+                except HTTPError as e:
+                    writer.write(_response(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = await self.dispatch(method, target, body)
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, body):
+        """Route one request; returns (status, JSON-able payload)."""
+        self.metrics["requests"] += 1
+        try:
+            url = urlsplit(target)
+            parts = [p for p in url.path.split("/") if p]
+            if parts == ["sync"]:
+                # the body is a compressed batch, not JSON
+                return await self._sync(method, body)
+            query = parse_qs(url.query)
+            data = None
+            if body:
+                try:
+                    data = json.loads(body)
+                except ValueError:
+                    raise HTTPError(400, "body is not valid JSON")
+            return await self._route(method, parts, query, data)
+        except HTTPError as e:
+            self.metrics["errors"] += 1
+            return e.status, {"error": str(e)}
+        except sqlite3.Error as e:
+            self.metrics["errors"] += 1
+            return 503 if isinstance(e, sqlite3.OperationalError) else 500, {"error": str(e)}
+
+    async def _sync(self, method, body):
+        if method != "POST":
+            raise HTTPError(405)
+        try:
+            device_id, entries = sync.unpack_batch(body)
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        try:
+            acked = await self._write(db.queue_apply_outbox, device_id, entries)
+        except (ValueError, KeyError, TypeError) as e:
+            # a malformed entry: nothing of the batch was applied
+            raise HTTPError(400, f"bad outbox entry: {e!r}")
+        return 200, {"acked": acked}
+
+    async def _route(self, method, parts, query, data):
+        if parts == ["health"] and method == "GET":
+            return 200, {"pool": db.pool_stats(), "threads": self.threads,
+                         "write_queue": db.write_queue_stats(), **self.metrics}
+        if not parts or parts[0] != "reports" or len(parts) > 2:
+            raise HTTPError(404)
+
+        if len(parts) == 1:
+            if method == "GET":
+                limit = _int_arg(query, "limit", db.PAGE_SIZE, 1, LIST_LIMIT_MAX)
+                cursor = _decode_cursor(query.get("cursor", [""])[0])
+                rows, next_cursor = await self._run(db.get_reports_page, cursor, limit)
+                return 200, {"reports": [_row(r) for r in rows], "next_cursor": _encode_cursor(next_cursor)}
+            if method == "POST":
+                report_id = await self._write(db.queue_add_report, *_report_fields(data))
+                return 201, {"id": report_id}
+            raise HTTPError(405)
+
+        if parts[1] == "search":
+            if method != "GET":
+                raise HTTPError(405)
+            limit = _int_arg(query, "limit", db.SEARCH_LIMIT, 1, LIST_LIMIT_MAX)
+            offset = _int_arg(query, "offset", 0)
+            rows = await self._run(db.search_reports, query.get("q", [""])[0], limit, offset)
+            return 200, {"reports": [_row(r) for r in rows]}
+
+        try:
+            report_id = int(parts[1])
+        except ValueError:
+            raise HTTPError(404)
+        if method == "GET":
+            row = await self._run(db.get_report, report_id)
+            if row is None:
+                raise HTTPError(404, "no such report")
+            return 200, _row(row)
+        if method == "PUT":
+            location, waste_type, description, date_reported, _ = _report_fields(data)
+            changed = await self._write(db.queue_update_report, report_id, location, waste_type,
+                                        description, date_reported)
+            if not changed:
+                raise HTTPError(404, "no such report")
+            return 200, {"id": report_id}
+        if method == "DELETE":
+            if not await self._write(db.queue_delete_report, report_id):
+                raise HTTPError(404, "no such report")
+            return 200, {"id": report_id}
+        raise HTTPError(405)
+
+
+async def _read_request(reader):
+    """(method, target, headers, body) for the next request, or None at end of stream."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if len(headers) >= MAX_HEADERS:
+            raise HTTPError(431)
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HTTPError(411)
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(400, "bad Content-Length")
+    limit = SYNC_MAX_BODY if urlsplit(target).path.strip("/") == "sync" else MAX_BODY
+    if length < 0 or length > limit:
+        raise HTTPError(413)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve(host=HOST, port=PORT, threads=DB_THREADS):
+    api = ReportAPI(threads)
+    server = await api.start(host, port)
+    addr = server.sockets[0].getsockname()
+    print(f"serving {db.DB_FILE} on http://{addr[0]}:{addr[1]}", flush=True)
+    try:
+        await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await api.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db", default=db.DB_FILE, help="database file (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=DB_THREADS, help="DB worker threads")
+    parser.add_argument("--batch-max", type=int, default=db.GROUP_COMMIT_MAX, help="most writes per group commit")
+    parser.add_argument("--outbox", action="store_true", help="journal this server's writes for sync.py")
+    args = parser.parse_args(argv)
+
+    db.DB_FILE = args.db
+    db.GROUP_COMMIT_MAX = args.batch_max
+    db.OUTBOX_ENABLED = args.outbox
+    if args.threads > db.POOL_SIZE:
+        db.POOL_SIZE = args.threads
+    profiler.enable_from_env()
+    db.initialize()
+    try:
+        asyncio.run(serve(args.host, args.port, args.threads))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
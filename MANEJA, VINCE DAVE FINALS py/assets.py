@@ -0,0 +1,57 @@
+# assets.py
+"""
+Disk cache for pre-scaled images.
+Resizing bg.png with LANCZOS on every launch is slow, so the scaled copy is
+written once as a PPM (which tk.PhotoImage reads natively, without PIL) and
+reused while the source file and target size stay the same.
+"""
+import os
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def _cache_path(source, size):
+    stat = os.stat(source)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    width, height = size
+    # source mtime and byte size in the key: editing bg.png invalidates the copy
+    return os.path.join(CACHE_DIR, f"{stem}_{width}x{height}_{stat.st_mtime_ns}_{stat.st_size}.ppm")
+
+
+def scaled_image(source, size):
+    """
+    Path of a cached copy of `source` resized to `size` (width, height),
+    creating it if missing. Only a cache miss imports PIL. Safe to call from
+    a worker thread; raises OSError/ImportError if the image can't be produced.
+    """
+    path = _cache_path(source, size)
+    if os.path.exists(path):
+        return path
+
+    from PIL import Image
+
+    with Image.open(source) as img:
+        scaled = img.convert("RGB").resize(size, Image.LANCZOS)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    scaled.save(tmp, format="PPM")
+    os.replace(tmp, path)
+
+    # drop copies made for an older version of the source or another size
+    stem = os.path.splitext(os.path.basename(source))[0] + "_"
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith(stem) and name.endswith(".ppm") and os.path.join(CACHE_DIR, name) != path:
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except OSError:
+                pass
+    return path
+
+
+def clear():
+    """Remove every cached image (the next scaled_image call is a cold miss)."""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    for name in os.listdir(CACHE_DIR):
+        if name.endswith(".ppm"):
+            os.remove(os.path.join(CACHE_DIR, name))
@@ -0,0 +1,167 @@
+# bench_api.py
+"""
+Load test for api.py.
+Starts a local api.py on a throwaway database seeded with synthetic reports
+(or targets a running instance with --url), then runs --clients concurrent
+keep-alive clients for --seconds, each repeatedly sending a request chosen
+from the --mix weights. Reports requests/second and p50/p99 latency per kind.
+
+    python bench_api.py [--clients 50] [--seconds 10] [--seed 5000]
+                        [--mix get=40,list=30,search=10,add=20] [--json]
+    python bench_api.py --url http://127.0.0.1:8080
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORDS = ["Beach", "Cove", "Reef", "Bay", "Pier", "Harbor"]
+TYPES = ["Plastic", "Glass", "Net", "Metal", "Rubber"]
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("get", "list", "search", "add"):
+            raise argparse.ArgumentTypeError(f"unknown request kind: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def _seed(path, count):
+    sys.path.insert(0, HERE)
+    import db
+    db.DB_FILE = path
+    db.initialize()
+    reports = ((f"{WORDS[i % len(WORDS)]} {i % 300}", TYPES[i % len(TYPES)], "seeded report",
+                f"{1 + i % 12:02d}/{1 + i % 28:02d}/2025") for i in range(count))
+    db.bulk_add_reports(reports)
+    db.close_pool()
+
+
+def _start_server(db_path):
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, "api.py"), "--db", db_path, "--port", "0"],
+                            cwd=HERE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = proc.stdout.readline()
+    match = re.search(r"http://([\d.]+):(\d+)", line)
+    if not match:
+        proc.kill()
+        raise RuntimeError(f"api.py did not start: {line.strip() or proc.stderr.read().strip()}")
+    return proc, match.group(1), int(match.group(2))
+
+
+def _request(kind, max_id):
+    if kind == "get":
+        return "GET", f"/reports/{random.randint(1, max_id)}", None
+    if kind == "list":
+        return "GET", "/reports?limit=50", None
+    if kind == "search":
+        return "GET", f"/reports/search?q={random.choice(WORDS).lower()}&limit=20", None
+    body = {"location": f"{random.choice(WORDS)} {random.randint(1, 300)}", "waste_type": random.choice(TYPES),
+            "description": "load test", "date_reported": "06/15/2025"}
+    return "POST", "/reports", json.dumps(body).encode()
+
+
+async def _client(host, port, mix, deadline, max_id, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    kinds, weights = list(mix), list(mix.values())
+    try:
+        while time.perf_counter() < deadline:
+            kind = random.choices(kinds, weights)[0]
+            method, path, body = _request(kind, max_id)
+            head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if body:
+                head += f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+            start = time.perf_counter()
+            writer.write(head.encode() + b"\r\n" + (body or b""))
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":")[1])
+            await reader.readexactly(length)
+            elapsed = time.perf_counter() - start
+            ok = status < 400 or (kind == "get" and status == 404)  # ids may have been deleted
+            results.setdefault(kind, {"latencies": [], "errors": 0})
+            results[kind]["latencies"].append(elapsed)
+            results[kind]["errors"] += 0 if ok else 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients, seconds, mix, max_id):
+    results = {}
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(_client(host, port, mix, deadline, max_id, results) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    summary = {}
+    for kind, r in results.items():
+        lat = r["latencies"]
+        summary[kind] = {"requests": len(lat), "errors": r["errors"], "rps": len(lat) / elapsed,
+                         "p50_ms": _percentile(lat, 50) * 1000, "p99_ms": _percentile(lat, 99) * 1000}
+    every = [x for r in results.values() for x in r["latencies"]]
+    summary["total"] = {"requests": len(every), "errors": sum(r["errors"] for r in results.values()),
+                        "rps": len(every) / elapsed, "p50_ms": _percentile(every, 50) * 1000 if every else None,
+                        "p99_ms": _percentile(every, 99) * 1000 if every else None}
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running api.py instead of starting one")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=5000, help="synthetic reports in the throwaway DB")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("get=40,list=30,search=10,add=20"))
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    proc = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            url = urlsplit(args.url)
+            host, port, max_id = url.hostname, url.port or 80, max(args.seed, 1)
+        else:
+            db_path = os.path.join(tmp, "load.db")
+            _seed(db_path, args.seed)
+            proc, host, port = _start_server(db_path)
+            max_id = max(args.seed, 1)
+        try:
+            summary = asyncio.run(run_load(host, port, args.clients, args.seconds, args.mix, max_id))
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"{'kind':8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50':>9} {'p99':>9}")
+        for kind, r in summary.items():
+            p50 = f"{r['p50_ms']:7.1f}ms" if r["p50_ms"] is not None else "-"
+            p99 = f"{r['p99_ms']:7.1f}ms" if r["p99_ms"] is not None else "-"
+            print(f"{kind:8} {r['requests']:9} {r['errors']:7} {r['rps']:9.1f} {p50:>9} {p99:>9}")
+    return 1 if summary["total"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+# bench_db.py
+"""
+Data-layer benchmark suite.
+For each size it builds a synthetic database (reports spread over 200 users,
+with the full schema: indexes, search index, rollups, change log), then
+measures:
+- initialize() on a current database, and on a legacy one (reports with a
+  `date` column) that needs the full migration
+- add_report throughput, one thread and 8 threads (group commit)
+- get_report point lookups (p50/p99), get_reports_page first page
+- get_all_reports latency and peak Python memory
+- update_report and delete_report throughput
+- login_user latency (dominated by the configured password hash cost)
+
+    python bench_db.py [--sizes 10000,100000,1000000] [--out results.json]
+    python bench_db.py --compare baseline.json [--threshold 0.25] [--min-delta-ms 1] [--repeat 3]
+
+Results are JSON (--out file, or --json to stdout). With --compare, every
+metric that got worse than the baseline by more than --threshold is listed
+and the exit code is 1; timings that moved by less than --min-delta-ms (and
+memory by less than MIN_DELTA_MB) are noise and never count. Metric names
+end in _per_sec (higher is better) or _ms / _s / _mb (lower is better). Databases live in a temp dir unless --keep.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import db
+
+USERS = 200
+LOCATIONS = ["Beach", "Cove", "Reef", "Bay", "Pier", "Harbor", "Lagoon", "Shoal"]
+WASTE_TYPES = ["Plastic", "Glass", "Net", "Metal", "Rubber", "Styrofoam"]
+OPS = 2000  # operations per throughput / lookup benchmark
+
+
+def _synthetic(n, seed=42):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield (f"{rng.choice(LOCATIONS)} {rng.randint(1, 400)}", rng.choice(WASTE_TYPES),
+               f"synthetic report {i} near the {rng.choice(['north', 'south', 'east', 'west'])} shore",
+               f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2019, 2025)}",
+               rng.randint(1, USERS))
+
+
+def build(path, n):
+    """Create a current-schema database with n reports; returns seconds taken."""
+    start = time.perf_counter()
+    db.DB_FILE = path
+    db.initialize()
+    with db.get_connection() as conn:
+        # cheap stored hashes: the login benchmark registers its own user
+        conn.executemany("INSERT INTO users(username, password) VALUES (?, ?)",
+                         [(f"user{i}", "x") for i in range(1, USERS + 1)])
+    db.bulk_add_reports(_synthetic(n))
+    db.close_pool()
+    return time.perf_counter() - start
+
+
+def build_legacy(path, n):
+    """The oldest schema: reports.date NOT NULL and no date_reported/created_at."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE NOT NULL, "
+                 "password TEXT NOT NULL)")
+    conn.execute("CREATE TABLE reports (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, "
+                 "location TEXT NOT NULL, waste_type TEXT NOT NULL, description TEXT, date TEXT NOT NULL)")
+    conn.executemany("INSERT INTO reports (location, waste_type, description, date, user_id) VALUES (?, ?, ?, ?, ?)",
+                     _synthetic(n))
+    conn.commit()
+    conn.close()
+
+
+def _use(path):
+    db.close_pool()
+    db.invalidate_schema()
+    db.DB_FILE = path
+
+
+def _percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def bench_initialize(path, legacy_path):
+    _use(path)
+    start = time.perf_counter()
+    db.initialize()
+    current = time.perf_counter() - start
+    _use(legacy_path)
+    start = time.perf_counter()
+    db.initialize()
+    migrate = time.perf_counter() - start
+    return {"initialize_current_s": current, "initialize_migrate_s": migrate}
+
+
+def bench_add(path):
+    _use(path)
+    start = time.perf_counter()
+    for report in _synthetic(OPS, seed=1):
+        db.add_report(*report)
+    single = OPS / (time.perf_counter() - start)
+
+    threads, per_thread = 8, OPS // 8
+
+    def writer(seed):
+        for report in _synthetic(per_thread, seed=seed):
+            db.add_report(*report)
+
+    workers = [threading.Thread(target=writer, args=(seed,)) for seed in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    concurrent = threads * per_thread / (time.perf_counter() - start)
+    return {"add_report_per_sec": single, "add_report_8_threads_per_sec": concurrent}
+
+
+def bench_reads(path, n):
+    _use(path)
+    rng = random.Random(7)
+    lookups = []
+    for _ in range(OPS):
+        report_id = rng.randint(1, n)
+        start = time.perf_counter()
+        db.get_report(report_id)
+        lookups.append(time.perf_counter() - start)
+
+    pages = []
+    for _ in range(20):
+        start = time.perf_counter()
+        db.get_reports_page(None, db.PAGE_SIZE)
+        pages.append(time.perf_counter() - start)
+
+    runs = []
+    for _ in range(3):
+        start = time.perf_counter()
+        rows = db.get_all_reports()
+        runs.append(time.perf_counter() - start)
+        del rows
+    tracemalloc.start()
+    rows = db.get_all_reports()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+
+    return {
+        "get_report_p50_ms": _percentile(lookups, 50) * 1000,
+        "get_report_p99_ms": _percentile(lookups, 99) * 1000,
+        "get_reports_page_ms": statistics.median(pages) * 1000,
+        "get_all_reports_ms": min(runs) * 1000,
+        "get_all_reports_peak_mb": peak / 1e6,
+    }
+
+
+def bench_update_delete(path, n):
+    _use(path)
+    rng = random.Random(11)
+    ids = rng.sample(range(1, n + 1), min(OPS, n))
+    start = time.perf_counter()
+    for report_id in ids:
+        db.update_report(report_id, "Updated Beach", "Plastic", "updated", "06/15/2025")
+    updates = len(ids) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for report_id in ids:
+        db.delete_report(report_id)
+    deletes = len(ids) / (time.perf_counter() - start)
+    return {"update_report_per_sec": updates, "delete_report_per_sec": deletes}
+
+
+def bench_login(path):
+    _use(path)
+    db.register_user("bench", "correct horse")
+    times = []
+    for _ in range(10):
+        start = time.perf_counter()
+        db.login_user("bench", "correct horse")
+        times.append(time.perf_counter() - start)
+    return {"login_user_ms": statistics.median(times) * 1000}
+
+
+def _better(name, a, b):
+    return max(a, b) if name.endswith("_per_sec") else min(a, b)
+
+
+def run_size(workdir, n, repeat=1):
+    template = os.path.join(workdir, f"reports_{n}.db")
+    legacy = os.path.join(workdir, f"legacy_{n}.db")
+    results = {"build_s": build(template, n)}
+    build_legacy(legacy, n)
+
+    def fresh(name):
+        # each mutating benchmark gets its own copy of the template
+        path = os.path.join(workdir, f"{name}_{n}.db")
+        shutil.copy(template, path)
+        return path
+
+    for run in range(repeat):
+        if run:
+            os.remove(legacy)
+            build_legacy(legacy, n)
+        metrics = {}
+        metrics.update(bench_initialize(fresh("init"), legacy))
+        metrics.update(bench_reads(template, n))
+        metrics.update(bench_add(fresh("add")))
+        metrics.update(bench_update_delete(fresh("update"), n))
+        metrics.update(bench_login(fresh("login")))
+        for name, value in metrics.items():
+            # keep each metric's best run: single runs on a busy machine are noisy
+            results[name] = _better(name, results[name], value) if name in results else value
+    db.close_pool()
+    return results
+
+
+MIN_DELTA_MB = 1.0  # memory differences below this are allocator noise
+
+def _below_floor(name, before, now, min_delta_ms):
+    """True when an absolute change is too small to mean anything, whatever its percentage."""
+    delta = abs(now - before)
+    if name.endswith("_ms"):
+        return delta < min_delta_ms
+    if name.endswith("_s"):
+        return delta * 1000 < min_delta_ms
+    if name.endswith("_mb"):
+        return delta < MIN_DELTA_MB
+    return False
+
+
+def compare(results, baseline, threshold, min_delta_ms=1.0):
+    """
+    List of (size, metric, baseline, now, change) for metrics worse by more
+    than threshold and, for timings and memory, by more than an absolute floor.
+    """
+    regressions = []
+    for size, metrics in results.items():
+        for name, now in metrics.items():
+            before = baseline.get(size, {}).get(name)
+            if not before or name == "build_s":
+                continue
+            if _below_floor(name, before, now, min_delta_ms):
+                continue
+            higher_is_better = name.endswith("_per_sec")
+            change = (now - before) / before
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append((size, name, before, now, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated report counts (default: %(default)s)")
+    parser.add_argument("--out", help="write results JSON to this file")
+    parser.add_argument("--json", action="store_true", help="print results JSON")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per size; the best value of each metric is kept")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown fraction (default: %(default)s)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore timing changes smaller than this many ms (default: %(default)s)")
+    parser.add_argument("--keep", help="build databases in this directory and keep them")
+    args = parser.parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="bench_db_")
+    os.makedirs(workdir, exist_ok=True)
+    results = {}
+    try:
+        for n in sizes:
+            print(f"benchmarking {n} reports...", file=sys.stderr)
+            results[str(n)] = run_size(workdir, n, args.repeat)
+    finally:
+        db.close_pool()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                 "platform": platform.platform(), "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                 "password_scheme": db.PASSWORD_SCHEME},
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        names = list(next(iter(results.values())))
+        print(f"{'metric':30}" + "".join(f"{size:>14}" for size in results))
+        for name in names:
+            print(f"{name:30}" + "".join(f"{results[size][name]:14.2f}" for size in results))
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)["results"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for size, name, before, now, change in regressions:
+            print(f"REGRESSION {size:>8} {name}: {before:.2f} -> {now:.2f} ({change:+.0%})")
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.threshold:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
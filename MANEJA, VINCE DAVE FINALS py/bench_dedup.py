@@ -0,0 +1,181 @@
+# bench_dedup.py
+"""
+Near-duplicate detection benchmark.
+Generates synthetic cleanup events (a pile of debris at a beach on a day)
+and files each one from 1-4 volunteers who word it differently: location
+casing/punctuation/word order, plural waste types, reordered, dropped,
+misspelled and extra words. Some different events share beach, day and waste
+type (hard negatives). The reports go through bulk_add_reports in "flag"
+mode, then the flags are scored against the known events:
+- precision: flagged reports whose duplicate_of really is the same event
+- recall: later filings of an event that were flagged
+Also reports import throughput with dedup "off" vs "flag", the average
+number of candidates compared per row (the block size) and, for contrast,
+the per-row cost of comparing against every stored report.
+
+    python bench_dedup.py [--events 60000] [--threshold 0.5] [--json]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import db
+import dedup
+
+BEACHES = [f"{name} {i}" for name in ("Beach", "Cove", "Bay", "Reef", "Pier") for i in range(60)]
+WASTE_TYPES = ["Plastic", "Glass", "Net", "Metal", "Rubber", "Styrofoam"]
+QUANTITIES = ["a few", "dozens of", "a pile of", "hundreds of", "several", "a bag of", "lots of"]
+ADJECTIVES = ["crushed", "broken", "faded", "tangled", "rusty", "torn", "small", "large", "old"]
+ITEMS = ["bottles", "cans", "wrappers", "fishing nets", "bags", "cups", "ropes", "buoys", "tyres", "straws"]
+PLACES = ["near the rocks", "by the north jetty", "under the pier", "along the tide line",
+          "behind the dunes", "at the river mouth", "next to the lifeguard tower", "in the mangroves"]
+FILLER = ["i saw", "approx", "please check", "spotted", "today", "again"]
+
+
+def _event(rng, beach, day, waste):
+    text = f"{rng.choice(QUANTITIES)} {rng.choice(ADJECTIVES)} {rng.choice(ITEMS)} {rng.choice(PLACES)}"
+    return beach, waste, text, day
+
+
+def _typo(rng, word):
+    if len(word) < 4:
+        return word
+    i = rng.randrange(len(word) - 1)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def _variant(rng, event):
+    """How another volunteer might file the same event."""
+    beach, waste, text, day = event
+    name, number = beach.split()
+    location = rng.choice([beach, beach.lower(), f"{number} {name}", f"{name}, {number}", f"the {beach}"])
+    plural = waste + ("es" if waste.endswith("s") else "s")
+    waste = rng.choice([waste, waste.lower(), plural, waste.upper()])
+    words = text.split()
+    roll = rng.random()
+    if roll < 0.25 and len(words) > 4:
+        del words[rng.randrange(len(words))]
+    elif roll < 0.5:
+        i = rng.randrange(len(words))
+        words[i] = _typo(rng, words[i])
+    elif roll < 0.7:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(FILLER))
+    elif roll < 0.85:
+        rng.shuffle(words)
+    month, dom, year = day.split("/")
+    day = rng.choice([day, f"{int(month)}/{int(dom)}/{year}"])
+    return location, waste, " ".join(words).capitalize(), day
+
+
+def make_reports(events, seed=13):
+    """[(report fields, event number, is a later filing of the event)] in filing order."""
+    rng = random.Random(seed)
+    made = []
+    for _ in range(events):
+        if made and rng.random() < 0.15:
+            # hard negative: a different pile at the same beach, day and waste type
+            beach, waste, _, day = made[rng.randrange(len(made))]
+            made.append(_event(rng, beach, day, waste))
+        else:
+            day = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/2025"
+            made.append(_event(rng, rng.choice(BEACHES), day, rng.choice(WASTE_TYPES)))
+    filings = []
+    for number, event in enumerate(made):
+        filings.append((number, event))
+        for _ in range(rng.choice([0, 0, 0, 1, 1, 2, 3])):
+            filings.append((number, _variant(rng, event)))
+    # later filings arrive later, but interleaved with other events
+    rng.shuffle(filings)
+    first_seen, ordered = set(), []
+    for number, fields in filings:
+        ordered.append((fields, number, number in first_seen))
+        first_seen.add(number)
+    return ordered
+
+
+def _import(path, reports, mode):
+    db.close_pool()
+    db.invalidate_schema()
+    db.DB_FILE = path
+    db.DEDUP_MODE = mode
+    db.initialize()
+    start = time.perf_counter()
+    inserted, rejects = db.bulk_add_reports(fields for fields, _, _ in reports)
+    elapsed = time.perf_counter() - start
+    if rejects:
+        raise RuntimeError(f"unexpected rejects: {rejects[:3]}")
+    return inserted / elapsed
+
+
+def score(reports):
+    """Precision/recall of the flags in DB_FILE; report ids follow import order."""
+    event_of = {report_id: number for report_id, (_, number, _) in enumerate(reports, start=1)}
+    flags = db.get_duplicates(limit=-1)
+    correct = sum(event_of[report_id] == event_of[original] for report_id, original, _ in flags)
+    true_duplicates = sum(repeat for _, _, repeat in reports)
+    return {"flagged": len(flags), "true_duplicates": true_duplicates, "correct": correct,
+            "precision": correct / len(flags) if flags else 1.0,
+            "recall": correct / true_duplicates if true_duplicates else 1.0}
+
+
+def _block_sizes():
+    with db.get_connection() as conn:
+        avg = conn.execute("SELECT AVG(n) FROM (SELECT COUNT(*) AS n FROM report_signatures "
+                           "GROUP BY block_key, waste_key)").fetchone()[0]
+        signatures = [dedup.unpack(blob) for (blob,) in conn.execute("SELECT signature FROM report_signatures")]
+    return avg, signatures
+
+
+def naive_ms_per_row(signatures, reports, sample=20):
+    """Per-row cost of comparing a new report against every stored report, without blocking."""
+    start = time.perf_counter()
+    for fields, _, _ in reports[:sample]:
+        sketch = dedup.sketch(fields[2])
+        for other in signatures:
+            dedup.similarity(sketch, other)
+    return (time.perf_counter() - start) / sample * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=60000)
+    parser.add_argument("--threshold", type=float, default=dedup.THRESHOLD, help="similarity threshold to test")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+    dedup.THRESHOLD = args.threshold
+
+    reports = make_reports(args.events)
+    workdir = tempfile.mkdtemp(prefix="bench_dedup_")
+    try:
+        off_rate = _import(os.path.join(workdir, "off.db"), reports, "off")
+        flag_rate = _import(os.path.join(workdir, "flag.db"), reports, "flag")
+        results = {"reports": len(reports), "threshold": args.threshold, **score(reports),
+                   "import_off_per_sec": off_rate, "import_flag_per_sec": flag_rate}
+        avg_block, signatures = _block_sizes()
+        results["avg_candidates"] = avg_block
+        results["naive_ms_per_row"] = naive_ms_per_row(signatures, reports)
+        results["flag_ms_per_row"] = 1000 / flag_rate
+    finally:
+        db.close_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['reports']} reports, {results['true_duplicates']} later filings of an event, "
+              f"threshold {args.threshold}")
+        print(f"flagged {results['flagged']}, correct {results['correct']}: "
+              f"precision {results['precision']:.3f}, recall {results['recall']:.3f}")
+        print(f"import: {off_rate:.0f} rows/s with dedup off, {flag_rate:.0f} rows/s flagging")
+        print(f"candidates compared per row: {avg_block:.2f} (blocked) vs {len(signatures)} (naive, "
+              f"{results['naive_ms_per_row']:.1f} ms/row)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
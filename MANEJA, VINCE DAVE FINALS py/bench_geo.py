@@ -0,0 +1,157 @@
+# bench_geo.py
+"""
+Spatial query benchmark: reports_geo R*Tree vs a naive full scan.
+Builds a database of synthetic geotagged reports (most clustered around
+coastal hotspots, the rest spread over the globe), then times, per query:
+- bbox:      get_reports_in_bbox on a ~0.2 degree box
+- radius_5:  get_reports_within 5 km
+- radius_50: get_reports_within 50 km
+- nearest:   nearest_reports(n=10)
+The scan side runs the same functions with db.GEO_AVAILABLE cleared (the
+fallback used when SQLite lacks rtree); nearest is scanned by computing the
+distance to every point. Both sides must return the same reports.
+
+    python bench_geo.py [--points 1000000] [--queries 30] [--keep geo.db] [--json]
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import db
+
+HOTSPOTS = 60
+
+
+def _hotspots(seed=21):
+    rng = random.Random(seed)
+    return [(rng.uniform(-60, 60), rng.uniform(-180, 180)) for _ in range(HOTSPOTS)]
+
+
+def _points(n, seed=22):
+    rng = random.Random(seed)
+    hotspots = _hotspots()
+    for i in range(n):
+        if rng.random() < 0.7:
+            lat, lon = rng.choice(hotspots)
+            lat, lon = lat + rng.gauss(0, 0.5), lon + rng.gauss(0, 0.5)
+        else:
+            lat, lon = rng.uniform(-80, 80), rng.uniform(-180, 180)
+        lon = (lon + 180) % 360 - 180
+        yield ("Beach", "Plastic", f"geo report {i}", "06/15/2025", None, lat, lon)
+
+
+def build(path, n):
+    db.DB_FILE = path
+    db.initialize()
+    start = time.perf_counter()
+    db.bulk_add_reports(_points(n))
+    return time.perf_counter() - start
+
+
+def _centers(count, seed=5):
+    rng = random.Random(seed)
+    hotspots = _hotspots()
+    centers = []
+    for i in range(count):
+        # half near hotspots (dense), half anywhere (mostly sparse)
+        if i % 2 == 0:
+            lat, lon = rng.choice(hotspots)
+            centers.append((lat + rng.gauss(0, 0.3), (lon + rng.gauss(0, 0.3) + 180) % 360 - 180))
+        else:
+            centers.append((rng.uniform(-80, 80), rng.uniform(-180, 180)))
+    return centers
+
+
+def _nearest_scan(latitude, longitude, n):
+    with db.get_connection() as conn:
+        points = conn.execute("SELECT id, latitude, longitude FROM reports WHERE latitude IS NOT NULL")
+        best = heapq.nsmallest(n, ((db._haversine_km(latitude, longitude, lat, lon), report_id)
+                                   for report_id, lat, lon in points))
+    return [report_id for _, report_id in best]
+
+
+def _queries():
+    return {
+        "bbox": lambda lat, lon: sorted(r[0] for r in db.get_reports_in_bbox(lat - 0.1, lon - 0.1, lat + 0.1, lon + 0.1)),
+        "radius_5": lambda lat, lon: sorted(r[0] for r in db.get_reports_within(lat, lon, 5)),
+        "radius_50": lambda lat, lon: sorted(r[0] for r in db.get_reports_within(lat, lon, 50)),
+        "nearest": lambda lat, lon: [r[0] for r in db.nearest_reports(lat, lon, 10)],
+    }
+
+
+def _time(fn, centers):
+    times, results = [], []
+    for lat, lon in centers:
+        start = time.perf_counter()
+        results.append(fn(lat, lon))
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, results
+
+
+def run(centers, scan_queries):
+    results = {}
+    for name, fn in _queries().items():
+        db.GEO_AVAILABLE = True
+        index_ms, index_results = _time(fn, centers)
+        subset = centers[:scan_queries]
+        if name == "nearest":
+            scan_ms, scan_results = _time(lambda lat, lon: _nearest_scan(lat, lon, 10), subset)
+        else:
+            db.GEO_AVAILABLE = False
+            scan_ms, scan_results = _time(fn, subset)
+            db.GEO_AVAILABLE = True
+        mismatches = sum(a != b for a, b in zip(index_results, scan_results))
+        results[name] = {"index_ms": index_ms, "scan_ms": scan_ms, "speedup": scan_ms / index_ms,
+                         "avg_hits": statistics.mean(len(r) for r in index_results), "mismatches": mismatches}
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=30, help="query centers timed with the index")
+    parser.add_argument("--scan-queries", type=int, default=5, help="of those, how many are also timed as scans")
+    parser.add_argument("--keep", help="database file to build once and reuse on later runs")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    workdir = None
+    if args.keep:
+        path = args.keep
+    else:
+        workdir = tempfile.mkdtemp(prefix="bench_geo_")
+        path = os.path.join(workdir, "geo.db")
+    try:
+        build_s = None
+        if not os.path.exists(path):
+            print(f"building {args.points} geotagged reports...", file=sys.stderr)
+            build_s = build(path, args.points)
+        else:
+            db.DB_FILE = path
+            db.initialize()
+        results = {"points": args.points, "build_s": build_s,
+                   "queries": run(_centers(args.queries), args.scan_queries)}
+    finally:
+        db.close_pool()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'query':10} {'index':>10} {'scan':>10} {'speedup':>9} {'hits':>8} {'mismatches':>11}")
+        for name, r in results["queries"].items():
+            print(f"{name:10} {r['index_ms']:8.2f}ms {r['scan_ms']:8.1f}ms {r['speedup']:8.0f}x "
+                  f"{r['avg_hits']:8.1f} {r['mismatches']:11}")
+    return 1 if any(r["mismatches"] for r in results["queries"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# bench_navigation.py
+"""
+Navigation-latency benchmark.
+Drives OceanguardApp through a scripted tour of every screen and times each
+show_*() call up to the next repaint (update()). The first visit of a screen
+includes building it; later visits only raise it and refresh its data.
+
+    python bench_navigation.py [--laps 20] [--reports 5000] [--json]
+
+Needs an X display. On a headless box it starts Xvfb itself when the binary
+is installed (or run it under xvfb-run). Uses a throwaway database.
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TOUR = ["splash", "login", "signup", "login", "home", "report_form", "home", "records",
+        "view_record", "records", "edit_record", "records", "home", "stats", "home", "sdg", "home"]
+
+
+def _start_xvfb():
+    """Start a private Xvfb when there is no display; returns the process or None."""
+    if os.environ.get("DISPLAY") or not shutil.which("Xvfb"):
+        return None
+    display = ":97"
+    proc = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(0.5)
+    os.environ["DISPLAY"] = display
+    return proc
+
+
+def _seed(n):
+    import db
+    db.initialize()
+    reports = ((f"Beach {i % 250}", ("Plastic", "Glass", "Net", "Metal")[i % 4], "synthetic",
+                f"{1 + i % 12:02d}/{1 + i % 28:02d}/2025") for i in range(n))
+    db.bulk_add_reports(reports)
+
+
+def run(laps, reports):
+    import db
+    import main
+
+    _seed(reports)
+    record = db.get_reports_page(None, 1)[0][0]
+
+    app = main.OceanguardApp()
+    app.update()
+    app.current_user_id = None
+
+    steps = {
+        "view_record": lambda: app.show_screen("view_record", record),
+        "edit_record": lambda: app.show_screen("edit_record", record[0], record),
+    }
+
+    first, warm = {}, {}
+    for lap in range(laps):
+        for name in TOUR:
+            step = steps.get(name) or getattr(app, f"show_{name}")
+            start = time.perf_counter()
+            step()
+            app.update()
+            elapsed = time.perf_counter() - start
+            if name not in first:
+                first[name] = elapsed
+            else:
+                warm.setdefault(name, []).append(elapsed)
+    app.on_close()
+
+    return {
+        name: {
+            "first_ms": first[name] * 1000,
+            "warm_median_ms": statistics.median(warm[name]) * 1000 if warm.get(name) else None,
+            "warm_max_ms": max(warm[name]) * 1000 if warm.get(name) else None,
+            "visits": 1 + len(warm.get(name, [])),
+        }
+        for name in first
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--laps", type=int, default=20)
+    parser.add_argument("--reports", type=int, default=5000, help="synthetic reports in the throwaway DB")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)
+    os.chdir(here)  # main.py loads bg.png relative to the working directory
+
+    xvfb = _start_xvfb()
+    try:
+        import db
+        with tempfile.TemporaryDirectory() as tmp:
+            db.DB_FILE = os.path.join(tmp, "navigation.db")
+            try:
+                results = run(args.laps, args.reports)
+            except Exception as e:
+                # typically no display (TclError) or PIL missing
+                print(f"navigation benchmark skipped: {e}", file=sys.stderr)
+                return 2
+            finally:
+                db.close_pool()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'screen':14} {'first':>10} {'warm p50':>10} {'warm max':>10} {'visits':>7}")
+        for name, r in results.items():
+            warm_p50 = f"{r['warm_median_ms']:8.2f}ms" if r["warm_median_ms"] is not None else "-"
+            warm_max = f"{r['warm_max_ms']:8.2f}ms" if r["warm_max_ms"] is not None else "-"
+            print(f"{name:14} {r['first_ms']:8.2f}ms {warm_p50:>10} {warm_max:>10} {r['visits']:7}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
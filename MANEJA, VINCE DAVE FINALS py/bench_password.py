@@ -0,0 +1,109 @@
+# bench_password.py
+"""
+Password-hashing cost benchmark.
+Times one password check for each candidate scheme/cost and reports logins
+per second per core (checks are CPU-bound, so a machine with N cores serves
+about N times that). Also times db.login_user end to end with the settings
+configured in db.py, against a throwaway database.
+
+    python bench_password.py [--seconds 1.0] [--target 50] [--cores 4] [--json]
+
+--target marks the settings that still meet a required logins/s on --cores
+cores; pick the most expensive of those for db.PASSWORD_SCHEME / PASSWORD_PARAMS.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import db
+
+CANDIDATES = [
+    ("pbkdf2_sha256", {"iterations": 100000}),
+    ("pbkdf2_sha256", {"iterations": 310000}),
+    ("pbkdf2_sha256", {"iterations": 600000}),
+    ("pbkdf2_sha256", {"iterations": 1000000}),
+    ("scrypt", {"n": 2 ** 14, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 15, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 16, "r": 8, "p": 1}),
+    ("scrypt", {"n": 2 ** 17, "r": 8, "p": 1}),
+]
+
+
+def _rate(fn, seconds):
+    """Calls per second of fn over at least `seconds` (and at least 3 calls)."""
+    count = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds and count >= 3:
+            return count / elapsed
+
+
+def measure_hashers(seconds):
+    results = []
+    for scheme, params in CANDIDATES:
+        stored = db.hash_password("correct horse", scheme, **params)
+        rate = _rate(lambda: db.verify_password("correct horse", stored), seconds)
+        results.append({"scheme": scheme, "params": params, "logins_per_sec_per_core": rate,
+                        "ms_per_login": 1000 / rate,
+                        "configured": scheme == db.PASSWORD_SCHEME and params == db.PASSWORD_PARAMS[scheme]})
+    return results
+
+
+def measure_login(seconds):
+    """db.login_user with the configured settings: index lookup + verification."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_FILE = os.path.join(tmp, "logins.db")
+        try:
+            db.initialize()
+            db.register_user("bench", "correct horse")
+            return {
+                "ok": _rate(lambda: db.login_user("bench", "correct horse"), seconds),
+                "wrong_password": _rate(lambda: db.login_user("bench", "wrong"), seconds),
+                "unknown_user": _rate(lambda: db.login_user("nobody", "wrong"), seconds),
+            }
+        finally:
+            db.close_pool()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent per setting")
+    parser.add_argument("--target", type=float, help="required logins/s across --cores")
+    parser.add_argument("--cores", type=int, default=os.cpu_count() or 1, help="cores serving logins (default: %(default)s)")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    hashers = measure_hashers(args.seconds)
+    for r in hashers:
+        r["logins_per_sec"] = r["logins_per_sec_per_core"] * args.cores
+        r["meets_target"] = None if args.target is None else r["logins_per_sec"] >= args.target
+    login = measure_login(args.seconds)
+
+    if args.json:
+        print(json.dumps({"cores": args.cores, "target": args.target, "hashers": hashers,
+                          "login_user": login}, indent=2))
+        return 0
+
+    print(f"{'scheme':15} {'params':28} {'ms/login':>9} {'/s/core':>9} {f'/s x{args.cores}':>9}")
+    for r in hashers:
+        params = ",".join(f"{k}={v}" for k, v in r["params"].items())
+        flags = []
+        if r["configured"]:
+            flags.append("configured")
+        if r["meets_target"] is not None:
+            flags.append("meets target" if r["meets_target"] else "below target")
+        print(f"{r['scheme']:15} {params:28} {r['ms_per_login']:9.1f} {r['logins_per_sec_per_core']:9.1f} "
+              f"{r['logins_per_sec']:9.1f}  {' '.join(flags)}")
+    print(f"\ndb.login_user ({db.PASSWORD_SCHEME}, one core): "
+          + ", ".join(f"{name} {rate:.1f}/s" for name, rate in login.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
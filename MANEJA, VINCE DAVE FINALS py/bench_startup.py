@@ -0,0 +1,250 @@
+# bench_startup.py
+"""
+Startup-time budget check.
+Measures, each in a fresh interpreter so nothing is cached between runs:
+- `import db` (must also print nothing)
+- `import main` plus OceanguardApp() construction and the first update()
+- time to first frame: from launching the interpreter to the first Expose of
+  the splash screen, and to db.initialize() finishing behind it
+- db.initialize() on a database that is current (PRAGMA user_version is
+  SCHEMA_VERSION, migration skipped) and on one that is not (full migration
+  checks, then stamped)
+- the background image: resized from bg.png on a cold asset cache, read back
+  from the cache when warm, and the old per-launch LANCZOS resize for reference
+Exits non-zero when the median of the import, app or first-frame time goes
+over its budget.
+
+    python bench_startup.py [--runs 5] [--import-budget 0.15] [--app-budget 1.5] [--frame-budget 0.5]
+
+The app and first-frame measurements need a display (use xvfb-run on a
+headless box). Everything uses throwaway databases so ocean.db is never touched.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_DB = """
+import time
+t = time.perf_counter()
+import db
+print(time.perf_counter() - t)
+"""
+
+BUILD_APP = """
+import sys, time
+t = time.perf_counter()
+import db
+db.DB_FILE = sys.argv[1]
+import main
+app = main.OceanguardApp()
+app.update()
+elapsed = time.perf_counter() - t
+app.on_close()
+print(elapsed)
+"""
+
+# prints when db.initialize() returned, then when the first frame was drawn (time.time())
+FIRST_FRAME = """
+import sys, time
+import db
+db.DB_FILE = sys.argv[1]
+shown = {}
+initialize = db.initialize
+
+def timed_initialize():
+    initialize()
+    shown["db"] = time.time()
+
+db.initialize = timed_initialize
+import main
+app = main.OceanguardApp()
+app.bind("<Expose>", lambda e: shown.setdefault("frame", time.time()))
+
+def check():
+    if "frame" in shown and "db" in shown:
+        app.on_close()
+    else:
+        app.after(1, check)
+
+app.after(1, check)
+app.after(10000, app.on_close)
+app.mainloop()
+print(shown["db"])
+print(shown["frame"])
+"""
+
+INITIALIZE = """
+import sys, time
+import db
+db.DB_FILE = sys.argv[1]
+t = time.perf_counter()
+db.initialize()
+print(time.perf_counter() - t)
+"""
+
+
+# argv: cache dir, "cold" or "warm"
+BACKGROUND = """
+import sys, time
+import assets, main
+assets.CACHE_DIR = sys.argv[1]
+if sys.argv[2] == "cold":
+    assets.clear()
+t = time.perf_counter()
+with open(assets.scaled_image(main.BG_IMAGE_FILE, (main.BG_WIDTH, main.BG_HEIGHT)), "rb") as fh:
+    fh.read()
+print(time.perf_counter() - t)
+"""
+
+UNCACHED_BACKGROUND = """
+import time
+import main
+t = time.perf_counter()
+from PIL import Image
+Image.open(main.BG_IMAGE_FILE).resize((main.BG_WIDTH, main.BG_HEIGHT), Image.LANCZOS).tobytes()
+print(time.perf_counter() - t)
+"""
+
+
+def _run(snippet, *args):
+    proc = subprocess.run([sys.executable, "-c", snippet, *args], cwd=HERE,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed")
+    lines = proc.stdout.strip().splitlines()
+    return float(lines[-1]), lines[:-1]
+
+
+def measure_import(runs):
+    times, noise = [], []
+    for _ in range(runs):
+        elapsed, output = _run(IMPORT_DB)
+        times.append(elapsed)
+        noise += output
+    return times, noise
+
+
+def measure_app(runs):
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(runs):
+            elapsed, _ = _run(BUILD_APP, os.path.join(tmp, f"startup{i}.db"))
+            times.append(elapsed)
+    return times
+
+
+def measure_first_frame(runs):
+    """Seconds from process launch to the first painted frame, and to the database being ready."""
+    frames, ready = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(runs):
+            start = time.time()
+            frame, output = _run(FIRST_FRAME, os.path.join(tmp, f"frame{i}.db"))
+            frames.append(frame - start)
+            ready.append(float(output[-1]) - start)
+    return frames, ready
+
+
+def measure_initialize(runs):
+    """db.initialize() in a fresh interpreter: schema already current vs. user_version reset to 0."""
+    out = {"current": [], "stale": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "init.db")
+        _run(INITIALIZE, path)
+        for _ in range(runs):
+            conn = sqlite3.connect(path)
+            conn.execute("PRAGMA user_version = 0")
+            conn.close()
+            out["stale"].append(_run(INITIALIZE, path)[0])
+            out["current"].append(_run(INITIALIZE, path)[0])
+    return out
+
+
+def measure_background(runs):
+    """Seconds to get the scaled background: cold cache, warm cache, and no cache at all."""
+    out = {"cold": [], "warm": [], "uncached": []}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for _ in range(runs):
+            out["cold"].append(_run(BACKGROUND, cache_dir, "cold")[0])
+            out["warm"].append(_run(BACKGROUND, cache_dir, "warm")[0])
+            out["uncached"].append(_run(UNCACHED_BACKGROUND)[0])
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=0.15, help="seconds for `import db`")
+    parser.add_argument("--app-budget", type=float, default=1.5, help="seconds for import + OceanguardApp()")
+    parser.add_argument("--frame-budget", type=float, default=0.5, help="seconds from launch to the first frame")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    results = {}
+    failed = False
+
+    times, noise = measure_import(args.runs)
+    results["import_db"] = {"median": statistics.median(times), "max": max(times),
+                            "budget": args.import_budget, "printed": noise}
+    if noise:
+        failed = True
+    if results["import_db"]["median"] > args.import_budget:
+        failed = True
+
+    try:
+        times = measure_app(args.runs)
+        results["app_construct"] = {"median": statistics.median(times), "max": max(times),
+                                    "budget": args.app_budget}
+        if results["app_construct"]["median"] > args.app_budget:
+            failed = True
+    except RuntimeError as e:
+        # typically no $DISPLAY or PIL missing; report it rather than pretend
+        results["app_construct"] = {"skipped": str(e)}
+
+    try:
+        frames, ready = measure_first_frame(args.runs)
+        results["first_frame"] = {"median": statistics.median(frames), "max": max(frames),
+                                  "budget": args.frame_budget}
+        results["db_ready"] = {"median": statistics.median(ready), "max": max(ready)}
+        if results["first_frame"]["median"] > args.frame_budget:
+            failed = True
+    except RuntimeError as e:
+        results["first_frame"] = {"skipped": str(e)}
+
+    for name, times in measure_initialize(args.runs).items():
+        results[f"initialize_{name}"] = {"median": statistics.median(times), "max": max(times)}
+
+    try:
+        for name, times in measure_background(args.runs).items():
+            results[f"background_{name}"] = {"median": statistics.median(times), "max": max(times)}
+    except RuntimeError as e:
+        # PIL missing or bg.png unreadable
+        results["background_cold"] = {"skipped": str(e)}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in results.items():
+            if "skipped" in r:
+                print(f"{name:19} SKIPPED ({r['skipped']})")
+                continue
+            line = f"{name:19} median {r['median'] * 1000:7.1f} ms  max {r['max'] * 1000:7.1f} ms"
+            if "budget" in r:
+                status = "OK" if r["median"] <= r["budget"] else "OVER BUDGET"
+                line += f"  budget {r['budget'] * 1000:.0f} ms  {status}"
+            print(line)
+            if r.get("printed"):
+                print(f"{'':19} import printed output: {r['printed'][:3]}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# bench_sync.py
+"""
+Outbox sync benchmark and end-to-end check.
+Builds --devices field databases (reports added, edited, geotagged and
+deleted on each), then syncs every device to a fresh central database twice:
+- file: sync.FileTarget straight into central.db
+- http: sync.HttpTarget to an api.py server started on a local port
+Each device's first sync is cut off after one batch and its first batch is
+then resent (as if the acknowledgement had been lost) before the sync
+resumes. Afterwards the central must hold exactly the union of the devices'
+reports (same uids and fields), with nothing applied twice.
+Reports entries/s, batches and the compression ratio per target.
+
+    python bench_sync.py [--devices 3] [--reports 5000] [--batch-size 500] [--json]
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import db
+import sync
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIELDS_SQL = ("SELECT uid, location, waste_type, description, date_reported, latitude, longitude, created_at "
+              "FROM reports ORDER BY uid")
+
+
+def _use(path):
+    db.close_pool()
+    db.invalidate_schema()
+    db.DB_FILE = path
+    db.initialize()
+
+
+def build_device(path, n, tag):
+    """A device database with n reports, some of them edited, geotagged or deleted afterwards."""
+    _use(path)
+    ids = [db.add_report(f"{tag} Beach {i % 97}", "Plastic", f"debris pile {i} seen from device {tag}",
+                         f"{i % 12 + 1:02d}/{i % 28 + 1:02d}/2025", None) for i in range(n)]
+    for report_id in ids[::10]:
+        db.update_report(report_id, f"{tag} Cove", "Glass", "edited in the field", "06/15/2025")
+    for report_id in ids[1::10]:
+        db.set_report_coordinates(report_id, 14.5, 120.9)
+    for report_id in ids[2::25]:
+        db.delete_report(report_id)
+    with db.get_connection() as conn:
+        return conn.execute(FIELDS_SQL).fetchall()
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(FIELDS_SQL).fetchall()
+    finally:
+        conn.close()
+
+
+def _init_central(path):
+    subprocess.run([sys.executable, os.path.join(HERE, "db.py"), "--db", path, "init"], check=True)
+
+
+def sync_devices(devices, target, batch_size):
+    """Sync every device to target: one batch, a resent batch, then the rest. Returns totals."""
+    totals = {"entries": 0, "batches": 0, "raw_bytes": 0, "sent_bytes": 0, "seconds": 0.0, "replayed": 0}
+    for path in devices:
+        shutil.copy(path, path + ".work")  # every target starts from the same unsynced device
+        _use(path + ".work")
+        first = sync.sync(target, batch_size, max_batches=1)
+        device_id, entries = db.outbox_batch(batch_size)
+        if entries:
+            # a batch that was applied but whose ack never arrived, then sent again
+            target.send(sync.pack_batch(device_id, entries))
+            target.send(sync.pack_batch(device_id, entries))
+            totals["replayed"] += len(entries)
+        rest = sync.sync(target, batch_size)
+        if rest["pending"]:
+            raise RuntimeError(f"{rest['pending']} entries left unsynced on {path}")
+        for stats in (first, rest):
+            for key in ("entries", "batches", "raw_bytes", "sent_bytes", "seconds"):
+                totals[key] += stats[key]
+        db.close_pool()
+        os.remove(path + ".work")
+    return totals
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=3)
+    parser.add_argument("--reports", type=int, default=5000, help="reports added per device")
+    parser.add_argument("--batch-size", type=int, default=db.SYNC_BATCH_SIZE)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="bench_sync_")
+    server = None
+    try:
+        devices, expected = [], []
+        for k in range(args.devices):
+            path = os.path.join(workdir, f"device{k}.db")
+            expected += build_device(path, args.reports, f"d{k}")
+            devices.append(path)
+        db.close_pool()
+        expected.sort()
+
+        results = {}
+        central = os.path.join(workdir, "central.db")
+        _init_central(central)
+        target = sync.FileTarget(central)
+        try:
+            results["file"] = sync_devices(devices, target, args.batch_size)
+        finally:
+            target.close()
+        results["file"]["matches"] = _rows(central) == expected
+
+        central = os.path.join(workdir, "central_http.db")
+        _init_central(central)
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(HERE, "api.py"), "--db", central,
+                                   "--port", str(port)], stdout=subprocess.PIPE)
+        server.stdout.readline()  # "serving ..." once it listens
+        results["http"] = sync_devices(devices, sync.HttpTarget(f"http://127.0.0.1:{port}"), args.batch_size)
+        results["http"]["matches"] = _rows(central) == expected
+    finally:
+        db.close_pool()
+        if server is not None:
+            server.terminate()
+            server.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for r in results.values():
+        r["entries_per_sec"] = r["entries"] / r["seconds"] if r["seconds"] else 0.0
+        r["compression"] = r["raw_bytes"] / r["sent_bytes"] if r["sent_bytes"] else 0.0
+    if args.json:
+        print(json.dumps({"devices": args.devices, "reports": len(expected), "targets": results}, indent=2))
+    else:
+        print(f"{args.devices} devices, {len(expected)} reports in the end")
+        print(f"{'target':7} {'entries':>8} {'batches':>8} {'entries/s':>10} {'sent KB':>9} {'ratio':>6} {'matches':>8}")
+        for name, r in results.items():
+            print(f"{name:7} {r['entries']:8} {r['batches']:8} {r['entries_per_sec']:10.0f} "
+                  f"{r['sent_bytes'] / 1024:9.1f} {r['compression']:5.1f}x {str(r['matches']):>8}")
+    return 0 if all(r["matches"] for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# bench_validate.py
+"""
+Micro-benchmark: utils.validate in a loop vs utils.validate_batch.
+Builds synthetic import columns (mostly valid rows, some blank fields, bad
+formats and impossible dates), checks that both give the same verdict for
+every row, and reports rows/second for each. The batch date cache is cleared
+before every batch run so it starts cold, as it would for a new import.
+
+    python bench_validate.py [--rows 200000] [--repeat 3] [--json]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+import utils
+
+
+def make_columns(rows, seed=7):
+    rng = random.Random(seed)
+    locations, waste_types, dates = [], [], []
+    for i in range(rows):
+        roll = rng.random()
+        locations.append("" if roll < 0.01 else f"Beach {i % 500}")
+        waste_types.append("  " if 0.01 <= roll < 0.02 else rng.choice(["Plastic", "Glass", "Net", "Metal"]))
+        if roll < 0.10:
+            dates.append("")
+        elif roll < 0.12:
+            dates.append(f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}")
+        elif roll < 0.13:
+            dates.append(f"02/{rng.randint(29, 31)}/2025")
+        else:
+            dates.append(f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/{rng.randint(2020, 2025)}")
+    return locations, waste_types, dates
+
+
+def _best(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per variant; the best is reported")
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args(argv)
+
+    locations, waste_types, dates = make_columns(args.rows)
+
+    def loop():
+        return [utils.validate(l, w, d) for l, w, d in zip(locations, waste_types, dates)]
+
+    def batch():
+        utils._date_reason.cache_clear()
+        return utils.validate_batch(locations, waste_types, dates)[0]
+
+    loop_time, loop_mask = _best(loop, args.repeat)
+    batch_time, batch_mask = _best(batch, args.repeat)
+    mismatches = sum(a != b for a, b in zip(loop_mask, batch_mask))
+
+    results = {
+        "rows": args.rows,
+        "valid": sum(batch_mask),
+        "validate_loop": {"seconds": loop_time, "rows_per_sec": args.rows / loop_time},
+        "validate_batch": {"seconds": batch_time, "rows_per_sec": args.rows / batch_time},
+        "speedup": loop_time / batch_time,
+        "mismatches": mismatches,
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{args.rows} rows, {results['valid']} valid")
+        for name in ("validate_loop", "validate_batch"):
+            r = results[name]
+            print(f"{name:15} {r['seconds'] * 1000:9.1f} ms  {r['rows_per_sec']:12.0f} rows/s")
+        print(f"speedup {results['speedup']:.1f}x, mismatches {mismatches}")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
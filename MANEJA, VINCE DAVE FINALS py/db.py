@@ -1,73 +1,526 @@
 import sqlite3
 import hashlib
+import hmac
+import threading
+import time
+import os
+import sys
+import json
+import math
+from itertools import islice
+from contextlib import contextmanager
 from datetime import datetime
+from queue import LifoQueue, Queue, Empty
+from collections import OrderedDict
+
+import dedup
+import utils
 
 DB_FILE = "ocean.db"
 
-def connect():
-    return sqlite3.connect(DB_FILE)
-# Save as diagnose_db.py in your project folder and run: python diagnose_db.py
-import sqlite3, db, os
-print("Using DB file:", getattr(db, "DB_FILE", None) or "db.DB_FILE not set")
-db_path = os.path.abspath(getattr(db, "DB_FILE", "ocean.db"))
-print("DB absolute path:", db_path)
-conn = sqlite3.connect(db_path)
-cur = conn.cursor()
-try:
-    cur.execute("PRAGMA table_info(reports)")
-    print("reports table columns:", cur.fetchall())
-    try:
-        cur.execute("SELECT COUNT(*) FROM reports")
-        print("reports row count:", cur.fetchone()[0])
-    except Exception as e:
-        print("COUNT query failed:", e)
-    try:
-        cur.execute("SELECT id, location, waste_type, description, COALESCE(date_reported, date), user_id FROM reports LIMIT 10")
-        rows = cur.fetchall()
-        print("sample rows (up to 10):")
-        for r in rows:
-            print(r)
-    except Exception as e:
-        print("SELECT sample failed:", e)
-except Exception as e:
-    print("PRAGMA failed:", e)
-finally:
-    conn.close()
-def initialize():
-    """Create tables if missing and run safe migrations for older DBs."""
-    conn = connect()
+# Connection pool tuning. Connections are long-lived and shared across threads,
+# so every PRAGMA below is applied once when a connection is opened.
+POOL_SIZE = 4
+POOL_TIMEOUT = 10.0          # seconds to wait for a free connection
+CACHE_SIZE_KB = 8192         # page cache per connection (PRAGMA cache_size, in KiB)
+MMAP_SIZE = 64 * 1024 * 1024 # memory-mapped I/O window in bytes
+BUSY_TIMEOUT_MS = 5000       # wait this long for another writer's lock instead of "database is locked"
+CONNECTION_FACTORY = sqlite3.Connection  # profiler.enable() swaps in a timing subclass
+
+def connect(path=None):
+    """Open a new connection (DB_FILE by default) with the pool PRAGMAs applied."""
+    conn = sqlite3.connect(path or DB_FILE, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           factory=CONNECTION_FACTORY)
     cur = conn.cursor()
+    cur.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_MS)}")
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")
+    cur.execute(f"PRAGMA cache_size=-{int(CACHE_SIZE_KB)}")
+    cur.execute(f"PRAGMA mmap_size={int(MMAP_SIZE)}")
+    cur.close()
+    return conn
 
-    # Ensure users table
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """)
+class ConnectionPool:
+    """
+    Small pool of long-lived connections to one database file.
+    - acquire() hands out an idle connection (hit) or opens a new one while the
+      pool is below its size (miss); otherwise it waits for a release.
+    - stats() exposes hit/miss counts and time spent waiting for a connection.
+    """
 
-    # If reports table missing, create with modern schema
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS reports (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        location TEXT NOT NULL,
-        waste_type TEXT NOT NULL,
-        description TEXT,
-        date_reported TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY(user_id) REFERENCES users(id)
-    )
-    """)
-    conn.commit()
+    def __init__(self, path, size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
 
-    # Run safe migration to fix legacy schemas (e.g. reports.date NOT NULL)
-    _migrate_reports_table(conn)
+    def acquire(self):
+        if self._closed:
+            raise sqlite3.ProgrammingError("connection pool is closed")
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.hits += 1
+            return conn
+        except Empty:
+            pass
 
-    conn.commit()
-    conn.close()
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+                self.misses += 1
+        if can_open:
+            try:
+                return connect(self.path)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        # pool exhausted -> wait for another thread to release a connection
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.timeout)
+        except Empty:
+            raise sqlite3.OperationalError(f"no database connection available after {self.timeout}s")
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.hits += 1
+            self.waits += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+        return conn
+
+    def release(self, conn):
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Yield a pooled connection; commit on success, roll back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._opened,
+                "idle": self._idle.qsize(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_time": self.wait_time,
+                "max_wait": self.max_wait,
+            }
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Return the pool for the current DB_FILE, replacing it if DB_FILE changed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_FILE:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_FILE, POOL_SIZE)
+        return _pool
+
+def get_connection():
+    """Context manager over a pooled connection: `with get_connection() as conn:`."""
+    return get_pool().connection()
+
+def pool_stats():
+    return get_pool().stats()
+
+def close_pool():
+    close_write_queue()  # flushes queued writes first
+    reset_pool()
+
+def reset_pool():
+    """
+    Drop the connection pool so the next call opens new connections (idle ones
+    close now, busy ones when released). Unlike close_pool() it does not wait
+    for the writer thread.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+# Group commit. Writes from any thread are queued to one writer thread, which
+# runs everything queued (at most GROUP_COMMIT_MAX) in a single transaction: one
+# lock and one WAL sync for the whole group instead of one per write. Writes that
+# arrive while a group commits form the next group. GROUP_COMMIT_MS additionally
+# holds each group open for more writes; 0 measured best (a fixed wait caps a
+# lone writer at ~1/GROUP_COMMIT_MS ops/s).
+GROUP_COMMIT_MS = 0.0
+GROUP_COMMIT_MAX = 256
+_BATCH_BUCKETS = (1, 4, 16, 64, 256)  # batch-size histogram upper bounds
+
+class WriteQueue:
+    """
+    Single writer with its own connection to one database file.
+    - submit(fn, *args) queues fn(conn, *args) and returns a Future with its result.
+    - A failing write only fails its own Future; the rest of the group still
+      commits. If the writer cannot open the database, every queued write fails
+      with that error and submit() raises it from then on. Groups run without savepoints (they cost ~30% of an insert) and
+      are replayed with one SAVEPOINT per write only after a failure.
+    - stats() exposes queue depth and commit-batch sizes.
+    """
+
+    def __init__(self, path, max_batch=GROUP_COMMIT_MAX, window_ms=GROUP_COMMIT_MS):
+        self.path = path
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self._queue = Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error = None
+        self._stats = {"ops": 0, "errors": 0, "batches": 0, "max_batch": 0, "max_depth": 0,
+                       "commit_time": 0.0, "max_commit": 0.0,
+                       "batch_sizes": {f"<={b}": 0 for b in _BATCH_BUCKETS} | {f">{_BATCH_BUCKETS[-1]}": 0}}
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        # imported here, not at the top: concurrent.futures pulls in logging, which
+        # would otherwise add ~4 ms to every start before the first window paints
+        from concurrent.futures import Future
+        future = Future()
+        with self._lock:
+            if self._error is not None:
+                raise sqlite3.OperationalError(f"database writer failed: {self._error}") from self._error
+            if self._closed:
+                raise sqlite3.ProgrammingError("write queue is closed")
+            self._queue.put((fn, args, future))
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+        return future
+
+    def _run(self):
+        try:
+            conn = connect(self.path)
+        except Exception as e:
+            self._fail(e)
+            return
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch, stop = [item], False
+                deadline = time.perf_counter() + self.window
+                while len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                    except Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._commit(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _fail(self, error):
+        # no writer: close the queue, then fail whatever was queued before that
+        with self._lock:
+            self._closed = True
+            self._error = error
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except Empty:
+                return
+            if item is not None and item[2].set_running_or_notify_cancel():
+                item[2].set_exception(error)
+
+    def _commit(self, conn, batch):
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            try:
+                results = self._apply(conn, batch, isolate=False)
+            except Exception:
+                conn.rollback()
+                results = self._apply(conn, batch, isolate=True)
+            conn.commit()
+        except Exception as e:
+            # the transaction itself failed (lock timeout, disk full): every write in it fails
+            if conn.in_transaction:
+                conn.rollback()
+            results = [(future, None, e) for _, _, future in batch]
+        elapsed = time.perf_counter() - start
+
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        with self._lock:
+            s = self._stats
+            s["ops"] += len(batch)
+            s["errors"] += sum(1 for r in results if r[2] is not None)
+            s["batches"] += 1
+            s["max_batch"] = max(s["max_batch"], len(batch))
+            s["commit_time"] += elapsed
+            s["max_commit"] = max(s["max_commit"], elapsed)
+            bucket = next((f"<={b}" for b in _BATCH_BUCKETS if len(batch) <= b), f">{_BATCH_BUCKETS[-1]}")
+            s["batch_sizes"][bucket] += 1
+
+    @staticmethod
+    def _apply(conn, batch, isolate):
+        """Run the batch in one open transaction; with isolate, per-write errors are captured."""
+        conn.execute("BEGIN IMMEDIATE")
+        results = []
+        for fn, args, future in batch:
+            if not isolate:
+                results.append((future, fn(conn, *args), None))
+                continue
+            conn.execute("SAVEPOINT write_op")
+            try:
+                results.append((future, fn(conn, *args), None))
+                conn.execute("RELEASE write_op")
+            except Exception as e:
+                conn.execute("ROLLBACK TO write_op")
+                conn.execute("RELEASE write_op")
+                results.append((future, None, e))
+        return results
+
+    def stats(self):
+        with self._lock:
+            s = dict(self._stats, batch_sizes=dict(self._stats["batch_sizes"]))
+        s["depth"] = self._queue.qsize()
+        s["avg_batch"] = s["ops"] / s["batches"] if s["batches"] else 0.0
+        return s
+
+    def close(self):
+        """Stop accepting writes, commit what is queued and stop the writer."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+def write_queue():
+    """Return the WriteQueue for the current DB_FILE, replacing it if DB_FILE changed."""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None or _write_queue.path != DB_FILE:
+            if _write_queue is not None:
+                _write_queue.close()
+            _write_queue = WriteQueue(DB_FILE, GROUP_COMMIT_MAX, GROUP_COMMIT_MS)
+        return _write_queue
+
+def write_queue_stats():
+    return write_queue().stats()
+
+def close_write_queue():
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is not None:
+            _write_queue.close()
+            _write_queue = None
+
+class SchemaInfo:
+    """
+    What the reports table of one database file actually looks like, read once
+    at initialize() (or on first use) instead of on every call, together with
+    the SQL statements that fit it. Legacy databases still carry a `date`
+    column that is read as a fallback and written alongside date_reported.
+    """
+
+    def __init__(self, path, report_columns):
+        self.path = path
+        self.report_columns = frozenset(report_columns)
+        self.has_legacy_date = "date" in self.report_columns
+
+        date_expr = "COALESCE(r.date_reported, r.date)" if self.has_legacy_date else "r.date_reported"
+        select = f"""
+    SELECT r.id,
+           r.location,
+           r.waste_type,
+           r.description,
+           {date_expr} AS date_reported,
+           u.username
+    FROM reports r
+    LEFT JOIN users u ON r.user_id = u.id
+"""
+        # created_at DESC, id DESC walks idx_reports_created_at backwards (NULL created_at
+        # sorts last, ordered by id), so no temp B-tree sort is needed.
+        self.all_reports_sql = select + """
+    ORDER BY r.created_at DESC, r.id DESC
+"""
+        self.get_report_sql = select + """
+    WHERE r.id = ?
+"""
+        self.page_first_sql = _PAGE_FIRST_SQL.format(date_expr=date_expr)
+        self.page_after_sql = _PAGE_AFTER_SQL.format(date_expr=date_expr)
+        self.page_tail_first_sql = _PAGE_TAIL_FIRST_SQL.format(date_expr=date_expr)
+        self.page_tail_after_sql = _PAGE_TAIL_AFTER_SQL.format(date_expr=date_expr)
+        self.search_sql = _SEARCH_SQL.format(date_expr=date_expr)
+        self.changes_sql = _CHANGES_SQL.format(date_expr=date_expr)
+        self.between_sql = _BETWEEN_SQL.format(date_expr=date_expr)
+        self.geo_sql = _GEO_INDEX_SQL.format(date_expr=date_expr)
+        self.geo_scan_sql = _GEO_SCAN_SQL.format(date_expr=date_expr)
+        journal = _JOURNAL_UPSERT_SQL.format(date_expr=date_expr)
+        self.journal_upsert_sql = journal + """    WHERE r.id = ?
+"""
+        self.journal_all_sql = journal + """    ORDER BY r.id
+"""
+        self.date_expr = date_expr
+        if self.has_legacy_date:
+            # keep legacy date in step with date_reported
+            self.update_report_sql = """
+    UPDATE reports
+    SET location = ?, waste_type = ?, description = ?, date_reported = ?, date_iso = ?, date = ?
+    WHERE id = ?
+"""
+        else:
+            self.update_report_sql = """
+    UPDATE reports
+    SET location = ?, waste_type = ?, description = ?, date_reported = ?, date_iso = ?
+    WHERE id = ?
+"""
+
+    def update_params(self, report_id, location, waste_type, description, date_reported):
+        date_iso = utils.iso_date(date_reported)
+        if self.has_legacy_date:
+            return (location, waste_type, description, date_reported, date_iso, date_reported, report_id)
+        return (location, waste_type, description, date_reported, date_iso, report_id)
+
+_schema = None
+_schema_lock = threading.Lock()
+
+def _report_columns(conn):
+    return [c[1] for c in conn.execute("PRAGMA table_info(reports)").fetchall()]
+
+def _set_schema(schema):
+    global _schema
+    with _schema_lock:
+        _schema = schema
+
+def invalidate_schema():
+    """Forget the cached SchemaInfo; call after changing the reports table."""
+    _set_schema(None)
+
+def get_schema():
+    """Cached SchemaInfo for DB_FILE, introspected only when missing or stale."""
+    schema = _schema
+    if schema is None or schema.path != DB_FILE:
+        with get_connection() as conn:
+            schema = SchemaInfo(DB_FILE, _report_columns(conn))
+        _set_schema(schema)
+    return schema
+
+SCHEMA_VERSION = 3  # stored in PRAGMA user_version; bump whenever initialize() creates or migrates something new
+_MIGRATED_COLUMNS = ("user_id", "date_reported", "created_at", "date_iso", "latitude", "longitude", "uid")
+_VIRTUAL_TABLES_SQL = "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('reports_fts', 'reports_geo')"
+
+def initialize():
+    """
+    Create tables if missing and run safe migrations for older DBs.
+    A database stamped with SCHEMA_VERSION already has everything, so only its
+    reports columns are read and the change log pruned; the stamp is written
+    once every migration has succeeded.
+    """
+    global FTS_AVAILABLE, GEO_AVAILABLE
+    with get_connection() as conn:
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            invalidate_schema()
+            _set_schema(SchemaInfo(DB_FILE, _report_columns(conn)))
+            tables = {name for (name,) in conn.execute(_VIRTUAL_TABLES_SQL)}
+            FTS_AVAILABLE = "reports_fts" in tables
+            GEO_AVAILABLE = "reports_geo" in tables
+            _prune_change_log(conn)
+            return
+
+        cur = conn.cursor()
+
+        # Ensure users table
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+
+        # If reports table missing, create with modern schema
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            location TEXT NOT NULL,
+            waste_type TEXT NOT NULL,
+            description TEXT,
+            date_reported TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            date_iso TEXT,
+            latitude REAL,
+            longitude REAL,
+            uid TEXT,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+        """)
+        conn.commit()
+
+        # Run safe migration to fix legacy schemas (e.g. reports.date NOT NULL)
+        invalidate_schema()
+        columns = _migrate_reports_table(conn)
+        _set_schema(SchemaInfo(DB_FILE, columns))
+
+        # Indexes, full-text index and triggers must come after migrations:
+        # a legacy table rebuild drops them
+        _ensure_indexes(conn)
+        _ensure_search_index(conn)
+        _ensure_spatial_index(conn)
+        _ensure_stats_tables(conn)
+        _ensure_change_log(conn)
+        _ensure_dedup_index(conn)
+        _ensure_outbox(conn)
+        if all(name in columns for name in _MIGRATED_COLUMNS):
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
 
 def _migrate_reports_table(conn):
     """
@@ -75,11 +528,15 @@ def _migrate_reports_table(conn):
     - If legacy column 'date' exists but 'date_reported' does not, rebuild reports table
       copying date -> date_reported to avoid NOT NULL constraint errors.
     - Add missing nullable columns (user_id, date_reported, created_at) when possible.
+    - Add date_iso (YYYY-MM-DD, sortable) and fill it from date_reported / legacy date.
+    - Add optional latitude/longitude (NULL for reports without coordinates).
+    - Add uid (globally unique report id, see utils.new_uid) and give every
+      existing report one.
+    Returns the reports column names after migration, tracked as each step
+    succeeds so the table is introspected only once.
     """
+    cols = _report_columns(conn)
     cur = conn.cursor()
-    cur.execute("PRAGMA table_info(reports)")
-    cols_info = cur.fetchall()
-    cols = [c[1] for c in cols_info]
 
     # If legacy 'date' exists and date_reported missing -> rebuild table to map date -> date_reported
     if "date" in cols and "date_reported" not in cols:
@@ -116,20 +573,17 @@ def _migrate_reports_table(conn):
             cur.execute("DROP TABLE reports")
             cur.execute("ALTER TABLE reports_new RENAME TO reports")
             conn.commit()
+            cols = ["id", "user_id", "location", "waste_type", "description", "date_reported", "created_at"]
         except Exception:
             # If something fails, ignore and allow later code to attempt lighter migrations
             conn.rollback()
 
-        # refresh cols_info after rebuild
-        cur.execute("PRAGMA table_info(reports)")
-        cols_info = cur.fetchall()
-        cols = [c[1] for c in cols_info]
-
     # If date_reported missing but date not present (rare), try adding column
     if "date_reported" not in cols:
         try:
             cur.execute("ALTER TABLE reports ADD COLUMN date_reported TEXT")
             conn.commit()
+            cols.append("date_reported")
         except Exception:
             conn.rollback()
 
@@ -138,6 +592,7 @@ def _migrate_reports_table(conn):
         try:
             cur.execute("ALTER TABLE reports ADD COLUMN user_id INTEGER")
             conn.commit()
+            cols.append("user_id")
         except Exception:
             conn.rollback()
 
@@ -146,113 +601,1822 @@ def _migrate_reports_table(conn):
         try:
             cur.execute("ALTER TABLE reports ADD COLUMN created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
             conn.commit()
+            cols.append("created_at")
         except Exception:
             conn.rollback()
 
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    # Add the normalized date column and fill it from the free-text dates, parsed
+    # by the same rules as utils.validate (unparseable dates stay NULL)
+    if "date_iso" not in cols:
+        try:
+            source = "COALESCE(date_reported, date)" if "date" in cols else "date_reported"
+            conn.create_function("iso_date", 1, utils.iso_date, deterministic=True)
+            cur.execute("ALTER TABLE reports ADD COLUMN date_iso TEXT")
+            cur.execute(f"UPDATE reports SET date_iso = iso_date({source}) WHERE {source} IS NOT NULL")
+            conn.commit()
+            cols.append("date_iso")
+        except Exception:
+            conn.rollback()
 
-def register_user(username, password):
-    conn = connect()
+    for name in ("latitude", "longitude"):
+        if name not in cols:
+            try:
+                cur.execute(f"ALTER TABLE reports ADD COLUMN {name} REAL")
+                conn.commit()
+                cols.append(name)
+            except Exception:
+                conn.rollback()
+
+    if "uid" not in cols:
+        try:
+            conn.create_function("new_uid", 0, utils.new_uid)
+            cur.execute("ALTER TABLE reports ADD COLUMN uid TEXT")
+            cur.execute("UPDATE reports SET uid = new_uid()")
+            conn.commit()
+            cols.append("uid")
+        except Exception:
+            conn.rollback()
+
+    return cols
+
+def _ensure_indexes(conn):
+    """Secondary indexes for listing order and per-user/date/type filtering."""
     cur = conn.cursor()
-    cur.execute("INSERT INTO users(username, password) VALUES (?, ?)", (username, hash_password(password)))
+    # (created_at) entries carry the rowid, so they also serve ORDER BY created_at, id
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports(created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_user_id ON reports(user_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_date_reported ON reports(date_reported)")
+    # waste types are matched ignoring case (iter_reports), so the index must use NOCASE to serve it
+    cur.execute("DROP INDEX IF EXISTS idx_reports_waste_type")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_waste_type_nocase ON reports(waste_type COLLATE NOCASE)")
+    # (date_iso) entries carry the rowid, so date ranges come back in date, id order
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_reports_date_iso ON reports(date_iso)")
     conn.commit()
-    conn.close()
 
-def login_user(username, password):
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username = ? AND password = ?", (username, hash_password(password)))
-    row = cur.fetchone()
-    conn.close()
-    return row[0] if row else None
+SEARCH_LIMIT = 50
+FTS_AVAILABLE = True  # cleared by initialize() when SQLite lacks the fts5 module
 
-def add_report(location, waste_type, description, date_reported, user_id):
-    # store None for empty dates
-    if not date_reported or str(date_reported).strip() == "":
-        date_reported = None
-    conn = connect()
+def _ensure_search_index(conn):
+    """
+    Create the FTS5 index over location, waste_type and description.
+    It is an external-content table (no second copy of the text) kept in sync
+    with reports by triggers; a freshly created index is back-filled once.
+    """
+    global FTS_AVAILABLE
     cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reports_fts'")
+    exists = cur.fetchone() is not None
+    try:
+        cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+            location, waste_type, description,
+            content='reports', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        """)
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search_reports falls back to LIKE scans
+        FTS_AVAILABLE = False
+        return
+    FTS_AVAILABLE = True
+
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_fts_ai AFTER INSERT ON reports BEGIN
+        INSERT INTO reports_fts(rowid, location, waste_type, description)
+        VALUES (new.id, new.location, new.waste_type, new.description);
+    END
+    """)
     cur.execute("""
-        INSERT INTO reports (user_id, location, waste_type, description, date_reported)
-        VALUES (?, ?, ?, ?, ?)
-    """, (user_id, location, waste_type, description, date_reported))
-    new_id = cur.lastrowid
+    CREATE TRIGGER IF NOT EXISTS reports_fts_ad AFTER DELETE ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, location, waste_type, description)
+        VALUES ('delete', old.id, old.location, old.waste_type, old.description);
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_fts_au AFTER UPDATE OF location, waste_type, description ON reports BEGIN
+        INSERT INTO reports_fts(reports_fts, rowid, location, waste_type, description)
+        VALUES ('delete', old.id, old.location, old.waste_type, old.description);
+        INSERT INTO reports_fts(rowid, location, waste_type, description)
+        VALUES (new.id, new.location, new.waste_type, new.description);
+    END
+    """)
+    if not exists:
+        cur.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
     conn.commit()
-    conn.close()
-    return new_id
 
-def get_all_reports():
+GEO_AVAILABLE = True  # cleared by initialize() when SQLite lacks the rtree module
+
+def _ensure_spatial_index(conn):
     """
-    Return rows in a shape main.py handles:
-    (id, location, waste_type, description, date_reported, username)
-    Username may be NULL/None if no user linked.
+    Create the R*Tree over report coordinates (reports_geo: a report is a
+    zero-size box at its latitude/longitude). Triggers keep it in sync with
+    reports; reports without coordinates are left out. Back-filled once on creation.
     """
-    conn = connect()
+    global GEO_AVAILABLE
     cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reports_geo'")
+    exists = cur.fetchone() is not None
+    try:
+        cur.execute("CREATE VIRTUAL TABLE IF NOT EXISTS reports_geo USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    except sqlite3.OperationalError:
+        # SQLite built without rtree: geo queries fall back to scanning reports
+        GEO_AVAILABLE = False
+        return
+    GEO_AVAILABLE = True
+
     cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_geo_ai AFTER INSERT ON reports
+    WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL BEGIN
+        INSERT INTO reports_geo VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_geo_ad AFTER DELETE ON reports BEGIN
+        DELETE FROM reports_geo WHERE id = old.id;
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_geo_au AFTER UPDATE OF latitude, longitude ON reports BEGIN
+        DELETE FROM reports_geo WHERE id = old.id;
+        INSERT INTO reports_geo
+        SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+        WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+    END
+    """)
+    if not exists:
+        cur.execute("""
+            INSERT INTO reports_geo
+            SELECT id, latitude, latitude, longitude, longitude FROM reports
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+        """)
+    conn.commit()
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, each as a prefix."""
+    terms = []
+    for word in text.split():
+        word = word.replace('"', '""')
+        terms.append(f'"{word}"*')
+    return " ".join(terms)
+
+_SEARCH_SQL = """
+    SELECT r.id,
+           r.location,
+           r.waste_type,
+           r.description,
+           {date_expr} AS date_reported,
+           u.username
+    FROM reports_fts f
+    JOIN reports r ON r.id = f.rowid
+    LEFT JOIN users u ON r.user_id = u.id
+    WHERE reports_fts MATCH ?
+    ORDER BY f.rank
+    LIMIT ? OFFSET ?
+"""
+
+def search_reports(query, limit=SEARCH_LIMIT, offset=0):
+    """
+    Ranked full-text search over location, waste type and description.
+    Each word in query is prefix-matched ("plast bea" finds "Plastic" at "Beach").
+    Returns rows in the get_all_reports shape, best match first.
+    """
+    match = _fts_query(query or "")
+    if not match:
+        return []
+    with get_connection() as conn:
+        if FTS_AVAILABLE:
+            cur = conn.execute(get_schema().search_sql, (match, limit, offset))
+        else:
+            sql, params = _search_like(get_schema(), query)
+            cur = conn.execute(sql, params + [limit, offset])
+        rows = cur.fetchall()
+    return rows
+
+def _search_like(schema, query):
+    """(sql, params) of the search fallback without FTS5: every word as a substring, newest first."""
+    where, params = [], []
+    for word in query.split():
+        where.append("(r.location LIKE ? OR r.waste_type LIKE ? OR r.description LIKE ?)")
+        params += [f"%{word}%"] * 3
+    sql = f"""
         SELECT r.id,
                r.location,
                r.waste_type,
                r.description,
-               COALESCE(r.date_reported, r.date) AS date_reported,
+               {schema.date_expr} AS date_reported,
                u.username
         FROM reports r
         LEFT JOIN users u ON r.user_id = u.id
-        ORDER BY COALESCE(r.created_at, r.id) DESC
+        WHERE {" AND ".join(where)}
+        ORDER BY r.id DESC
+        LIMIT ? OFFSET ?
+    """
+    return sql, params
+
+STATS_LIMIT = 20
+
+# Month bucket (YYYY-MM) of a report row: date_reported (M/D/YYYY) when it looks
+# like a date, else the month it was filed, else 'unknown'.
+_PERIOD_EXPR = """
+    CASE WHEN {row}.date_reported LIKE '%/%/____'
+         THEN substr({row}.date_reported, -4) || '-' ||
+              printf('%02d', CAST(substr({row}.date_reported, 1, instr({row}.date_reported, '/') - 1) AS INTEGER))
+         ELSE COALESCE(substr({row}.created_at, 1, 7), 'unknown')
+    END
+"""
+
+def _stats_bump(table, key, row, delta):
+    """Trigger SQL adding delta to the (key, period) counter for one row image (new/old)."""
+    period = _PERIOD_EXPR.format(row=row)
+    return f"""
+        INSERT INTO {table} ({key}, period, reports) VALUES (trim({row}.{key}), {period}, {delta})
+        ON CONFLICT({key}, period) DO UPDATE SET reports = reports + ({delta});
+    """
+
+def _total_bump(table, key, value, delta):
+    """Trigger SQL adding delta to the running total for one key value (an SQL expression)."""
+    return f"""
+        INSERT INTO {table} ({key}, reports) VALUES ({value}, {delta})
+        ON CONFLICT({key}) DO UPDATE SET reports = reports + ({delta});
+    """
+
+# (total table, key column, key value of a row image, columns it depends on)
+_TOTALS = (
+    ("stats_location_total", "location", "trim({row}.location)", "location"),
+    ("stats_type_total", "waste_type", "trim({row}.waste_type)", "waste_type"),
+    ("stats_period_total", "period", _PERIOD_EXPR, "date_reported, created_at"),
+)
+
+def _total_cleanup(table, key, value):
+    return f"DELETE FROM {table} WHERE reports <= 0 AND {key} = {value.format(row='old')};"
+
+def _ensure_stats_tables(conn):
+    """
+    Rollup tables: report counts per (location, month) and (waste_type, month),
+    plus running totals per location, waste type and month, kept current by
+    triggers so get_stats() never touches the reports table. Each is indexed
+    by count, so a top-N read walks N index entries and never sorts. Keys are
+    trimmed and compared case-insensitively. Back-filled once on creation.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_location_period'")
+    exists = cur.fetchone() is not None
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats_period_total'")
+    totals_exist = cur.fetchone() is not None
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS stats_location_period (
+        location TEXT COLLATE NOCASE NOT NULL,
+        period TEXT NOT NULL,
+        reports INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (location, period)
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS stats_type_period (
+        waste_type TEXT COLLATE NOCASE NOT NULL,
+        period TEXT NOT NULL,
+        reports INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (waste_type, period)
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS stats_location_total (
+        location TEXT COLLATE NOCASE PRIMARY KEY,
+        reports INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS stats_type_total (
+        waste_type TEXT COLLATE NOCASE PRIMARY KEY,
+        reports INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS stats_period_total (
+        period TEXT PRIMARY KEY,
+        reports INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    # (period, reports DESC, key) serves "top keys in one month" straight from the index;
+    # it supersedes the older single-column (period) indexes
+    cur.execute("DROP INDEX IF EXISTS idx_stats_location_period")
+    cur.execute("DROP INDEX IF EXISTS idx_stats_type_period")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stats_location_period_top "
+                "ON stats_location_period(period, reports DESC, location)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stats_type_period_top "
+                "ON stats_type_period(period, reports DESC, waste_type)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stats_location_total_top ON stats_location_total(reports DESC, location)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stats_type_total_top ON stats_type_total(reports DESC, waste_type)")
+
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS reports_stats_ai AFTER INSERT ON reports BEGIN
+        {_stats_bump("stats_location_period", "location", "new", 1)}
+        {_stats_bump("stats_type_period", "waste_type", "new", 1)}
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS reports_stats_ad AFTER DELETE ON reports BEGIN
+        {_stats_bump("stats_location_period", "location", "old", -1)}
+        {_stats_bump("stats_type_period", "waste_type", "old", -1)}
+        DELETE FROM stats_location_period WHERE reports <= 0 AND location = trim(old.location);
+        DELETE FROM stats_type_period WHERE reports <= 0 AND waste_type = trim(old.waste_type);
+    END
+    """)
+    cur.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS reports_stats_au
+    AFTER UPDATE OF location, waste_type, date_reported, created_at ON reports BEGIN
+        {_stats_bump("stats_location_period", "location", "old", -1)}
+        {_stats_bump("stats_type_period", "waste_type", "old", -1)}
+        {_stats_bump("stats_location_period", "location", "new", 1)}
+        {_stats_bump("stats_type_period", "waste_type", "new", 1)}
+        DELETE FROM stats_location_period WHERE reports <= 0 AND location = trim(old.location);
+        DELETE FROM stats_type_period WHERE reports <= 0 AND waste_type = trim(old.waste_type);
+    END
+    """)
+    # the totals have their own triggers so databases created before them need no trigger
+    # rewrite; an edit only moves a total when its key really changed (most edits keep
+    # location, type and month)
+    for table, key, value, columns in _TOTALS:
+        old, new = value.format(row="old"), value.format(row="new")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON reports BEGIN
+            {_total_bump(table, key, new, 1)}
+        END
+        """)
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON reports BEGIN
+            {_total_bump(table, key, old, -1)}
+            {_total_cleanup(table, key, value)}
+        END
+        """)
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {columns} ON reports
+        WHEN {old} IS NOT {new} COLLATE NOCASE BEGIN
+            {_total_bump(table, key, old, -1)}
+            {_total_bump(table, key, new, 1)}
+            {_total_cleanup(table, key, value)}
+        END
+        """)
+
+    if not exists:
+        period = _PERIOD_EXPR.format(row="r")
+        for table, key in (("stats_location_period", "location"), ("stats_type_period", "waste_type")):
+            cur.execute(f"""
+                INSERT INTO {table} ({key}, period, reports)
+                SELECT trim(r.{key}) COLLATE NOCASE AS k, {period} AS p, COUNT(*)
+                FROM reports r
+                GROUP BY k, p
+            """)
+    if not totals_exist:
+        # the per-month rollups are complete by now; the totals are their sums
+        cur.execute("INSERT INTO stats_location_total (location, reports) "
+                    "SELECT location, SUM(reports) FROM stats_location_period GROUP BY location")
+        cur.execute("INSERT INTO stats_type_total (waste_type, reports) "
+                    "SELECT waste_type, SUM(reports) FROM stats_type_period GROUP BY waste_type")
+        cur.execute("INSERT INTO stats_period_total (period, reports) "
+                    "SELECT period, SUM(reports) FROM stats_type_period GROUP BY period")
+    conn.commit()
+
+_STATS_TABLES = {"location": ("stats_location_total", "stats_location_period"),
+                 "waste_type": ("stats_type_total", "stats_type_period")}
+
+_STATS_TOP_SQL = "SELECT {key}, reports FROM {table} ORDER BY reports DESC, {key} LIMIT ?"
+
+_STATS_TOP_IN_PERIOD_SQL = "SELECT {key}, reports FROM {table} WHERE period = ? ORDER BY reports DESC, {key} LIMIT ?"
+
+_STATS_PERIODS_SQL = "SELECT period, reports FROM stats_period_total ORDER BY period DESC LIMIT ?"
+
+def _stats_sql(group_by, period=None):
+    if group_by == "period":
+        return _STATS_PERIODS_SQL
+    if group_by not in _STATS_TABLES:
+        raise ValueError(f"unknown group_by: {group_by!r}")
+    total, per_period = _STATS_TABLES[group_by]
+    if period:
+        return _STATS_TOP_IN_PERIOD_SQL.format(key=group_by, table=per_period)
+    return _STATS_TOP_SQL.format(key=group_by, table=total)
+
+def get_stats(group_by="location", period=None, limit=STATS_LIMIT):
+    """
+    Report counts from the rollup tables, largest first, as (key, count) rows.
+    - group_by="location" or "waste_type": totals per key, optionally for one
+      period ("YYYY-MM")
+    - group_by="period": totals per month, newest first (period is ignored)
+    Every variant reads `limit` entries off an index, however many keys,
+    months or reports there are.
+    """
+    sql = _stats_sql(group_by, period)
+    params = (period, limit) if period and group_by != "period" else (limit,)
+    with get_connection() as conn:
+        rows = conn.execute(sql, params).fetchall()
+    return rows
+
+CHANGE_LOG_KEEP = 10000  # newest change-log entries kept; a client further behind reloads in full
+
+def _ensure_change_log(conn):
+    """
+    Row-level change log for reports: every insert, update and delete appends
+    (version, report_id, op) from a trigger. AUTOINCREMENT keeps versions
+    increasing even after old entries are pruned, which happens here at startup.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS report_changes (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_id INTEGER NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('insert', 'update', 'delete'))
+    )
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_log_ai AFTER INSERT ON reports BEGIN
+        INSERT INTO report_changes (report_id, op) VALUES (new.id, 'insert');
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_log_au AFTER UPDATE ON reports BEGIN
+        INSERT INTO report_changes (report_id, op) VALUES (new.id, 'update');
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_log_ad AFTER DELETE ON reports BEGIN
+        INSERT INTO report_changes (report_id, op) VALUES (old.id, 'delete');
+    END
+    """)
+    conn.commit()
+    _prune_change_log(conn)
+
+def _prune_change_log(conn):
+    conn.execute("DELETE FROM report_changes WHERE version <= (SELECT MAX(version) FROM report_changes) - ?",
+                 (CHANGE_LOG_KEEP,))
+    conn.commit()
+
+_CHANGES_SQL = """
+    SELECT c.version,
+           c.op,
+           c.report_id,
+           r.id,
+           r.location,
+           r.waste_type,
+           r.description,
+           {date_expr} AS date_reported,
+           u.username
+    FROM report_changes c
+    LEFT JOIN reports r ON r.id = c.report_id
+    LEFT JOIN users u ON r.user_id = u.id
+    WHERE c.version > ?
+    ORDER BY c.version
+"""
+
+_CHANGE_WINDOW_SQL = "SELECT MIN(version), MAX(version) FROM report_changes"
+
+def change_version():
+    """Latest change-log version (0 when nothing has changed yet)."""
+    with get_connection() as conn:
+        row = conn.execute(_CHANGE_WINDOW_SQL).fetchone()
+    return row[1] or 0
+
+def changes_since(version):
+    """
+    Reports changed after `version`, for refreshing a view without reloading it.
+    Returns (latest_version, changes); each change is (op, report_id, row), one
+    per report in the order of its last change:
+    - "insert": new since version; row has the get_all_reports shape
+    - "update": changed since version; row is its current state
+    - "delete": gone now; row is None
+    changes is None when version is older than the retained log
+    (see CHANGE_LOG_KEEP) and the caller has to reload everything.
+    """
+    with get_connection() as conn:
+        oldest, latest = conn.execute(_CHANGE_WINDOW_SQL).fetchone()
+        if oldest is not None and version < oldest - 1:
+            return latest, None
+        rows = conn.execute(get_schema().changes_sql, (version,)).fetchall()
+
+    latest = version
+    merged, inserted = {}, set()
+    for row in rows:
+        latest, op, report_id, current = row[0], row[1], row[2], row[3:]
+        if op == "insert":
+            inserted.add(report_id)
+        merged.pop(report_id, None)  # re-added below so the order follows the last change
+        if current[0] is None:
+            # deleted by now; a row inserted and deleted since version was never seen
+            if report_id not in inserted:
+                merged[report_id] = ("delete", report_id, None)
+            continue
+        merged[report_id] = ("insert" if report_id in inserted else "update", report_id, current)
+    return latest, list(merged.values())
+
+# Near-duplicate detection (see dedup.py). DEDUP_MODE decides what a new report
+# that matches an earlier one does:
+# - "flag": it is inserted and recorded as a duplicate (get_duplicates)
+# - "merge": it is not inserted; add_report returns the earlier report's id
+#   and bulk imports reject it
+# - "off": no lookup (signatures are still stored so it can be turned on later)
+DEDUP_MODE = "flag"
+DUPLICATES_LIMIT = 200
+
+def _ensure_dedup_index(conn):
+    """
+    Dedup signatures, one row per report: blocking key (normalized location +
+    day), normalized waste type, description sketch, and the earlier report
+    it was flagged as a duplicate of. Written by the report write paths; a
+    trigger removes them with their report. Existing reports are indexed
+    (not flagged) once, on creation.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'report_signatures'")
+    exists = cur.fetchone() is not None
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS report_signatures (
+        report_id INTEGER PRIMARY KEY,
+        block_key TEXT NOT NULL,
+        waste_key TEXT NOT NULL,
+        signature BLOB NOT NULL,
+        duplicate_of INTEGER,
+        similarity REAL
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_report_signatures_block ON report_signatures(block_key, waste_key)")
+    # partial: most reports are not duplicates and never enter this index
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_report_signatures_duplicate_of ON report_signatures(duplicate_of) "
+                "WHERE duplicate_of IS NOT NULL")
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS reports_dedup_ad AFTER DELETE ON reports BEGIN
+        DELETE FROM report_signatures WHERE report_id = old.id;
+        UPDATE report_signatures SET duplicate_of = NULL, similarity = NULL WHERE duplicate_of = old.id;
+    END
+    """)
+    if not exists:
+        rows = conn.execute("""
+            SELECT id, location, waste_type, description, COALESCE(date_iso, substr(created_at, 1, 10))
+            FROM reports
+        """)
+        cur.executemany(_STORE_SIGNATURE_SQL, (
+            (report_id, *_signature(location, waste_type, description, day), None, None)
+            for report_id, location, waste_type, description, day in rows))
+    conn.commit()
+
+_CANDIDATES_SQL = "SELECT report_id, signature, duplicate_of FROM report_signatures WHERE block_key = ? AND waste_key = ?"
+
+_STORE_SIGNATURE_SQL = """
+    INSERT OR REPLACE INTO report_signatures (report_id, block_key, waste_key, signature, duplicate_of, similarity)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_CREATED_DAY_SQL = "SELECT substr(created_at, 1, 10) FROM reports WHERE id = ?"
+
+_DUPLICATES_SQL = """
+    SELECT report_id, duplicate_of, similarity
+    FROM report_signatures
+    WHERE duplicate_of IS NOT NULL
+    ORDER BY duplicate_of DESC, report_id DESC
+    LIMIT ?
+"""
+
+def _signature(location, waste_type, description, day):
+    """(block_key, waste_key, packed sketch) for one report; day is YYYY-MM-DD."""
+    return (dedup.block_key(location, day), dedup.normalize_waste_type(waste_type),
+            dedup.pack(dedup.sketch(description)))
+
+def _today():
+    # the day CURRENT_TIMESTAMP (UTC) gives created_at: undated reports are bucketed by it
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+def _matches(conn, block, waste, signature):
+    """(report_id, similarity) for every report in the block matching signature, best first."""
+    sketch = dedup.unpack(signature)
+    found = {}
+    for report_id, other, duplicate_of in conn.execute(_CANDIDATES_SQL, (block, waste)):
+        score = dedup.similarity(sketch, dedup.unpack(other))
+        if score >= dedup.THRESHOLD:
+            # point at the first report of a group, not at one of its duplicates
+            original = duplicate_of or report_id
+            found[original] = max(score, found.get(original, 0.0))
+    return sorted(found.items(), key=lambda match: (-match[1], match[0]))
+
+def _insert_report(conn, fields, sql=None, day=None):
+    """
+    Insert one report (_INSERT_REPORT fields, or those of sql) with its dedup
+    signature; undated reports are bucketed by day (default: today).
+    Returns (report_id, duplicate), duplicate being (earlier report id,
+    similarity) or None. In "merge" mode a duplicate is not inserted and
+    report_id is the earlier report's.
+    """
+    _, location, waste_type, description, _, date_iso = fields[:6]
+    block, waste, signature = _signature(location, waste_type, description, date_iso or day or _today())
+    duplicate = None
+    if DEDUP_MODE != "off":
+        matches = _matches(conn, block, waste, signature)
+        duplicate = matches[0] if matches else None
+        if duplicate and DEDUP_MODE == "merge":
+            return duplicate[0], duplicate
+    report_id = conn.execute(sql or _INSERT_REPORT, fields).lastrowid
+    conn.execute(_STORE_SIGNATURE_SQL, (report_id, block, waste, signature, *(duplicate or (None, None))))
+    return report_id, duplicate
+
+def _insert_batch(conn, schema, batch):
+    """
+    Insert (row_number, report, fields) rows with one executemany, after the
+    same dedup check _insert_report makes per row: each row is compared with
+    the database and with the earlier rows of the batch. Returns
+    (inserted_count, rejects); rejects are the "merge" mode duplicates.
+    A constraint error propagates, with part of the batch written.
+    """
+    today = _today()
+    pending = []   # (fields, block, waste, signature, duplicate) to insert
+    merged = []    # (row_number, report, original)
+    in_batch = {}  # (block, waste) -> [(sketch, original)] for pending rows
+    # a match is (0, report_id) in the database or (1, index) into pending,
+    # which sorts every stored report before the rows of this batch
+    for row_number, report, fields in batch:
+        _, location, waste_type, description, _, date_iso = fields[:6]
+        block, waste, signature = _signature(location, waste_type, description, date_iso or today)
+        sketch = dedup.unpack(signature)
+        duplicate = None
+        if DEDUP_MODE != "off":
+            found = {(0, report_id): score for report_id, score in _matches(conn, block, waste, signature)}
+            for other, original in in_batch.get((block, waste), ()):
+                score = dedup.similarity(sketch, other)
+                if score >= dedup.THRESHOLD:
+                    found[original] = max(score, found.get(original, 0.0))
+            if found:
+                duplicate = min(found.items(), key=lambda match: (-match[1], match[0]))
+            if duplicate and DEDUP_MODE == "merge":
+                merged.append((row_number, report, duplicate[0]))
+                continue
+        original = duplicate[0] if duplicate else (1, len(pending))
+        in_batch.setdefault((block, waste), []).append((sketch, original))
+        pending.append((fields, block, waste, signature, duplicate))
+
+    ids = ()
+    if pending:
+        conn.executemany(_INSERT_REPORT, [fields for fields, *_ in pending])
+        # one writer inside one transaction: AUTOINCREMENT ids come out consecutive
+        last = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        ids = range(last - len(pending) + 1, last + 1)
+
+    def report_id(match):
+        kind, value = match
+        return ids[value] if kind else value
+
+    conn.executemany(_STORE_SIGNATURE_SQL, [
+        (ids[i], block, waste, signature, *((report_id(duplicate[0]), duplicate[1]) if duplicate else (None, None)))
+        for i, (_, block, waste, signature, duplicate) in enumerate(pending)])
+    if OUTBOX_ENABLED:
+        conn.executemany(schema.journal_upsert_sql, [(i,) for i in ids])
+    return len(pending), [(row_number, report, f"duplicate of report {report_id(original)}")
+                          for row_number, report, original in merged]
+
+def find_duplicates(location, waste_type, description, date_reported=None):
+    """
+    Earlier reports a new report with these fields would duplicate, as
+    (report_id, similarity) pairs, best first; [] if none. Only reports of
+    the same normalized location, day and waste type are compared.
+    """
+    day = utils.iso_date(date_reported) or _today()
+    with get_connection() as conn:
+        return _matches(conn, *_signature(location, waste_type, description, day))
+
+def get_duplicates(limit=DUPLICATES_LIMIT):
+    """Reports flagged as near-duplicates, grouped by the report they repeat: (report_id, duplicate_of, similarity)."""
+    with get_connection() as conn:
+        cur = conn.execute(_DUPLICATES_SQL, (limit,))
+        rows = cur.fetchall()
+    return rows
+
+# Offline outbox (see sync.py). Every local report write also appends an entry
+# to the outbox journal: the report's uid and its full state after the write
+# ("upsert") or "delete". sync.py ships unacknowledged entries to a central
+# database in compressed batches; the central applies each device's entries
+# once, in order, and acknowledges the last seq applied, after which the device
+# forgets them. Sync is one-way (devices push). A database copied to set up a
+# second device shares the first one's device_id, so give each device its own
+# fresh database instead.
+OUTBOX_ENABLED = True  # off for a central database that nobody syncs onward (api.py)
+SYNC_BATCH_SIZE = 500  # outbox entries per shipped batch
+
+def _ensure_outbox(conn):
+    """
+    outbox: the journal, seq-ordered. sync_state: this database's device_id and
+    the last seq the central acknowledged. sync_peers: on a central database,
+    the last seq applied per device. reports.uid gets its unique index here.
+    Reports that predate the outbox are journaled once, on creation, so the
+    first sync ships them too.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'outbox'")
+    exists = cur.fetchone() is not None
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_reports_uid ON reports(uid)")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS outbox (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_uid TEXT NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('upsert', 'delete')),
+        payload TEXT
+    )
     """)
-    rows = cur.fetchall()
-    conn.close()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sync_state (
+        name TEXT PRIMARY KEY,
+        value
+    )
+    """)
+    cur.execute("INSERT OR IGNORE INTO sync_state (name, value) VALUES ('device_id', ?), ('acked_seq', 0)",
+                (utils.new_uid(),))
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS sync_peers (
+        device_id TEXT PRIMARY KEY,
+        acked_seq INTEGER NOT NULL,
+        synced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    if not exists and OUTBOX_ENABLED:
+        cur.execute(get_schema().journal_all_sql)
+    conn.commit()
+
+_JOURNAL_UPSERT_SQL = """
+    INSERT INTO outbox (report_uid, op, payload)
+    SELECT r.uid, 'upsert', json_object(
+               'location', r.location,
+               'waste_type', r.waste_type,
+               'description', r.description,
+               'date_reported', {date_expr},
+               'latitude', r.latitude,
+               'longitude', r.longitude,
+               'created_at', r.created_at,
+               'username', u.username)
+    FROM reports r
+    LEFT JOIN users u ON r.user_id = u.id
+"""
+
+_JOURNAL_DELETE_SQL = "INSERT INTO outbox (report_uid, op) SELECT uid, 'delete' FROM reports WHERE id = ?"
+
+_SYNC_STATE_SQL = "SELECT name, value FROM sync_state WHERE name IN ('device_id', 'acked_seq')"
+
+_OUTBOX_BATCH_SQL = "SELECT seq, report_uid, op, payload FROM outbox WHERE seq > ? ORDER BY seq LIMIT ?"
+
+_OUTBOX_PENDING_SQL = "SELECT COUNT(*) FROM outbox WHERE seq > ?"
+
+_ACK_SQL = "UPDATE sync_state SET value = MAX(value, ?) WHERE name = 'acked_seq'"
+
+_FORGET_ACKED_SQL = "DELETE FROM outbox WHERE seq <= ?"
+
+_PEER_SQL = "SELECT acked_seq FROM sync_peers WHERE device_id = ?"
+
+_SET_PEER_SQL = """
+    INSERT INTO sync_peers (device_id, acked_seq) VALUES (?, ?)
+    ON CONFLICT(device_id) DO UPDATE SET acked_seq = excluded.acked_seq, synced_at = CURRENT_TIMESTAMP
+"""
+
+_UID_SQL = "SELECT id FROM reports WHERE uid = ?"
+
+def _journal(conn, schema, report_id):
+    # after an insert or update: the report's whole current state
+    if OUTBOX_ENABLED:
+        conn.execute(schema.journal_upsert_sql, (report_id,))
+
+def _journal_delete(conn, report_id):
+    # before the delete, while the uid can still be read
+    if OUTBOX_ENABLED:
+        conn.execute(_JOURNAL_DELETE_SQL, (report_id,))
+
+def _sync_state(conn):
+    state = dict(conn.execute(_SYNC_STATE_SQL).fetchall())
+    return state["device_id"], state["acked_seq"]
+
+def outbox_status():
+    """(device_id, acked_seq, pending entry count) for this database."""
+    with get_connection() as conn:
+        device_id, acked = _sync_state(conn)
+        pending = conn.execute(_OUTBOX_PENDING_SQL, (acked,)).fetchone()[0]
+    return device_id, acked, pending
+
+def outbox_batch(limit=SYNC_BATCH_SIZE):
+    """
+    (device_id, entries): the oldest `limit` entries the central has not
+    acknowledged, as (seq, report_uid, op, payload JSON or None) tuples.
+    """
+    with get_connection() as conn:
+        device_id, acked = _sync_state(conn)
+        entries = conn.execute(_OUTBOX_BATCH_SQL, (acked, limit)).fetchall()
+    return device_id, entries
+
+def outbox_ack(seq):
+    """The central has applied every entry up to seq: forget them; the next batch starts after it."""
+    with get_connection() as conn:
+        conn.execute(_ACK_SQL, (seq,))
+        conn.execute(_FORGET_ACKED_SQL, (seq,))
+
+def _apply_upsert(conn, schema, report_uid, state):
+    location, waste_type = state["location"], state["waste_type"]
+    description, date_reported = state["description"], state["date_reported"]
+    latitude, longitude = utils.coordinates(state["latitude"], state["longitude"])
+    row = conn.execute(_UID_SQL, (report_uid,)).fetchone()
+    if row:
+        _update_report(conn, schema, row[0], location, waste_type, description, date_reported, journal=False)
+        conn.execute(_SET_COORDINATES_SQL, (latitude, longitude, row[0]))
+        return
+    # users are matched by name: ids differ between databases
+    user = conn.execute(_USER_ID_SQL, (state["username"],)).fetchone() if state["username"] else None
+    created_at = state["created_at"]
+    _insert_report(conn, (user[0] if user else None, location, waste_type, description, date_reported,
+                          utils.iso_date(date_reported), latitude, longitude, report_uid, created_at),
+                   sql=_INSERT_SYNCED_REPORT, day=created_at[:10] if created_at else None)
+
+def _apply_outbox(conn, schema, device_id, entries):
+    """
+    Apply one device's outbox entries, skipping those already applied (a
+    resent batch, or one whose acknowledgement was lost). Upserts insert the
+    report or overwrite it by uid; deletes of unknown uids are no-ops, so
+    each entry is idempotent. Returns the device's last applied seq.
+    """
+    row = conn.execute(_PEER_SQL, (device_id,)).fetchone()
+    acked = row[0] if row else 0
+    for seq, report_uid, op, payload in entries:
+        if seq <= acked:
+            continue
+        if op == "delete":
+            conn.execute("DELETE FROM reports WHERE uid = ?", (report_uid,))
+        else:
+            _apply_upsert(conn, schema, report_uid, json.loads(payload))
+        acked = seq
+    conn.execute(_SET_PEER_SQL, (device_id, acked))
+    return acked
+
+def queue_apply_outbox(device_id, entries):
+    """Queue a device's outbox batch for the next group commit; returns a Future with the acked seq."""
+    return write_queue().submit(_apply_outbox, get_schema(), device_id, entries)
+
+def connect_central(path):
+    """
+    A connection to another database file to apply_outbox to. Keep it open
+    across batches: closing the last connection to a file checkpoints its WAL.
+    """
+    conn = connect(path)
+    columns = _report_columns(conn)
+    peers = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sync_peers'").fetchone()
+    if "uid" not in columns or not peers:
+        conn.close()
+        raise sqlite3.OperationalError(f"{path} is not an initialized Oceanguard database "
+                                       f"(run: python db.py --db {path} init)")
+    return conn
+
+def apply_outbox(device_id, entries, conn=None):
+    """
+    Apply a device's outbox batch (see outbox_batch) as the central database:
+    DB_FILE, or the database conn (see connect_central) is open on. All of the
+    batch commits or none of it. Returns the last seq applied, to pass back
+    to outbox_ack.
+    """
+    if conn is None:
+        return queue_apply_outbox(device_id, entries).result()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        acked = _apply_outbox(conn, SchemaInfo(None, _report_columns(conn)), device_id, entries)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return acked
+
+# Password hashing. Stored values are "<scheme>$<params...>$<salt hex>$<hash hex>";
+# values without "$" are legacy unsalted SHA-256 and are re-hashed on the next login.
+# New hashes use PASSWORD_SCHEME with PASSWORD_PARAMS[scheme]; bench_password.py
+# reports logins/s per core for candidate settings. Changing either here upgrades
+# each user's stored hash the next time they log in.
+PASSWORD_SCHEME = "pbkdf2_sha256"
+PASSWORD_PARAMS = {
+    "pbkdf2_sha256": {"iterations": 600000},
+    "scrypt": {"n": 2 ** 14, "r": 8, "p": 1},
+}
+SALT_BYTES = 16
+# upper bounds on the cost stored with a hash: a corrupted row must not hang a login
+PASSWORD_PARAM_LIMITS = {"iterations": 10_000_000, "n": 2 ** 17, "r": 16, "p": 2}
+
+def _pbkdf2_sha256(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password, salt, iterations)
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p)
+
+# scheme -> (function, parameter names in their stored order)
+PASSWORD_HASHERS = {
+    "pbkdf2_sha256": (_pbkdf2_sha256, ("iterations",)),
+    "scrypt": (_scrypt, ("n", "r", "p")),
+}
+
+def _legacy_hash(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def hash_password(password, scheme=None, **params):
+    """Salted hash of password in the stored format; defaults to the configured scheme and cost."""
+    scheme = scheme or PASSWORD_SCHEME
+    fn, names = PASSWORD_HASHERS[scheme]
+    params = dict(PASSWORD_PARAMS[scheme], **params)
+    salt = os.urandom(SALT_BYTES)
+    digest = fn(password.encode(), salt, **params)
+    return "$".join([scheme] + [str(params[name]) for name in names] + [salt.hex(), digest.hex()])
+
+def verify_password(password, stored):
+    """
+    Check password against a stored hash. Returns (ok, needs_rehash):
+    needs_rehash is True when ok and the hash is legacy or uses other
+    settings than the current PASSWORD_SCHEME / PASSWORD_PARAMS. A corrupted
+    stored hash never matches.
+    """
+    if "$" not in stored:
+        # as bytes: compare_digest rejects str with non-ASCII characters
+        ok = hmac.compare_digest(_legacy_hash(password).encode(), stored.encode())
+        return ok, ok
+    scheme, *fields = stored.split("$")
+    fn, names = PASSWORD_HASHERS.get(scheme, (None, ()))
+    if fn is None or len(fields) != len(names) + 2:
+        return False, False
+    try:
+        params = dict(zip(names, map(int, fields[:len(names)])))
+        if not all(1 <= value <= PASSWORD_PARAM_LIMITS[name] for name, value in params.items()):
+            return False, False
+        salt = bytes.fromhex(fields[-2])
+        expected = bytes.fromhex(fields[-1])
+        # hashlib also raises ValueError for parameters it rejects (e.g. scrypt n not a power of 2)
+        digest = fn(password.encode(), salt, **params)
+    except (ValueError, OverflowError, TypeError):
+        return False, False
+    ok = hmac.compare_digest(digest, expected)
+    return ok, ok and (scheme != PASSWORD_SCHEME or params != PASSWORD_PARAMS[scheme])
+
+_dummy_hashes = {}
+
+def _dummy_hash():
+    # verified against for unknown usernames so they cost as much as a wrong password
+    key = (PASSWORD_SCHEME, tuple(sorted(PASSWORD_PARAMS[PASSWORD_SCHEME].items())))
+    if key not in _dummy_hashes:
+        _dummy_hashes[key] = hash_password("")
+    return _dummy_hashes[key]
+
+_LOGIN_SQL = "SELECT id, password FROM users WHERE username = ?"
+_REHASH_SQL = "UPDATE users SET password = ? WHERE id = ? AND password = ?"
+
+def register_user(username, password):
+    # hashed before taking a connection: the hash takes ~100 ms and must not hold a write transaction
+    hashed = hash_password(password)
+    with get_connection() as conn:
+        conn.execute("INSERT INTO users(username, password) VALUES (?, ?)", (username, hashed))
+    invalidate_usernames()
+
+def login_user(username, password):
+    """
+    User id for a correct username/password, else None. The user is found by
+    the unique username index first and the password checked in Python, with
+    no connection held while hashing. Legacy or outdated hashes are replaced
+    with a current one on success.
+    """
+    with get_connection() as conn:
+        row = conn.execute(_LOGIN_SQL, (username,)).fetchone()
+    if row is None:
+        verify_password(password, _dummy_hash())
+        return None
+
+    user_id, stored = row
+    ok, needs_rehash = verify_password(password, stored)
+    if not ok:
+        return None
+    if needs_rehash:
+        hashed = hash_password(password)
+        with get_connection() as conn:
+            # only if unchanged since it was read
+            conn.execute(_REHASH_SQL, (hashed, user_id, stored))
+    return user_id
+
+USERNAME_CACHE_SIZE = 1024
+
+class UsernameCache:
+    """
+    Bounded LRU map of user id -> username (None for ids with no user), for
+    one database file. Shared by all threads, hence the lock.
+    """
+
+    def __init__(self, path, size=USERNAME_CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self._names = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, ids):
+        """Return ({id: username} for cached ids, [ids not cached])."""
+        found, missing = {}, []
+        with self._lock:
+            for user_id in ids:
+                if user_id in self._names:
+                    self._names.move_to_end(user_id)
+                    found[user_id] = self._names[user_id]
+                    self.hits += 1
+                else:
+                    missing.append(user_id)
+                    self.misses += 1
+        return found, missing
+
+    def store(self, names):
+        with self._lock:
+            for user_id, name in names.items():
+                self._names[user_id] = name
+                self._names.move_to_end(user_id)
+            while len(self._names) > self.size:
+                self._names.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._names.clear()
+
+_usernames = None
+
+def _username_cache():
+    global _usernames
+    cache = _usernames
+    if cache is None or cache.path != DB_FILE:
+        cache = _usernames = UsernameCache(DB_FILE)
+    return cache
+
+def invalidate_usernames():
+    """Drop cached usernames; register_user calls this."""
+    _username_cache().clear()
+
+# one statement for any number of ids: they are passed as a single JSON array
+_USERNAMES_SQL = "SELECT id, username FROM users WHERE id IN (SELECT value FROM json_each(?))"
+
+def get_usernames(ids):
+    """
+    Batch username lookup: {user_id: username} for the given ids (None for
+    unknown ids). Served from an LRU cache; ids not cached cost one users
+    query in total, however many there are.
+    """
+    ids = {user_id for user_id in ids if isinstance(user_id, int)}
+    cache = _username_cache()
+    names, missing = cache.lookup(ids)
+    if missing:
+        with get_connection() as conn:
+            fetched = dict(conn.execute(_USERNAMES_SQL, (json.dumps(missing),)).fetchall())
+        fetched = {user_id: fetched.get(user_id) for user_id in missing}
+        cache.store(fetched)
+        names.update(fetched)
+    return names
+
+def cached_usernames(ids):
+    """{user_id: username} for those ids already in the cache; never queries (safe on the Tk thread)."""
+    return _username_cache().lookup({user_id for user_id in ids if isinstance(user_id, int)})[0]
+
+def resolve_usernames(rows, column=5):
+    """
+    Replace user ids in rows[column] with usernames (rows that already carry a
+    username, or None, are left alone). Costs at most one get_usernames query.
+    """
+    ids = [row[column] for row in rows if len(row) > column and isinstance(row[column], int)]
+    if not ids:
+        return rows
+    names = get_usernames(ids)
+    return [row[:column] + (names.get(row[column]),) + tuple(row[column + 1:])
+            if len(row) > column and isinstance(row[column], int) else row
+            for row in rows]
+
+def _add_report(conn, location, waste_type, description, date_reported, user_id, latitude=None, longitude=None):
+    # store None for empty dates
+    if not date_reported or str(date_reported).strip() == "":
+        date_reported = None
+    latitude, longitude = utils.coordinates(latitude, longitude)
+    report_id, duplicate = _insert_report(conn, (user_id, location, waste_type, description, date_reported,
+                                                 utils.iso_date(date_reported), latitude, longitude,
+                                                 utils.new_uid()))
+    if not (duplicate and DEDUP_MODE == "merge"):
+        _journal(conn, get_schema(), report_id)
+    return report_id
+
+def queue_add_report(location, waste_type, description, date_reported, user_id, latitude=None, longitude=None):
+    """Queue an insert for the next group commit; returns a Future with the new id."""
+    return write_queue().submit(_add_report, location, waste_type, description, date_reported, user_id,
+                                latitude, longitude)
+
+def add_report(location, waste_type, description, date_reported, user_id, latitude=None, longitude=None):
+    """
+    Insert a report (group-committed with concurrent writes); returns its id.
+    latitude/longitude are optional but must be given together (ValueError otherwise).
+    A near-duplicate of an earlier report is flagged, or with DEDUP_MODE "merge"
+    not inserted, in which case the earlier report's id is returned.
+    """
+    return queue_add_report(location, waste_type, description, date_reported, user_id,
+                            latitude, longitude).result()
+
+def add_reports(reports):
+    """
+    add_report for several (location, waste_type, description, date_reported, user_id
+    [, latitude, longitude]) tuples in one transaction; returns the new ids in
+    order. Nothing is inserted if any row fails.
+    """
+    with get_connection() as conn:
+        return [_add_report(conn, *report) for report in reports]
+
+def get_all_reports():
+    """
+    Return rows in a shape main.py handles:
+    (id, location, waste_type, description, date_reported, username)
+    Username may be NULL/None if no user linked.
+    """
+    with get_connection() as conn:
+        cur = conn.execute(get_schema().all_reports_sql)
+        rows = cur.fetchall()
     return rows
 
+PAGE_SIZE = 200
+
+_PAGE_SELECT = """
+    SELECT r.id,
+           r.location,
+           r.waste_type,
+           r.description,
+           {date_expr} AS date_reported,
+           u.username,
+           r.created_at
+    FROM reports r
+    LEFT JOIN users u ON r.user_id = u.id
+"""
+
+_PAGE_FIRST_SQL = _PAGE_SELECT + """
+    WHERE r.created_at IS NOT NULL
+    ORDER BY r.created_at DESC, r.id DESC
+    LIMIT ?
+"""
+
+_PAGE_AFTER_SQL = _PAGE_SELECT + """
+    WHERE (r.created_at, r.id) < (?, ?)
+    ORDER BY r.created_at DESC, r.id DESC
+    LIMIT ?
+"""
+
+_PAGE_TAIL_FIRST_SQL = _PAGE_SELECT + """
+    WHERE r.created_at IS NULL
+    ORDER BY r.id DESC
+    LIMIT ?
+"""
+
+_PAGE_TAIL_AFTER_SQL = _PAGE_SELECT + """
+    WHERE r.created_at IS NULL AND r.id < ?
+    ORDER BY r.id DESC
+    LIMIT ?
+"""
+
+def get_reports_page(cursor=None, limit=PAGE_SIZE):
+    """
+    Keyset-paginated listing, newest first (created_at DESC, id DESC).
+    Returns (rows, next_cursor) where rows have the get_all_reports shape
+    (id, location, waste_type, description, date_reported, username) and
+    next_cursor is None once the last page has been returned.
+    Pass the previous next_cursor back in to fetch the following page.
+    Legacy rows without created_at are listed after all timestamped rows.
+    """
+    rows = []
+    schema = get_schema()
+    with get_connection() as conn:
+        if cursor is None:
+            rows = conn.execute(schema.page_first_sql, (limit,)).fetchall()
+        elif cursor[0] is not None:
+            rows = conn.execute(schema.page_after_sql, (cursor[0], cursor[1], limit)).fetchall()
+
+        # continue into the untimestamped (legacy) tail once the timestamped rows run out
+        if len(rows) < limit:
+            last_id = cursor[1] if cursor is not None and cursor[0] is None else None
+            if last_id is None:
+                rows += conn.execute(schema.page_tail_first_sql, (limit - len(rows),)).fetchall()
+            else:
+                rows += conn.execute(schema.page_tail_after_sql, (last_id, limit - len(rows))).fetchall()
+
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = (rows[-1][6], rows[-1][0])
+    return [row[:6] for row in rows], next_cursor
+
 def get_report(report_id):
     """
     Return a single report in a shape main.py expects:
     (id, location, waste_type, description, date_reported, username?)
     """
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("""
+    with get_connection() as conn:
+        cur = conn.execute(get_schema().get_report_sql, (report_id,))
+        row = cur.fetchone()
+    return row
+
+def _update_report(conn, schema, report_id, location, waste_type, description, date_reported, journal=True):
+    if not date_reported or str(date_reported).strip() == "":
+        date_reported = None
+    # Update both date_reported and legacy date if exists to keep compatibility
+    cur = conn.execute(schema.update_report_sql,
+                       schema.update_params(report_id, location, waste_type, description, date_reported))
+    if cur.rowcount:
+        # re-sign the edited report; an edit is a deliberate correction, so its duplicate flag is dropped
+        day = utils.iso_date(date_reported) or conn.execute(_CREATED_DAY_SQL, (report_id,)).fetchone()[0]
+        conn.execute(_STORE_SIGNATURE_SQL, (report_id, *_signature(location, waste_type, description, day),
+                                            None, None))
+        if journal:
+            _journal(conn, schema, report_id)
+    return cur.rowcount
+
+def queue_update_report(report_id, location, waste_type, description, date_reported):
+    """Queue an update for the next group commit; returns a Future with the rows changed."""
+    return write_queue().submit(_update_report, get_schema(), report_id, location, waste_type,
+                                description, date_reported)
+
+_BETWEEN_SQL = """
+    SELECT r.id,
+           r.location,
+           r.waste_type,
+           r.description,
+           {date_expr} AS date_reported,
+           u.username
+    FROM reports r
+    LEFT JOIN users u ON r.user_id = u.id
+    WHERE r.date_iso BETWEEN ? AND ?
+    ORDER BY r.date_iso, r.id
+    LIMIT ?
+"""
+
+def get_reports_between(start, end, limit=None):
+    """
+    Reports whose date falls in [start, end] (inclusive), oldest date first, in
+    the get_all_reports shape. start/end may be date objects, 'YYYY-MM-DD' or
+    'MM/DD/YYYY'. Served by an index seek on date_iso; reports without a
+    valid date are never included.
+    """
+    with get_connection() as conn:
+        cur = conn.execute(get_schema().between_sql,
+                           (_to_iso_date(start), _to_iso_date(end), -1 if limit is None else limit))
+        rows = cur.fetchall()
+    return rows
+
+def update_report(report_id, location, waste_type, description, date_reported):
+    """Returns the number of rows changed (0 when report_id does not exist)."""
+    return queue_update_report(report_id, location, waste_type, description, date_reported).result()
+
+_DELETE_REPORT_SQL = "DELETE FROM reports WHERE id = ?"
+
+def _delete_report(conn, report_id):
+    _journal_delete(conn, report_id)
+    return conn.execute(_DELETE_REPORT_SQL, (report_id,)).rowcount
+
+def queue_delete_report(report_id):
+    """Queue a delete for the next group commit; returns a Future with the rows deleted."""
+    return write_queue().submit(_delete_report, report_id)
+
+def delete_report(report_id):
+    """Returns the number of rows deleted (0 when report_id does not exist)."""
+    return queue_delete_report(report_id).result()
+
+_SET_COORDINATES_SQL = "UPDATE reports SET latitude = ?, longitude = ? WHERE id = ?"
+
+def _set_report_coordinates(conn, report_id, latitude, longitude):
+    latitude, longitude = utils.coordinates(latitude, longitude)
+    changed = conn.execute(_SET_COORDINATES_SQL, (latitude, longitude, report_id)).rowcount
+    if changed:
+        _journal(conn, get_schema(), report_id)
+    return changed
+
+def queue_set_report_coordinates(report_id, latitude, longitude):
+    """Queue a coordinates change for the next group commit; returns a Future with the rows changed."""
+    return write_queue().submit(_set_report_coordinates, report_id, latitude, longitude)
+
+def set_report_coordinates(report_id, latitude, longitude):
+    """Set a report's coordinates (None, None clears them); returns the rows changed."""
+    return queue_set_report_coordinates(report_id, latitude, longitude).result()
+
+EARTH_RADIUS_KM = 6371.0088
+NEAREST_START_KM = 5.0  # first search radius of nearest_reports; grows fourfold until enough are found
+
+_GEO_SELECT = """
+    SELECT r.id,
+           r.location,
+           r.waste_type,
+           r.description,
+           {date_expr} AS date_reported,
+           u.username,
+           r.latitude,
+           r.longitude
+"""
+
+# The R*Tree stores 32-bit floats rounded outwards, so its boxes only narrow
+# the candidates; the exact test is on the reports columns.
+_GEO_INDEX_SQL = _GEO_SELECT + """
+    FROM reports_geo g
+    JOIN reports r ON r.id = g.id
+    LEFT JOIN users u ON r.user_id = u.id
+    WHERE g.max_lat >= :south AND g.min_lat <= :north
+      AND g.max_lon >= :west AND g.min_lon <= :east
+      AND r.latitude BETWEEN :south AND :north
+      AND r.longitude BETWEEN :west AND :east
+"""
+
+# Fallback without rtree (and the baseline bench_geo.py compares against)
+_GEO_SCAN_SQL = _GEO_SELECT + """
+    FROM reports r
+    LEFT JOIN users u ON r.user_id = u.id
+    WHERE r.latitude BETWEEN :south AND :north
+      AND r.longitude BETWEEN :west AND :east
+"""
+
+def _haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km between two points given in degrees."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def _circle_bbox(latitude, longitude, radius_km):
+    """(south, west, north, east) around a circle; west > east when it crosses the antimeridian."""
+    angle = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angle)
+    north = latitude + math.degrees(angle)
+    if south <= -90 or north >= 90:
+        # a pole is inside the circle: every longitude
+        return max(south, -90.0), -180.0, min(north, 90.0), 180.0
+    dlon = math.degrees(math.asin(min(1.0, math.sin(angle) / math.cos(math.radians(latitude)))))
+    west, east = longitude - dlon, longitude + dlon
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    return south, west, north, east
+
+def _geo_rows(conn, sql, south, west, north, east):
+    """Rows (get_all_reports fields + latitude, longitude) inside a box, split at the antimeridian."""
+    spans = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+    rows, seen = [], set()
+    for lo, hi in spans:
+        for row in conn.execute(sql, {"south": south, "north": north, "west": lo, "east": hi}):
+            if row[0] not in seen:
+                seen.add(row[0])
+                rows.append(row)
+    return rows
+
+def _geo_sql(schema):
+    return schema.geo_sql if GEO_AVAILABLE else schema.geo_scan_sql
+
+def _within(conn, sql, latitude, longitude, radius_km):
+    hits = []
+    for row in _geo_rows(conn, sql, *_circle_bbox(latitude, longitude, radius_km)):
+        distance = _haversine_km(latitude, longitude, row[6], row[7])
+        if distance <= radius_km:
+            hits.append(row[:6] + (distance,))
+    hits.sort(key=lambda row: (row[6], row[0]))
+    return hits
+
+def _center(latitude, longitude):
+    latitude, longitude = utils.coordinates(latitude, longitude)
+    if latitude is None:
+        raise ValueError("a latitude and longitude are required")
+    return latitude, longitude
+
+def get_reports_in_bbox(south, west, north, east, limit=None):
+    """
+    Reports whose coordinates fall inside the box (edges included), newest
+    first, in the get_all_reports shape. west > east means the box crosses
+    the antimeridian. Served by the reports_geo R*Tree.
+    """
+    schema = get_schema()
+    with get_connection() as conn:
+        rows = _geo_rows(conn, _geo_sql(schema), south, west, north, east)
+    rows.sort(key=lambda row: row[0], reverse=True)
+    return [row[:6] for row in rows[:limit]]
+
+def get_reports_within(latitude, longitude, radius_km, limit=None):
+    """
+    Reports within radius_km (great-circle distance) of a point, nearest
+    first, as get_all_reports rows with distance_km appended. The R*Tree
+    narrows the search to the circle's bounding box; exact distances are
+    computed only for those candidates.
+    """
+    latitude, longitude = _center(latitude, longitude)
+    if radius_km < 0:
+        raise ValueError("radius_km must not be negative")
+    schema = get_schema()
+    with get_connection() as conn:
+        rows = _within(conn, _geo_sql(schema), latitude, longitude, radius_km)
+    return rows[:limit]
+
+def nearest_reports(latitude, longitude, n=10):
+    """
+    The n reports nearest to a point, as get_reports_within rows. Searches a
+    circle that starts at NEAREST_START_KM and grows fourfold until it holds
+    n reports (or covers the globe), so each step is one small index probe.
+    """
+    latitude, longitude = _center(latitude, longitude)
+    schema = get_schema()
+    sql = _geo_sql(schema)
+    radius = NEAREST_START_KM
+    with get_connection() as conn:
+        while True:
+            rows = _within(conn, sql, latitude, longitude, radius)
+            if len(rows) >= n or radius >= math.pi * EARTH_RADIUS_KM:
+                return rows[:n]
+            radius *= 4
+
+
+EXPORT_CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = ("id", "location", "waste_type", "description", "date_reported",
+                  "username", "user_id", "created_at")
+
+def _to_iso_date(value):
+    """Accept a date/datetime, 'YYYY-MM-DD' or 'MM/DD/YYYY' and return 'YYYY-MM-DD'."""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    value = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    raise ValueError(f"unrecognised date: {value!r} (use YYYY-MM-DD or MM/DD/YYYY)")
+
+def _export_sql(schema, since_id=None, date_from=None, date_to=None, username=None, waste_type=None):
+    """
+    (sql, params) for iter_reports. Rows come in id order, except for a
+    date-range-only export: the date index serves both filter and order then,
+    so those come in (date, id) order. Bad dates raise ValueError here.
+    """
+    where, params = [], []
+    if since_id is not None:
+        where.append("r.id > ?")
+        params.append(int(since_id))
+    if date_from is not None:
+        where.append("r.date_iso >= ?")
+        params.append(_to_iso_date(date_from))
+    if date_to is not None:
+        where.append("r.date_iso <= ?")
+        params.append(_to_iso_date(date_to))
+    if username is not None:
+        where.append("u.username = ?")
+        params.append(username)
+    if waste_type is not None:
+        # NOCASE on the column side, like idx_reports_waste_type_nocase
+        where.append("r.waste_type COLLATE NOCASE = ?")
+        params.append(waste_type)
+    # with a user or waste type, the (user_id) / (waste_type) index walks rows in id order
+    by_date = (date_from is not None or date_to is not None) and username is None and waste_type is None
+
+    sql = f"""
         SELECT r.id,
                r.location,
                r.waste_type,
                r.description,
-               COALESCE(r.date_reported, r.date) AS date_reported,
-               u.username
+               {schema.date_expr} AS date_reported,
+               u.username,
+               r.user_id,
+               r.created_at
         FROM reports r
         LEFT JOIN users u ON r.user_id = u.id
-        WHERE r.id = ?
-    """, (report_id,))
-    row = cur.fetchone()
-    conn.close()
-    return row
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {"r.date_iso, r.id" if by_date else "r.id"}
+    """
+    return sql, params
 
-def update_report(report_id, location, waste_type, description, date_reported):
-    if not date_reported or str(date_reported).strip() == "":
-        date_reported = None
-    conn = connect()
-    cur = conn.cursor()
-    # Update both date_reported and legacy date if exists to keep compatibility
-    cur.execute("PRAGMA table_info(reports)")
-    colnames = [c[1] for c in cur.fetchall()]
-    if "date" in colnames:
-        cur.execute("""
-            UPDATE reports
-            SET location = ?, waste_type = ?, description = ?, date_reported = ?, date = ?
-            WHERE id = ?
-        """, (location, waste_type, description, date_reported, date_reported, report_id))
+def iter_reports(since_id=None, date_from=None, date_to=None, username=None, waste_type=None,
+                 chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream reports as EXPORT_COLUMNS tuples, chunk_size rows per fetchmany,
+    so memory stays flat however many rows match. Rows come in id order,
+    or in (date_reported, id) order when only a date range is given.
+    - since_id: only rows with id > since_id (resume / incremental export)
+    - date_from / date_to: inclusive range on date_reported
+    - username, waste_type: exact matches (waste_type ignores case)
+    Filters are checked right away (ValueError for a bad date), before any
+    row is read. The returned generator holds one pooled connection until it
+    is exhausted or closed.
+    """
+    sql, params = _export_sql(get_schema(), since_id, date_from, date_to, username, waste_type)
+    return _stream_rows(sql, params, chunk_size)
+
+def _stream_rows(sql, params, chunk_size):
+    with get_connection() as conn:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+        cur.close()
+
+BULK_BATCH_SIZE = 1000
+
+_INSERT_REPORT = """
+    INSERT INTO reports (user_id, location, waste_type, description, date_reported, date_iso, latitude, longitude, uid)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# a report from another device's outbox keeps its uid and creation time
+_INSERT_SYNCED_REPORT = """
+    INSERT INTO reports (user_id, location, waste_type, description, date_reported, date_iso, latitude, longitude,
+                         uid, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _report_fields(report, user_id):
+    """
+    Accept a dict (e.g. a csv.DictReader row) or a
+    (location, waste_type, description, date[, user_id[, latitude, longitude]]) sequence.
+    """
+    if isinstance(report, dict):
+        location = report.get("location")
+        waste_type = report.get("waste_type")
+        description = report.get("description")
+        date_reported = report.get("date_reported", report.get("date"))
+        row_user = report.get("user_id")
+        latitude, longitude = report.get("latitude"), report.get("longitude")
     else:
-        cur.execute("""
-            UPDATE reports
-            SET location = ?, waste_type = ?, description = ?, date_reported = ?
-            WHERE id = ?
-        """, (location, waste_type, description, date_reported, report_id))
-    conn.commit()
-    conn.close()
+        location, waste_type, description, date_reported, row_user, latitude, longitude = \
+            (list(report) + [None] * 7)[:7]
+    location = (location or "").strip()
+    waste_type = (waste_type or "").strip()
+    date_reported = (date_reported or "").strip() or None
+    if row_user in (None, ""):
+        row_user = user_id
+    latitude, longitude = utils.coordinates(latitude, longitude)
+    return (row_user, location, waste_type, description, date_reported, utils.iso_date(date_reported),
+            latitude, longitude, utils.new_uid())
 
-def delete_report(report_id):
-    conn = connect()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM reports WHERE id = ?", (report_id,))
-    conn.commit()
-    conn.close()
\ No newline at end of file
+def bulk_add_reports(reports, user_id=None, batch_size=BULK_BATCH_SIZE, on_reject=None):
+    """
+    Insert many reports quickly:
+    - reports may be any iterable/generator; it is consumed batch_size rows at a time
+    - each batch is checked with utils.validate_batch; failures are rejected, not fatal
+    - each row is checked for near-duplicates against the database, including
+      earlier rows of the same import (see DEDUP_MODE); in "merge" mode a
+      duplicate is rejected as "duplicate of report N"
+    - the rest of each batch is inserted with executemany in one transaction
+      (one commit per batch); if a row hits a constraint error the batch is
+      retried row by row, that row rejected and the others kept
+    Rejects are (row_number, report, reason) with 1-based row numbers, in input
+    order. They are passed to on_reject if given, otherwise collected and returned.
+    Returns (inserted_count, rejects).
+    """
+    inserted = 0
+    rejects = []
+    if on_reject is None:
+        on_reject = lambda row_number, report, reason: rejects.append((row_number, report, reason))
+
+    numbered = enumerate(reports, start=1)
+    schema = get_schema()
+    with get_connection() as conn:
+        while True:
+            chunk = list(islice(numbered, batch_size))
+            if not chunk:
+                break
+            parsed = []
+            for row_number, report in chunk:
+                try:
+                    parsed.append(_report_fields(report, user_id))
+                except Exception as e:
+                    parsed.append(f"malformed row: {e}")
+            valid = [fields for fields in parsed if not isinstance(fields, str)]
+            reasons = iter(utils.validate_batch([fields[1] for fields in valid], [fields[2] for fields in valid],
+                                                [fields[4] for fields in valid])[1])
+            batch = []
+            batch_rejects = []
+            for (row_number, report), fields in zip(chunk, parsed):
+                reason = fields if isinstance(fields, str) else utils.REASON_MESSAGES.get(next(reasons))
+                if reason is not None:
+                    batch_rejects.append((row_number, report, reason))
+                else:
+                    batch.append((row_number, report, fields))
+
+            try:
+                count, duplicates = _insert_batch(conn, schema, batch)
+            except sqlite3.DatabaseError:
+                conn.rollback()
+                count, duplicates = 0, []
+                for row_number, report, fields in batch:
+                    try:
+                        report_id, duplicate = _insert_report(conn, fields)
+                    except sqlite3.DatabaseError as e:
+                        duplicates.append((row_number, report, str(e)))
+                        continue
+                    if duplicate and DEDUP_MODE == "merge":
+                        duplicates.append((row_number, report, f"duplicate of report {report_id}"))
+                    else:
+                        _journal(conn, schema, report_id)
+                        count += 1
+            conn.commit()
+            inserted += count
+            if duplicates:
+                batch_rejects = sorted(batch_rejects + duplicates, key=lambda reject: reject[0])
+            for reject in batch_rejects:
+                on_reject(*reject)
+    return inserted, rejects
+
+def import_csv(path, user_id=None, batch_size=BULK_BATCH_SIZE, on_reject=None):
+    """Stream a CSV file (header: location, waste_type, description, date_reported) into bulk_add_reports."""
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        import csv
+        reader = csv.DictReader(fh)
+        reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames or []]
+        return bulk_add_reports(reader, user_id=user_id, batch_size=batch_size, on_reject=on_reject)
+
+_USER_ID_SQL = "SELECT id FROM users WHERE username = ?"
+
+def _cmd_import_csv(args):
+    user_id = None
+    if args.user:
+        with get_connection() as conn:
+            row = conn.execute(_USER_ID_SQL, (args.user,)).fetchone()
+        if not row:
+            print(f"unknown user: {args.user}", file=sys.stderr)
+            return 1
+        user_id = row[0]
+
+    def report_reject(row_number, report, reason):
+        # data rows start on line 2 of the file, after the header
+        print(f"row {row_number + 1}: {reason}", file=sys.stderr)
+
+    start = time.perf_counter()
+    inserted, _ = import_csv(args.csv_file, user_id=user_id, batch_size=args.batch_size, on_reject=report_reject)
+    elapsed = time.perf_counter() - start
+    rate = inserted / elapsed if elapsed else 0.0
+    print(f"imported {inserted} reports in {elapsed:.2f}s ({rate:.0f} rows/s)")
+    return 0
+
+# Statements that read every row by design. check_query_plans() accepts a table
+# scan in these, never a temp B-tree sort.
+EXPECTED_SCANS = {
+    "iter_reports/all": "an unfiltered export reads every report, in rowid order",
+    "search_reports/like-fallback": "LIKE '%word%' cannot use an index (only runs when SQLite lacks fts5)",
+    "get_reports_in_bbox/scan-fallback": "the no-rtree fallback and bench_geo.py baseline",
+}
+
+def planned_queries(schema):
+    """
+    Every query db.py runs for this schema, with representative parameters.
+    check_query_plans() fails if any of them scans a whole table (unless listed
+    in EXPECTED_SCANS) or sorts in a temp B-tree.
+    """
+    like_sql, like_params = _search_like(schema, "beach plastic")
+    export = [
+        ("all", {}),
+        ("since", {"since_id": 1}),
+        ("dates", {"date_from": "2025-01-01", "date_to": "2025-03-31"}),
+        ("dates-since", {"since_id": 1, "date_from": "2025-01-01"}),
+        ("user", {"username": "user"}),
+        ("user-dates", {"username": "user", "date_from": "2025-01-01", "date_to": "2025-03-31"}),
+        ("waste_type", {"waste_type": "plastic"}),
+        ("waste_type-dates", {"waste_type": "plastic", "date_from": "2025-01-01"}),
+        ("user-waste_type-since", {"username": "user", "waste_type": "plastic", "since_id": 1}),
+    ]
+    return [
+        ("login_user", _LOGIN_SQL, ("user",)),
+        ("login_user/rehash", _REHASH_SQL, ("hash", 1, "hash")),
+        ("get_all_reports", schema.all_reports_sql, ()),
+        ("get_reports_page/first", schema.page_first_sql, (PAGE_SIZE,)),
+        ("get_reports_page/after", schema.page_after_sql, ("2025-01-01 00:00:00", 1, PAGE_SIZE)),
+        ("get_reports_page/tail", schema.page_tail_first_sql, (PAGE_SIZE,)),
+        ("get_reports_page/tail-after", schema.page_tail_after_sql, (1, PAGE_SIZE)),
+        ("search_reports", schema.search_sql, ('"beach"*', SEARCH_LIMIT, 0)),
+        ("search_reports/like-fallback", like_sql, like_params + [SEARCH_LIMIT, 0]),
+        ("get_report", schema.get_report_sql, (1,)),
+        ("get_reports_between", schema.between_sql, ("2025-01-01", "2025-03-31", PAGE_SIZE)),
+        ("get_reports_in_bbox", schema.geo_sql, {"south": 14.0, "north": 15.0, "west": 120.0, "east": 121.0}),
+        ("get_reports_in_bbox/scan-fallback", schema.geo_scan_sql,
+         {"south": 14.0, "north": 15.0, "west": 120.0, "east": 121.0}),
+        ("set_report_coordinates", _SET_COORDINATES_SQL, (14.5, 120.9, 1)),
+        ("dedup/candidates", _CANDIDATES_SQL, ("beach manila|2025-01-01", "plastic")),
+        ("dedup/created-day", _CREATED_DAY_SQL, (1,)),
+        ("get_duplicates", _DUPLICATES_SQL, (DUPLICATES_LIMIT,)),
+        ("update_report", schema.update_report_sql, schema.update_params(1, "", "", "", None)),
+        ("delete_report", _DELETE_REPORT_SQL, (1,)),
+        ("changes_since", schema.changes_sql, (0,)),
+        ("import-csv/user", _USER_ID_SQL, ("user",)),
+        ("get_usernames", _USERNAMES_SQL, ("[1, 2, 3]",)),
+        ("get_stats/location", _stats_sql("location"), (STATS_LIMIT,)),
+        ("get_stats/location-in-period", _stats_sql("location", "2025-01"), ("2025-01", STATS_LIMIT)),
+        ("get_stats/waste_type", _stats_sql("waste_type"), (STATS_LIMIT,)),
+        ("get_stats/waste_type-in-period", _stats_sql("waste_type", "2025-01"), ("2025-01", STATS_LIMIT)),
+        ("get_stats/period", _stats_sql("period"), (STATS_LIMIT,)),
+        ("outbox/journal", schema.journal_upsert_sql, (1,)),
+        ("outbox/journal-delete", _JOURNAL_DELETE_SQL, (1,)),
+        ("outbox_batch", _OUTBOX_BATCH_SQL, (0, SYNC_BATCH_SIZE)),
+        ("outbox_ack", _FORGET_ACKED_SQL, (0,)),
+        ("apply_outbox/uid", _UID_SQL, ("01J0000000000000000000000",)),
+        ("apply_outbox/peer", _PEER_SQL, ("device",)),
+    ] + [(f"iter_reports/{name}", *_export_sql(schema, **filters)) for name, filters in export]
+
+def explain(conn, sql, params=()):
+    """Return the EXPLAIN QUERY PLAN detail lines for one statement."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def _plan_problems(plan, scan_ok=False):
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN ") and "USING" not in detail and "VIRTUAL TABLE" not in detail and not scan_ok:
+            problems.append(f"full table scan: {detail}")
+        if "USE TEMP B-TREE" in detail:
+            problems.append(f"temp sort: {detail}")
+    return problems
+
+def check_query_plans():
+    """
+    Run EXPLAIN QUERY PLAN on every planned_queries() entry against DB_FILE.
+    Returns a list of (name, status, details): status is "ok", "fail" (details
+    are the problems) or "skip" (the statement does not apply to this schema).
+    The details of an EXPECTED_SCANS entry start with why its scan is fine.
+    """
+    results = []
+    queries = planned_queries(get_schema())
+    with get_connection() as conn:
+        for name, sql, params in queries:
+            try:
+                plan = explain(conn, sql, params)
+            except sqlite3.OperationalError as e:
+                results.append((name, "skip", [str(e)]))
+                continue
+            reason = EXPECTED_SCANS.get(name)
+            problems = _plan_problems(plan, scan_ok=reason is not None)
+            if problems:
+                results.append((name, "fail", problems))
+            else:
+                results.append((name, "ok", ([f"expected scan: {reason}"] if reason else []) + plan))
+    return results
+
+def _cmd_check_plans(args):
+    failed = 0
+    for name, status, details in check_query_plans():
+        print(f"{status.upper():4}  {name}")
+        for detail in details:
+            print(f"      {detail}")
+        failed += status == "fail"
+    return 1 if failed else 0
+
+def diagnose(path=None, out=sys.stdout):
+    """
+    Print what is in a database file: path, reports columns, row count and a
+    few sample rows. Opens the file read-only and never migrates it.
+    """
+    db_path = os.path.abspath(path or DB_FILE)
+    print("Using DB file:", path or DB_FILE, file=out)
+    print("DB absolute path:", db_path, file=out)
+    if not os.path.exists(db_path):
+        print("database file does not exist", file=out)
+        return
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        cols = _report_columns(conn)
+        print("reports table columns:", cols, file=out)
+        try:
+            print("reports row count:", conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0], file=out)
+        except Exception as e:
+            print("COUNT query failed:", e, file=out)
+        try:
+            date_expr = "COALESCE(date_reported, date)" if "date" in cols else "date_reported"
+            rows = conn.execute(f"SELECT id, location, waste_type, description, {date_expr}, user_id "
+                                "FROM reports LIMIT 10").fetchall()
+            print("sample rows (up to 10):", file=out)
+            for r in rows:
+                print(r, file=out)
+        except Exception as e:
+            print("SELECT sample failed:", e, file=out)
+    finally:
+        conn.close()
+
+def _cmd_diagnose(args):
+    diagnose(args.db)
+    return 0
+
+def main(argv=None):
+    global DB_FILE
+    import argparse
+    parser = argparse.ArgumentParser(prog="db.py", description="Oceanguard data layer tools")
+    parser.add_argument("--db", default=DB_FILE, help="database file (default: %(default)s)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("init", help="create or migrate the database and exit (e.g. a new central database for sync.py)")
+    p.set_defaults(func=lambda args: 0)
+
+    p = sub.add_parser("import-csv", help="bulk-load reports from a CSV file")
+    p.add_argument("csv_file")
+    p.add_argument("--user", help="username to attribute rows without a user_id column to")
+    p.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE)
+    p.set_defaults(func=_cmd_import_csv)
+
+    p = sub.add_parser("check-plans", help="fail if any query plan regresses to a full scan or temp sort")
+    p.set_defaults(func=_cmd_check_plans)
+
+    p = sub.add_parser("diagnose", help="print columns, row count and sample rows (read-only)")
+    p.set_defaults(func=_cmd_diagnose, initialize=False)
+
+    args = parser.parse_args(argv)
+    DB_FILE = args.db
+    if getattr(args, "initialize", True):
+        initialize()
+    try:
+        return args.func(args)
+    finally:
+        close_pool()
+
+if __name__ == "__main__":
+    sys.exit(main())
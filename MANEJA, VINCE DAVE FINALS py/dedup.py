@@ -0,0 +1,96 @@
+# dedup.py
+"""
+Near-duplicate detection helpers: volunteers often file the same pile of
+debris at the same beach on the same day in slightly different words.
+- normalize_location / normalize_waste_type: casefolded, accent- and
+  punctuation-free, order-independent keys ("Manila Bay, Beach" ==
+  "beach manila bay")
+- block_key: normalized location + day; only reports in the same block
+  (and of the same normalized waste type) are ever compared
+- sketch / similarity: a bottom-k MinHash over the character trigrams of
+  the description's words, estimating Jaccard similarity in O(k)
+db.py stores one sketch per report and looks candidates up by block.
+"""
+import hashlib
+import re
+import unicodedata
+from array import array
+from functools import lru_cache
+
+SKETCH_SIZE = 32         # hashes kept per description (bottom-k MinHash)
+THRESHOLD = 0.5          # estimated Jaccard at or above which two descriptions match
+STOPWORDS = frozenset("a an and at by in near of on the to with".split())
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text):
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return [w for w in _WORD_RE.findall(text.casefold()) if w not in STOPWORDS]
+
+
+@lru_cache(maxsize=4096)
+def normalize_location(location):
+    return " ".join(sorted(set(_words(location))))
+
+
+def _singular(word):
+    if word.endswith(("sses", "xes", "ches", "shes")):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=256)
+def normalize_waste_type(waste_type):
+    # "Plastics" and "plastic" (or "Glasses" and "glass") are the same category
+    return " ".join(sorted({_singular(w) for w in _words(waste_type)}))
+
+
+def block_key(location, day):
+    """Blocking key for a report: normalized location and its day (YYYY-MM-DD)."""
+    return f"{normalize_location(location)}|{day}"
+
+
+@lru_cache(maxsize=65536)
+def _hash(shingle):
+    # descriptions share a small trigram vocabulary, so nearly every call is a cache hit
+    return int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "little")
+
+
+def sketch(description):
+    """
+    Bottom-k MinHash of a description: the SKETCH_SIZE smallest 64-bit hashes
+    of its shingles (trigrams of each word padded with spaces, so word order
+    does not matter and a typo only changes a few shingles). Empty for a
+    blank description.
+    """
+    shingles = set()
+    for word in _words(description):
+        padded = f" {word} "
+        shingles.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return tuple(sorted(_hash(s) for s in shingles)[:SKETCH_SIZE])
+
+
+def similarity(a, b):
+    """
+    Estimated Jaccard similarity of two sketches: the share of the union's
+    k smallest hashes that both contain. Exact when both shingle sets have
+    fewer than SKETCH_SIZE shingles. Two blank descriptions count as equal.
+    """
+    if not a or not b:
+        return 1.0 if not a and not b else 0.0
+    union = sorted(set(a) | set(b))[:SKETCH_SIZE]
+    both = set(a) & set(b)
+    return sum(h in both for h in union) / len(union)
+
+
+def pack(signature):
+    return array("Q", signature).tobytes()
+
+
+def unpack(blob):
+    values = array("Q")
+    values.frombytes(blob)
+    return tuple(values)
@@ -0,0 +1,137 @@
+# executor.py
+import sys
+import threading
+import time
+from queue import Queue, Empty
+
+WORKERS = 2
+POLL_MS = 15  # how often the Tk thread drains finished calls while work is pending
+
+
+class DBCall:
+    """Handle for one submitted call. cancel() drops its callbacks."""
+
+    def __init__(self, fn, args, kwargs, on_done, on_error, cancellable):
+        self.name = getattr(fn, "__name__", repr(fn))
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.on_done = on_done
+        self.on_error = on_error
+        self.cancellable = cancellable
+        self.cancelled = False
+        self.future = None
+        self.submitted = time.perf_counter()
+        self.queue_wait = None   # seconds between submit and start on a worker
+        self.latency = None      # seconds spent inside fn
+
+    def cancel(self):
+        self.cancelled = True
+        # writes keep running so the database stays consistent; only their callbacks go away
+        if self.cancellable and self.future is not None:
+            self.future.cancel()
+
+
+class DBExecutor:
+    """
+    Runs data-layer calls on worker threads so the Tk mainloop never blocks.
+    Tkinter is not thread-safe, so workers only push finished calls onto a
+    queue; the Tk thread drains it with after() and runs the callbacks there.
+    """
+
+    def __init__(self, root, workers=WORKERS, ready=None):
+        self.root = root
+        self.workers = workers
+        # calls wait on this threading.Event (e.g. database initialization) before running
+        self.ready = ready
+        self._pool = None  # made on the first submit, so startup never imports concurrent.futures
+        self._finished = Queue()
+        self._pending = set()
+        self._polling = False
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def submit(self, fn, *args, on_done=None, on_error=None, cancellable=True, **kwargs):
+        call = DBCall(fn, args, kwargs, on_done, on_error, cancellable)
+        if self._pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="db")
+        self._pending.add(call)
+        call.future = self._pool.submit(self._run, call)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._drain)
+        return call
+
+    def _run(self, call):
+        if self.ready is not None:
+            self.ready.wait()
+        start = time.perf_counter()
+        call.queue_wait = start - call.submitted
+        try:
+            result, error = call.fn(*call.args, **call.kwargs), None
+        except Exception as e:
+            result, error = None, e
+        call.latency = time.perf_counter() - start
+        self._record(call, error is not None)
+        self._finished.put((call, result, error))
+
+    def _record(self, call, failed):
+        with self._lock:
+            s = self._stats.setdefault(call.name, {"calls": 0, "errors": 0, "total": 0.0,
+                                                   "max": 0.0, "queue_wait": 0.0})
+            s["calls"] += 1
+            s["errors"] += 1 if failed else 0
+            s["total"] += call.latency
+            s["max"] = max(s["max"], call.latency)
+            s["queue_wait"] += call.queue_wait
+
+    def _drain(self):
+        try:
+            while True:
+                try:
+                    call, result, error = self._finished.get_nowait()
+                except Empty:
+                    break
+                self._pending.discard(call)
+                if call.cancelled:
+                    continue
+                # a failing callback is reported like any Tk callback error and
+                # must not stop the callbacks of the other calls
+                try:
+                    if error is not None:
+                        if call.on_error:
+                            call.on_error(error)
+                    elif call.on_done:
+                        call.on_done(result)
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            # calls cancelled before they started never reach the queue
+            self._pending = {c for c in self._pending if not c.future.cancelled()}
+            if self._pending:
+                self.root.after(POLL_MS, self._drain)
+            else:
+                self._polling = False
+
+    def cancel_all(self):
+        """Cancel every outstanding call, e.g. when the user leaves a screen."""
+        for call in list(self._pending):
+            call.cancel()
+
+    def busy(self):
+        return any(not c.cancelled for c in self._pending)
+
+    def stats(self):
+        """Per-function latency metrics: calls, errors, total/avg/max seconds, avg queue wait."""
+        with self._lock:
+            out = {}
+            for name, s in self._stats.items():
+                out[name] = dict(s, avg=s["total"] / s["calls"],
+                                 avg_queue_wait=s["queue_wait"] / s["calls"])
+            return out
+
+    def shutdown(self, wait=False):
+        self.cancel_all()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
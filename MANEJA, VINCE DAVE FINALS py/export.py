@@ -0,0 +1,178 @@
+# export.py
+"""
+Streaming export of reports to CSV, JSON Lines or Parquet.
+
+    python export.py reports.csv
+    python export.py nightly.jsonl --state export.state       # only rows added since the last run
+    python export.py plastic.parquet --waste-type plastic --from 2025-01-01 --to 2025-12-31
+
+Rows come from db.iter_reports (fetchmany chunks), and each writer handles
+one chunk at a time, so memory does not grow with the size of the table.
+Parquet needs the optional pyarrow package.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from itertools import islice
+
+import db
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _max_id(last_id, report_id):
+    # date-range exports come in date order, so the last row is not always the newest
+    return report_id if last_id is None else max(last_id, report_id)
+
+
+def write_csv(rows, fh):
+    writer = csv.writer(fh)
+    writer.writerow(db.EXPORT_COLUMNS)
+    count, last_id = 0, None
+    for row in rows:
+        writer.writerow(row)
+        count, last_id = count + 1, _max_id(last_id, row[0])
+    return count, last_id
+
+
+def write_jsonl(rows, fh):
+    count, last_id = 0, None
+    for row in rows:
+        fh.write(json.dumps(dict(zip(db.EXPORT_COLUMNS, row)), ensure_ascii=False))
+        fh.write("\n")
+        count, last_id = count + 1, _max_id(last_id, row[0])
+    return count, last_id
+
+
+def write_parquet(rows, path, chunk_size=db.EXPORT_CHUNK_SIZE):
+    """One Parquet row group per chunk; needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("location", pa.string()),
+        ("waste_type", pa.string()),
+        ("description", pa.string()),
+        ("date_reported", pa.string()),
+        ("username", pa.string()),
+        ("user_id", pa.int64()),
+        ("created_at", pa.string()),
+    ])
+    count, last_id = 0, None
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+            count, last_id = count + len(chunk), _max_id(last_id, max(row[0] for row in chunk))
+    return count, last_id
+
+
+def export_reports(path, fmt=None, since_id=None, **filters):
+    """
+    Write matching reports to path in fmt (inferred from the extension when None).
+    filters are passed to db.iter_reports, which rejects bad dates before the
+    output file is opened. The rows go to a temporary file that replaces path
+    only once the export has finished, so a failed run leaves path as it was.
+    Returns (rows_written, last_id): last_id is the highest id written (None
+    when nothing matched), ready for --state.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format: {fmt!r} (choose from {', '.join(FORMATS)})")
+
+    rows = db.iter_reports(since_id=since_id, **filters)
+    tmp = path + ".tmp"
+    try:
+        if fmt == "parquet":
+            result = write_parquet(rows, tmp)
+        else:
+            with open(tmp, "w", newline="", encoding="utf-8") as fh:
+                result = (write_csv if fmt == "csv" else write_jsonl)(rows, fh)
+        os.replace(tmp, path)
+        return result
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        rows.close()
+
+
+def read_state(path):
+    """Last exported id stored by a previous run, or None."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return int(json.load(fh)["last_id"])
+    except FileNotFoundError:
+        return None
+
+
+def write_state(path, last_id):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump({"last_id": last_id}, fh)
+    os.replace(tmp, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="output file (.csv, .jsonl or .parquet)")
+    parser.add_argument("--format", choices=FORMATS, help="override the format implied by the extension")
+    parser.add_argument("--db", default=db.DB_FILE, help="database file (default: %(default)s)")
+    parser.add_argument("--since-id", type=int, help="only export reports with a larger id")
+    parser.add_argument("--state", help="file holding the last exported id; read before and updated after")
+    parser.add_argument("--from", dest="date_from", help="earliest date_reported (YYYY-MM-DD or MM/DD/YYYY)")
+    parser.add_argument("--to", dest="date_to", help="latest date_reported (YYYY-MM-DD or MM/DD/YYYY)")
+    parser.add_argument("--user", dest="username", help="only reports filed by this username")
+    parser.add_argument("--waste-type", help="only reports of this waste type")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        # sqlite3 would create an empty database and fail with "no such table"
+        print(f"no such database: {args.db}", file=sys.stderr)
+        return 1
+    db.DB_FILE = args.db
+    since_id = args.since_id
+    if since_id is None and args.state:
+        since_id = read_state(args.state)
+
+    try:
+        count, last_id = export_reports(args.output, args.format, since_id=since_id,
+                                        date_from=args.date_from, date_to=args.date_to,
+                                        username=args.username, waste_type=args.waste_type)
+    except (ValueError, RuntimeError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    except sqlite3.Error as e:
+        print(f"export failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close_pool()
+
+    if args.state and last_id is not None:
+        write_state(args.state, last_id)
+    print(f"exported {count} reports to {args.output}" + (f" (last id {last_id})" if last_id is not None else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,145 @@
 # app.py
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
+import threading
+import time
+import assets
 import db
+import profiler
 import utils
-import sqlite3
+from executor import DBExecutor
 
 BG_IMAGE_FILE = "bg.png"
 BG_WIDTH = 1000
 BG_HEIGHT = 650
+BG_POLL_MS = 20  # how often the Tk thread checks whether the background image is ready
+DB_POLL_MS = 20  # how often the Tk thread checks whether db.initialize() has finished
+
+
+def get_record(record_id):
+    """db.get_report with a user id resolved to its name; run it on the executor."""
+    record = db.get_report(record_id)
+    return db.resolve_usernames([record])[0] if record else record
+
+
+class LazyTreeview:
+    """
+    Drives a ttk.Treeview from a keyset-paginated source instead of loading
+    every row up front. Only the first page is inserted when the view opens;
+    the next page is fetched when the user scrolls near the bottom.
+    - fetch_page(cursor, limit) -> (rows, next_cursor), like db.get_reports_page
+    - render(row) -> tuple of column values for one Treeview item
+    - submit(fn, *args, on_done=...) runs fn off the Tk thread, like OceanguardApp.run_db
+    Items are keyed by report id. refresh() applies db.changes_since deltas to
+    the rows already loaded, so scroll position and selection survive an edit.
+    """
+
+    PREFETCH_AT = 0.9  # load the next page once the view bottom passes this fraction
+
+    def __init__(self, tree, scrollbar, fetch_page, render, submit, page_size=db.PAGE_SIZE):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.render = render
+        self.submit = submit
+        self.page_size = page_size
+        self.live_inserts = True  # new reports go on top; off for views they may not belong to (search)
+        self.cursor = None
+        self.exhausted = False
+        self.version = None  # change-log version the loaded rows are current as of
+        self._loading = False
+        self._load_call = None
+        self._generation = 0
+        self.tree.config(yscrollcommand=self._on_scroll)
+
+    def reset(self):
+        self.tree.delete(*self.tree.get_children())
+        self.cursor = None
+        self.exhausted = False
+        self.version = None
+        self._loading = False
+        self._generation += 1  # results of in-flight loads from before the reset are ignored
+        self.load_next()
+
+    def load_next(self):
+        if self._load_call is not None and self._load_call.cancelled:
+            self._loading = False  # the load was dropped when the screen was left
+        if self.exhausted or self._loading:
+            return
+        self._loading = True
+        generation = self._generation
+        self._load_call = self.submit(self._fetch, self.cursor, self.page_size,
+                                      on_done=lambda page: self._append(generation, page))
+
+    def _fetch(self, cursor, limit):
+        # read the version before the first page: changes racing the load are
+        # applied again by the next refresh(), which is harmless
+        version = db.change_version() if cursor is None else None
+        rows, next_cursor = self.fetch_page(cursor, limit)
+        # one batched lookup for rows that carry a user id instead of a name
+        return version, (db.resolve_usernames(rows), next_cursor)
+
+    def _append(self, generation, page):
+        if generation != self._generation:
+            return
+        self._loading = False
+        version, (rows, self.cursor) = page
+        if version is not None:
+            self.version = version
+        if self.cursor is None:
+            self.exhausted = True
+        for row in rows:
+            if self.tree.exists(str(row[0])):
+                continue  # already added by refresh()
+            try:
+                self.tree.insert("", tk.END, iid=str(row[0]), values=self.render(row))
+            except Exception:
+                # defensive: skip broken row but don't crash UI
+                continue
+
+    def refresh(self):
+        """Bring the loaded rows up to date; reloads from scratch only if never loaded."""
+        if self.version is None:
+            return self.reset()
+        generation = self._generation
+        self.submit(self._fetch_changes, self.version,
+                    on_done=lambda result: self._apply(generation, result))
+        self.load_next()  # resume a page load dropped by leaving the screen
+
+    def _fetch_changes(self, version):
+        version, changes = db.changes_since(version)
+        if changes:
+            rows = db.resolve_usernames([row for _, _, row in changes if row is not None])
+            rows = iter(rows)
+            changes = [(op, report_id, row if row is None else next(rows)) for op, report_id, row in changes]
+        return version, changes
+
+    def _apply(self, generation, result):
+        if generation != self._generation or self.version is None:
+            return
+        version, changes = result
+        if changes is None:
+            return self.reset()  # too far behind the change log
+        self.version = version
+        added = 0
+        for op, report_id, row in changes:
+            iid = str(report_id)
+            if op == "delete":
+                if self.tree.exists(iid):
+                    self.tree.delete(iid)
+            elif self.tree.exists(iid):
+                self.tree.item(iid, values=self.render(row))
+            elif op == "insert" and self.live_inserts:
+                # newest first, like get_reports_page; rows not loaded yet arrive with their page
+                self.tree.insert("", 0, iid=iid, values=self.render(row))
+                added += 1
+        if added and self.tree.yview()[0] > 0:
+            self.tree.yview_scroll(added, "units")  # keep the rows the user was looking at in place
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if not self.exhausted and not self._loading and float(last) >= self.PREFETCH_AT:
+            self.tree.after_idle(self.load_next)
 
 
 class OceanguardApp(tk.Tk):
@@ -27,31 +158,45 @@ class OceanguardApp(tk.Tk):
         self.TEXT_COLOR = "white"
 
         self.current_user_id = None
+        # The scaled background comes from the asset cache on a worker thread (see
+        # load_background); screens shown before it is ready get it when it arrives.
         self.bg_photo = None
-        try:
-            img = Image.open(BG_IMAGE_FILE)
-            img = img.resize((BG_WIDTH, BG_HEIGHT), Image.LANCZOS)
-            self.bg_photo = ImageTk.PhotoImage(img)
-        except:
-            print("Background image not found!")
+        self.bg_labels = []
+        self.bg_load_time = None
 
         self.main_frame = tk.Frame(self)
         self.main_frame.pack(fill="both", expand=True)
 
-        try:
-            # initialize will create DB & tables if needed
-            db.initialize()
-        except Exception as e:
-            messagebox.showerror("Database Error", str(e))
-
+        # Screens are built once on first visit and kept; see show_screen
+        self.screens = {}
+        self.current_screen = None
+        self._search_job = None
+        self.apply_table_style()
+
+        # all db.* calls from event handlers go through this so the mainloop never blocks;
+        # they wait for db.initialize() (see start_database) before they run
+        self.db_ready = threading.Event()
+        self.db_init_time = None
+        self.executor = DBExecutor(self, ready=self.db_ready)
+        self.loading_label = None
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        # hidden data-layer diagnostics; OCEANGUARD_PROFILE=1 starts profiling at launch
+        self.bind_all("<Control-Shift-D>", lambda e: self.show_diagnostics())
+        self.bind_all("<Control-Shift-d>", lambda e: self.show_diagnostics())
+        profiler.enable_from_env()
+
+        # the splash needs nothing from the database, so it goes up first and the
+        # database is created/migrated while it is on screen
         self.show_splash()
+        self.start_database()
+        self.load_background()
 
     # ============ SPLASH SCREEN (START PAGE) ============
     def show_splash(self):
-        self.clear_frame()
-        self.draw_bg()
+        self.show_screen("splash")
 
-        content = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_splash(self, screen):
+        content = tk.Frame(screen, bg=self.BG_COLOR)
         content.pack(expand=True, fill="both")
 
         tk.Label(
@@ -95,10 +240,10 @@ class OceanguardApp(tk.Tk):
 
     # ============ LOGIN SCREEN ============
     def show_login(self):
-        self.clear_frame()
-        self.draw_bg()
+        self.show_screen("login")
 
-        content = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_login(self, screen):
+        content = tk.Frame(screen, bg=self.BG_COLOR)
         content.pack(expand=True, fill="both")
 
         login_box = tk.Frame(content, bg=self.SECONDARY_COLOR, relief="ridge", bd=3)
@@ -134,13 +279,18 @@ class OceanguardApp(tk.Tk):
                 messagebox.showwarning("Validation", "Please fill in all fields.")
                 return
 
-            user_id = db.login_user(username, password)
-            if user_id:
-                self.current_user_id = user_id
-                messagebox.showinfo("Success", f"Welcome, {username}!")
-                self.show_home()
-            else:
-                messagebox.showerror("Login Failed", "Invalid username or password.")
+            if self.executor.busy():
+                return
+
+            def done(user_id):
+                if user_id:
+                    self.current_user_id = user_id
+                    messagebox.showinfo("Success", f"Welcome, {username}!")
+                    self.show_home()
+                else:
+                    messagebox.showerror("Login Failed", "Invalid username or password.")
+
+            self.run_db(db.login_user, username, password, on_done=done)
 
         btn_frame = tk.Frame(login_box, bg=self.SECONDARY_COLOR)
         btn_frame.pack(pady=20)
@@ -160,12 +310,16 @@ class OceanguardApp(tk.Tk):
                   font=("Arial", 10, "bold"), relief="flat", bd=0, cursor="hand2",
                   command=self.show_signup).pack(pady=5)
 
+    def refresh_login(self):
+        self.username_entry.delete(0, tk.END)
+        self.password_entry.delete(0, tk.END)
+
     # ============ SIGN UP SCREEN ============
     def show_signup(self):
-        self.clear_frame()
-        self.draw_bg()
+        self.show_screen("signup")
 
-        content = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_signup(self, screen):
+        content = tk.Frame(screen, bg=self.BG_COLOR)
         content.pack(expand=True, fill="both")
 
         signup_box = tk.Frame(content, bg=self.SECONDARY_COLOR, relief="ridge", bd=3)
@@ -217,12 +371,14 @@ class OceanguardApp(tk.Tk):
                 messagebox.showerror("Error", "Passwords do not match.")
                 return
 
-            try:
-                db.register_user(username, password)
+            if self.executor.busy():
+                return
+
+            def done(_):
                 messagebox.showinfo("Success", "Account created! You can now login.")
                 self.show_login()
-            except Exception as e:
-                messagebox.showerror("Error", str(e))
+
+            self.run_db(db.register_user, username, password, on_done=done, cancellable=False)
 
         btn_frame = tk.Frame(signup_box, bg=self.SECONDARY_COLOR)
         btn_frame.pack(pady=20)
@@ -235,12 +391,16 @@ class OceanguardApp(tk.Tk):
                   width=15, height=2, font=("Arial", 11, "bold"),
                   command=self.show_login).pack(side="left", padx=10)
 
+    def refresh_signup(self):
+        for entry in (self.new_username_entry, self.new_password_entry, self.confirm_password_entry):
+            entry.delete(0, tk.END)
+
     # ============ HOME SCREEN ============
     def show_home(self):
-        self.clear_frame()
-        self.draw_bg()
+        self.show_screen("home")
 
-        content = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_home(self, screen):
+        content = tk.Frame(screen, bg=self.BG_COLOR)
         content.pack(pady=30, expand=True)
 
         tk.Label(
@@ -284,14 +444,16 @@ class OceanguardApp(tk.Tk):
         }
 
         tk.Button(btn_frame, text="📝 REPORT WASTE", width=28, height=2,
-                  command=self.show_report_form, **btn_style).pack(pady=12)
+                  command=self.show_report_form, **btn_style).pack(pady=8)
         tk.Button(btn_frame, text="📋 VIEW RECORDS", width=28, height=2,
-                  command=self.show_records, **btn_style).pack(pady=12)
+                  command=self.show_records, **btn_style).pack(pady=8)
+        tk.Button(btn_frame, text="📊 STATISTICS", width=28, height=2,
+                  command=self.show_stats, **btn_style).pack(pady=8)
         tk.Button(btn_frame, text="🌍 ABOUT SDG 14", width=28, height=2,
-                  command=self.show_sdg, **btn_style).pack(pady=12)
+                  command=self.show_sdg, **btn_style).pack(pady=8)
         tk.Button(btn_frame, text="🚪 LOGOUT", width=28, height=2,
                   bg="#D32F2F", fg=self.TEXT_COLOR, font=("Arial", 11, "bold"),
-                  activebackground="#FF6B6B", command=self.logout).pack(pady=12)
+                  activebackground="#FF6B6B", command=self.logout).pack(pady=8)
 
     def logout(self):
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
@@ -300,17 +462,17 @@ class OceanguardApp(tk.Tk):
 
     # ============ REPORT FORM ============
     def show_report_form(self):
-        self.clear_frame()
-        self.draw_bg()
+        self.show_screen("report_form")
 
-        header = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_report_form(self, screen):
+        header = tk.Frame(screen, bg=self.BG_COLOR)
         header.pack(fill="x", pady=(20, 10))
 
         tk.Label(header, text="📝 REPORT WASTE",
                  font=("Arial Black", 28, "bold"), bg=self.BG_COLOR,
                  fg=self.ACCENT_COLOR).pack()
 
-        form = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        form = tk.Frame(screen, bg=self.BG_COLOR)
         form.pack(pady=10, padx=50)
 
         fields = [
@@ -335,7 +497,7 @@ class OceanguardApp(tk.Tk):
             widget.grid(row=i * 2 + 1, column=0, pady=8, ipady=8)
             setattr(self, var_name, widget)
 
-        btn_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        btn_frame = tk.Frame(screen, bg=self.BG_COLOR)
         btn_frame.pack(pady=20)
 
         btn_common = {"font": ("Arial", 11, "bold"), "width": 15, "height": 2}
@@ -345,6 +507,11 @@ class OceanguardApp(tk.Tk):
         tk.Button(btn_frame, text="← BACK", bg="#555555", fg=self.TEXT_COLOR,
                   command=self.show_home, **btn_common).pack(side="left", padx=10)
 
+    def refresh_report_form(self):
+        for entry in (self.location_entry, self.waste_entry, self.date_entry):
+            entry.delete(0, tk.END)
+        self.desc_text.delete("1.0", tk.END)
+
     def submit_report(self):
         loc = self.location_entry.get().strip()
         waste = self.waste_entry.get().strip()
@@ -355,37 +522,40 @@ class OceanguardApp(tk.Tk):
         if not utils.validate(loc, waste, date):
             return messagebox.showwarning("Validation", "Fill required fields correctly. Date must be MM/DD/YYYY if provided.")
 
-        try:
-            new_id = db.add_report(loc, waste, desc, date, self.current_user_id)
-        except Exception as e:
-            return messagebox.showerror("Error", str(e))
+        if self.executor.busy():
+            return
+
+        def done(new_id):
+            messagebox.showinfo("Success", f"Report submitted (ID: {new_id})")
+            # go directly to records so user sees the saved report
+            self.show_records()
 
-        messagebox.showinfo("Success", f"Report submitted (ID: {new_id})")
-        # go directly to records so user sees the saved report
-        self.show_records()
+        self.run_db(db.add_report, loc, waste, desc, date, self.current_user_id,
+                    on_done=done, cancellable=False)
 
     # ============ RECORDS LIST ============
     def show_records(self):
-        self.clear_frame()
-        self.draw_bg()
+        self.show_screen("records")
 
-        header = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_records(self, screen):
+        header = tk.Frame(screen, bg=self.BG_COLOR)
         header.pack(fill="x", pady=(20, 10))
 
         tk.Label(header, text="📋 WASTE RECORDS",
                  font=("Arial Black", 28, "bold"), bg=self.BG_COLOR,
                  fg=self.ACCENT_COLOR).pack()
 
-        table_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
-        table_frame.pack(padx=20, pady=10, fill="both", expand=True)
+        search_row = tk.Frame(header, bg=self.BG_COLOR)
+        search_row.pack(pady=(10, 0))
+        tk.Label(search_row, text="🔍 Search:", font=("Arial", 11, "bold"),
+                 bg=self.BG_COLOR, fg=self.ACCENT_COLOR).pack(side="left", padx=5)
+        self.search_entry = tk.Entry(search_row, width=50, bg="#1a2f4a", fg=self.TEXT_COLOR,
+                                     insertbackground=self.ACCENT_COLOR, relief="sunken", bd=2, font=("Arial", 11))
+        self.search_entry.pack(side="left", padx=5, ipady=4)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
 
-        style = ttk.Style()
-        style.theme_use("clam")
-        style.configure("Treeview", background="#1a2f4a", foreground=self.TEXT_COLOR,
-                        fieldbackground="#1a2f4a", font=("Arial", 10))
-        style.configure("Treeview.Heading", background=self.PRIMARY_COLOR, foreground=self.TEXT_COLOR,
-                        font=("Arial", 11, "bold"))
-        style.map("Treeview", background=[("selected", self.ACCENT_COLOR)])
+        table_frame = tk.Frame(screen, bg=self.BG_COLOR)
+        table_frame.pack(padx=20, pady=10, fill="both", expand=True)
 
         cols = ("ID", "Location", "Waste Type", "User")
         self.table = ttk.Treeview(table_frame, columns=cols, show="headings", height=12)
@@ -401,61 +571,14 @@ class OceanguardApp(tk.Tk):
 
         scrollbar = ttk.Scrollbar(table_frame, orient="vertical", command=self.table.yview)
         scrollbar.pack(side="right", fill="y")
-        self.table.config(yscrollcommand=scrollbar.set)
-
-        # Clear any previous rows (if any)
-        for i in self.table.get_children():
-            self.table.delete(i)
-
-        # Load rows from DB. Be defensive about the returned row shape.
-        rows = db.get_all_reports()
-        for row in rows:
-            # possible row shapes:
-            # - (id, location, waste_type, description, date_reported, username)
-            # - (id, location, waste_type, description, date_reported, user_id)
-            # - (id, location, waste_type, description, date_reported)   <- no user
-            try:
-                _id = row[0]
-                loc = row[1] if len(row) > 1 else "-"
-                waste = row[2] if len(row) > 2 else "-"
-                # try to obtain username if present
-                username = "-"
-                if len(row) > 5:
-                    possible = row[5]
-                    # if the DB returned username already (string), use it
-                    if isinstance(possible, str):
-                        username = possible
-                    else:
-                        # user_id given; try to get username from db module if available
-                        if hasattr(db, "get_username"):
-                            try:
-                                uname = db.get_username(possible)
-                                username = uname if uname else "-"
-                            except Exception:
-                                username = "-"
-                        else:
-                            # fallback: attempt a direct query to users table (best-effort)
-                            try:
-                                conn = sqlite3.connect(getattr(db, "DB_FILE", "oceanguard.db"))
-                                cur = conn.cursor()
-                                cur.execute("SELECT username FROM users WHERE id = ?", (possible,))
-                                r = cur.fetchone()
-                                conn.close()
-                                username = r[0] if r else "-"
-                            except Exception:
-                                username = "-"
-                elif len(row) == 5:
-                    # no username column returned
-                    username = "-"
-                else:
-                    username = "-"
 
-                self.table.insert("", tk.END, values=(_id, loc, waste, username))
-            except Exception:
-                # defensive: skip broken row but don't crash UI
-                continue
+        # Rows are paged in from the DB as the user scrolls, so opening this
+        # screen costs one page regardless of table size.
+        self.records_view = LazyTreeview(self.table, scrollbar, db.get_reports_page,
+                                         self.record_values, self.run_db)
+        self.records_query = ""
 
-        btn_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        btn_frame = tk.Frame(screen, bg=self.BG_COLOR)
         btn_frame.pack(pady=15)
 
         btn_small = {"width": 12, "height": 2, "font": ("Arial", 10, "bold")}
@@ -469,90 +592,148 @@ class OceanguardApp(tk.Tk):
         tk.Button(btn_frame, text="← BACK", bg="#555555", fg=self.TEXT_COLOR,
                   command=self.show_home, **btn_small).grid(row=0, column=3, padx=8)
 
+    def refresh_records(self):
+        # a search typed just before leaving was cancelled with the screen
+        if self.search_entry.get().strip() != self.records_query:
+            return self.run_search()
+        self.records_view.refresh()
+
+    SEARCH_DELAY_MS = 150  # wait for a pause in typing before querying
+
+    def on_search_key(self, event=None):
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(self.SEARCH_DELAY_MS, self.run_search)
+
+    def run_search(self):
+        """Re-point the records table at search results (or the full listing when empty)."""
+        self._search_job = None
+        query = self.search_entry.get().strip()
+        self.records_query = query
+        self.records_view.live_inserts = not query
+        if not query:
+            self.records_view.fetch_page = db.get_reports_page
+        else:
+            def fetch_page(offset, limit):
+                offset = offset or 0
+                rows = db.search_reports(query, limit, offset)
+                return rows, (offset + len(rows) if len(rows) == limit else None)
+            self.records_view.fetch_page = fetch_page
+        self.records_view.reset()
+
+    def record_values(self, row):
+        """Map a report row to Treeview values. Be defensive about the row shape."""
+        # possible row shapes:
+        # - (id, location, waste_type, description, date_reported, username)
+        # - (id, location, waste_type, description, date_reported, user_id)
+        # - (id, location, waste_type, description, date_reported)   <- no user
+        _id = row[0]
+        loc = row[1] if len(row) > 1 else "-"
+        waste = row[2] if len(row) > 2 else "-"
+        # LazyTreeview resolves user ids to names in one batch (db.resolve_usernames)
+        # on the executor before rendering; this runs on the Tk thread, so an id left
+        # over is only looked up in the cache, never in the database
+        username = row[5] if len(row) > 5 else None
+        if isinstance(username, int):
+            username = db.cached_usernames([username]).get(username)
+        return (_id, loc, waste, username or "-")
+
     # ============ VIEW RECORD ============
     def view_record(self):
         sel = self.table.selection()
         if not sel:
             return messagebox.showwarning("Warning", "Select a record.")
         record_id = self.table.item(sel[0])["values"][0]
+        self.run_db(get_record, record_id, on_done=self._open_record_view)
 
-        record = db.get_report(record_id)
+    def _open_record_view(self, record):
         if not record:
             return messagebox.showerror("Error", "Record not found.")
+        self.show_screen("view_record", record)
 
-        # record may or may not include username at index 5
-        date = record[4] if len(record) > 4 else "-"
-        location = record[1] if len(record) > 1 else "-"
-        waste_type = record[2] if len(record) > 2 else "-"
-        description = record[3] if len(record) > 3 else "-"
-        username = record[5] if len(record) > 5 and isinstance(record[5], str) else "-"
-
-        self.clear_frame()
-        self.draw_bg()
+    VIEW_LABELS = ["Date:", "Location:", "Waste Type:", "Description:", "User:"]
 
-        header = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_view_record(self, screen):
+        header = tk.Frame(screen, bg=self.BG_COLOR)
         header.pack(fill="x", pady=(20, 10))
 
         tk.Label(header, text="👁 VIEW RECORD",
                  font=("Arial Black", 28, "bold"), bg=self.BG_COLOR,
                  fg=self.ACCENT_COLOR).pack()
 
-        frame = tk.Frame(self.main_frame, bg=self.SECONDARY_COLOR, relief="ridge", bd=2)
+        frame = tk.Frame(screen, bg=self.SECONDARY_COLOR, relief="ridge", bd=2)
         frame.pack(pady=10, padx=50)
 
-        labels = ["Date:", "Location:", "Waste Type:", "Description:", "User:"]
-        values = [date, location, waste_type, description, username]
-
-        for i, (lbl, val) in enumerate(zip(labels, values)):
+        self.view_fields = {}
+        for i, lbl in enumerate(self.VIEW_LABELS):
             tk.Label(frame, text=lbl, font=("Arial", 12, "bold"),
                      bg=self.SECONDARY_COLOR, fg=self.ACCENT_COLOR).grid(row=i, column=0, sticky="nw", pady=10, padx=15)
 
             if lbl == "Description:":
-                txt = tk.Text(frame, width=50, height=8, bg="#1a2f4a", fg=self.TEXT_COLOR,
-                               font=("Arial", 10), insertbackground=self.ACCENT_COLOR)
-                txt.insert("1.0", val if val else "")
-                txt.config(state="disabled")
-                txt.grid(row=i, column=1, pady=10, padx=20, sticky="nw")
+                w = tk.Text(frame, width=50, height=8, bg="#1a2f4a", fg=self.TEXT_COLOR,
+                            font=("Arial", 10), insertbackground=self.ACCENT_COLOR)
+                w.config(state="disabled")
+                w.grid(row=i, column=1, pady=10, padx=20, sticky="nw")
             else:
-                tk.Label(frame, text=val if val else "-", font=("Arial", 11),
-                         bg=self.SECONDARY_COLOR, fg=self.TEXT_COLOR).grid(row=i, column=1, sticky="w", padx=20)
+                w = tk.Label(frame, text="-", font=("Arial", 11),
+                             bg=self.SECONDARY_COLOR, fg=self.TEXT_COLOR)
+                w.grid(row=i, column=1, sticky="w", padx=20)
+            self.view_fields[lbl] = w
 
-        tk.Button(self.main_frame, text="← BACK", bg="#555555", fg=self.TEXT_COLOR,
+        tk.Button(screen, text="← BACK", bg="#555555", fg=self.TEXT_COLOR,
                   width=15, height=2, font=("Arial", 11, "bold"),
                   command=self.show_records).pack(pady=15)
 
+    def refresh_view_record(self, record):
+        # record may or may not include username at index 5
+        date = record[4] if len(record) > 4 else "-"
+        location = record[1] if len(record) > 1 else "-"
+        waste_type = record[2] if len(record) > 2 else "-"
+        description = record[3] if len(record) > 3 else "-"
+        username = record[5] if len(record) > 5 else None
+        if isinstance(username, int):
+            # get_record resolved it on the executor; the Tk thread only reads the cache
+            username = db.cached_usernames([username]).get(username)
+        username = username or "-"
+
+        values = [date, location, waste_type, description, username]
+        for lbl, val in zip(self.VIEW_LABELS, values):
+            w = self.view_fields[lbl]
+            if lbl == "Description:":
+                w.config(state="normal")
+                w.delete("1.0", tk.END)
+                w.insert("1.0", val if val else "")
+                w.config(state="disabled")
+            else:
+                w.config(text=val if val else "-")
+
     # ============ EDIT RECORD ============
     def edit_record(self):
         sel = self.table.selection()
         if not sel:
             return messagebox.showwarning("Warning", "Select a record first.")
         record_id = self.table.item(sel[0])["values"][0]
+        self.run_db(get_record, record_id,
+                    on_done=lambda record: self._open_record_edit(record_id, record))
 
-        record = db.get_report(record_id)
+    def _open_record_edit(self, record_id, record):
         if not record:
             return messagebox.showerror("Error", "Record not found.")
+        self.show_screen("edit_record", record_id, record)
 
-        # build safe values
-        location_val = record[1] if len(record) > 1 else ""
-        waste_val = record[2] if len(record) > 2 else ""
-        desc_val = record[3] if len(record) > 3 else ""
-        date_val = record[4] if len(record) > 4 else ""
-
-        self.clear_frame()
-        self.draw_bg()
-
-        header = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_edit_record(self, screen):
+        header = tk.Frame(screen, bg=self.BG_COLOR)
         header.pack(fill="x", pady=(20, 10))
 
         tk.Label(header, text="✏ EDIT RECORD",
                  font=("Arial Black", 28, "bold"), bg=self.BG_COLOR,
                  fg=self.ACCENT_COLOR).pack()
 
-        form = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        form = tk.Frame(screen, bg=self.BG_COLOR)
         form.pack(pady=10, padx=50)
 
         labels = ["Location:", "Waste Type:", "Description:", "Date:"]
-        widgets = []
+        self.edit_widgets = []
 
         entry_style = {"bg": "#1a2f4a", "fg": self.TEXT_COLOR, "insertbackground": self.ACCENT_COLOR,
                        "relief": "sunken", "bd": 2}
@@ -563,46 +744,58 @@ class OceanguardApp(tk.Tk):
 
             if text == "Description:":
                 w = tk.Text(form, width=45, height=5, **entry_style, font=("Arial", 10))
-                w.insert("1.0", desc_val)
             else:
                 w = tk.Entry(form, width=45, **entry_style, font=("Arial", 10))
-                if i == 0:
-                    w.insert(0, location_val)
-                elif i == 1:
-                    w.insert(0, waste_val)
-                elif i == 3:
-                    w.insert(0, date_val)
 
             w.grid(row=i * 2 + 1, column=0, pady=8, ipady=8)
-            widgets.append(w)
-
-        def save():
-            loc = widgets[0].get().strip()
-            waste = widgets[1].get().strip()
-            desc = widgets[2].get("1.0", tk.END).strip()
-            date = widgets[3].get().strip()
-
-            if not utils.validate(loc, waste, date):
-                return messagebox.showwarning("Validation", "Fill required fields correctly. Date must be MM/DD/YYYY if provided.")
-
-            try:
-                db.update_report(record_id, loc, waste, desc, date)
-            except Exception as e:
-                return messagebox.showerror("Error", str(e))
-
-            messagebox.showinfo("Success", "Record updated!")
-            self.show_records()
+            self.edit_widgets.append(w)
 
-        btn_frame = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+        btn_frame = tk.Frame(screen, bg=self.BG_COLOR)
         btn_frame.pack(pady=15)
 
         tk.Button(btn_frame, text="✓ SAVE", bg=self.ACCENT_COLOR, fg=self.BG_COLOR,
                   width=15, height=2, font=("Arial", 11, "bold"),
-                  command=save).pack(side="left", padx=10)
+                  command=self.save_record).pack(side="left", padx=10)
         tk.Button(btn_frame, text="← BACK", bg="#555555", fg=self.TEXT_COLOR,
                   width=15, height=2, font=("Arial", 11, "bold"),
                   command=self.show_records).pack(side="left", padx=10)
 
+    def refresh_edit_record(self, record_id, record):
+        self.edit_record_id = record_id
+
+        # build safe values
+        location_val = record[1] if len(record) > 1 else ""
+        waste_val = record[2] if len(record) > 2 else ""
+        desc_val = record[3] if len(record) > 3 else ""
+        date_val = record[4] if len(record) > 4 else ""
+
+        loc_w, waste_w, desc_w, date_w = self.edit_widgets
+        for w, val in ((loc_w, location_val), (waste_w, waste_val), (date_w, date_val)):
+            w.delete(0, tk.END)
+            w.insert(0, val or "")
+        desc_w.delete("1.0", tk.END)
+        desc_w.insert("1.0", desc_val or "")
+
+    def save_record(self):
+        widgets = self.edit_widgets
+        loc = widgets[0].get().strip()
+        waste = widgets[1].get().strip()
+        desc = widgets[2].get("1.0", tk.END).strip()
+        date = widgets[3].get().strip()
+
+        if not utils.validate(loc, waste, date):
+            return messagebox.showwarning("Validation", "Fill required fields correctly. Date must be MM/DD/YYYY if provided.")
+
+        if self.executor.busy():
+            return
+
+        def done(_):
+            messagebox.showinfo("Success", "Record updated!")
+            self.show_records()
+
+        self.run_db(db.update_report, self.edit_record_id, loc, waste, desc, date,
+                    on_done=done, cancellable=False)
+
     # ============ DELETE RECORD ============
     def delete_record(self):
         sel = self.table.selection()
@@ -611,19 +804,82 @@ class OceanguardApp(tk.Tk):
         record_id = self.table.item(sel[0])["values"][0]
 
         if messagebox.askyesno("Confirm", "Delete this record?"):
-            try:
-                db.delete_report(record_id)
-            except Exception as e:
-                return messagebox.showerror("Error", str(e))
-            messagebox.showinfo("Deleted", "Record deleted.")
-            self.show_records()
+            def done(_):
+                messagebox.showinfo("Deleted", "Record deleted.")
+                self.show_records()
+
+            self.run_db(db.delete_report, record_id, on_done=done, cancellable=False)
+
+    # ============ STATISTICS DASHBOARD ============
+    def show_stats(self):
+        self.show_screen("stats")
+
+    def build_stats(self, screen):
+        header = tk.Frame(screen, bg=self.BG_COLOR)
+        header.pack(fill="x", pady=(20, 10))
+
+        tk.Label(header, text="📊 WASTE STATISTICS",
+                 font=("Arial Black", 28, "bold"), bg=self.BG_COLOR,
+                 fg=self.ACCENT_COLOR).pack()
+
+        filter_row = tk.Frame(header, bg=self.BG_COLOR)
+        filter_row.pack(pady=(10, 0))
+        tk.Label(filter_row, text="Month:", font=("Arial", 11, "bold"),
+                 bg=self.BG_COLOR, fg=self.ACCENT_COLOR).pack(side="left", padx=5)
+        self.stats_period = ttk.Combobox(filter_row, values=["All"], state="readonly", width=12)
+        self.stats_period.set("All")
+        self.stats_period.pack(side="left", padx=5)
+        self.stats_period.bind("<<ComboboxSelected>>", lambda e: self.load_stats())
+
+        tables = tk.Frame(screen, bg=self.BG_COLOR)
+        tables.pack(padx=20, pady=10, fill="both", expand=True)
+
+        self.stats_tables = {}
+        for col, (key, title) in enumerate([("location", "Location"), ("waste_type", "Waste Type"),
+                                            ("period", "Month")]):
+            tree = ttk.Treeview(tables, columns=(title, "Reports"), show="headings", height=14)
+            tree.column(title, width=200, anchor=tk.W)
+            tree.column("Reports", width=80, anchor=tk.CENTER)
+            tree.heading(title, text=title)
+            tree.heading("Reports", text="Reports")
+            tree.grid(row=0, column=col, padx=8, sticky="nsew")
+            tables.grid_columnconfigure(col, weight=1)
+            self.stats_tables[key] = tree
+
+        tk.Button(screen, text="← BACK", width=15, height=2,
+                  bg="#555555", fg=self.TEXT_COLOR, font=("Arial", 11, "bold"),
+                  command=self.show_home).pack(pady=15)
+
+    def refresh_stats(self):
+        self.load_stats()
+
+    def load_stats(self):
+        """Read the rollup tables in the background and fill the dashboard tables."""
+        period = self.stats_period.get()
+        period = None if period == "All" else period
+
+        def fetch():
+            return {
+                "location": db.get_stats("location", period),
+                "waste_type": db.get_stats("waste_type", period),
+                "period": db.get_stats("period"),
+            }
+
+        def done(stats):
+            for key, tree in self.stats_tables.items():
+                tree.delete(*tree.get_children())
+                for name, count in stats[key]:
+                    tree.insert("", tk.END, values=(name, count))
+            self.stats_period.config(values=["All"] + [p for p, _ in stats["period"]])
+
+        self.run_db(fetch, on_done=done)
 
     # ============ SDG SCREEN ============
     def show_sdg(self):
-        self.clear_frame()
-        self.draw_bg()
+        self.show_screen("sdg")
 
-        header = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+    def build_sdg(self, screen):
+        header = tk.Frame(screen, bg=self.BG_COLOR)
         header.pack(fill="x", pady=(20, 10))
 
         tk.Label(header, text="🌍 ABOUT SDG 14 - LIFE BELOW WATER",
@@ -642,24 +898,232 @@ class OceanguardApp(tk.Tk):
       • Promoting protection of marine biodiversity
     """
 
-        tk.Label(self.main_frame, text=text, font=("Arial", 13),
+        tk.Label(screen, text=text, font=("Arial", 13),
                  justify="left", bg=self.BG_COLOR, fg=self.TEXT_COLOR).pack(
             padx=50, pady=20, fill="both", expand=True)
 
-        tk.Button(self.main_frame, text="← BACK", width=15, height=2,
+        tk.Button(screen, text="← BACK", width=15, height=2,
                   bg="#555555", fg=self.TEXT_COLOR, font=("Arial", 11, "bold"),
                   command=self.show_home).pack(pady=15)
 
+    # ============ DIAGNOSTICS (hidden, Ctrl+Shift+D) ============
+    def show_diagnostics(self):
+        if self.current_screen != "diagnostics":
+            self.diagnostics_back = self.current_screen
+        self.show_screen("diagnostics")
+
+    def build_diagnostics(self, screen):
+        tk.Label(screen, text="🛠 DIAGNOSTICS", font=("Arial Black", 22, "bold"),
+                 bg=self.BG_COLOR, fg=self.ACCENT_COLOR).pack(pady=(15, 5))
+
+        body = tk.Frame(screen, bg=self.BG_COLOR)
+        body.pack(padx=20, fill="both", expand=True)
+        self.diagnostics_text = tk.Text(body, font=("Courier", 9), wrap="none", bg="#1a2f4a",
+                                        fg=self.TEXT_COLOR, height=30)
+        yscroll = ttk.Scrollbar(body, orient="vertical", command=self.diagnostics_text.yview)
+        xscroll = ttk.Scrollbar(body, orient="horizontal", command=self.diagnostics_text.xview)
+        self.diagnostics_text.configure(yscrollcommand=yscroll.set, xscrollcommand=xscroll.set)
+        yscroll.pack(side="right", fill="y")
+        xscroll.pack(side="bottom", fill="x")
+        self.diagnostics_text.pack(side="left", fill="both", expand=True)
+
+        buttons = tk.Frame(screen, bg=self.BG_COLOR)
+        buttons.pack(pady=10)
+        self.profile_button = tk.Button(buttons, width=16, bg=self.PRIMARY_COLOR, fg=self.TEXT_COLOR,
+                                        font=("Arial", 10, "bold"), command=self.toggle_profiling)
+        self.profile_button.pack(side="left", padx=5)
+        for text, command in [("RESET", self.reset_profile), ("SAVE REPORT", self.save_profile),
+                              ("REFRESH", self.refresh_diagnostics), ("← BACK", self.leave_diagnostics)]:
+            tk.Button(buttons, text=text, width=12, bg="#555555", fg=self.TEXT_COLOR,
+                      font=("Arial", 10, "bold"), command=command).pack(side="left", padx=5)
+
+    def refresh_diagnostics(self):
+        """Profiler report plus executor, pool and write-queue metrics, as text."""
+        self.profile_button.config(text="STOP PROFILING" if profiler.enabled else "START PROFILING")
+        lines = [profiler.report(), "", "executor (per db function, seconds)"]
+        for name, s in sorted(self.executor.stats().items()):
+            lines.append(f"  {name:28} calls {s['calls']:6}  errors {s['errors']:3}  avg {s['avg']:.4f}  "
+                         f"max {s['max']:.4f}  queue wait {s['avg_queue_wait']:.4f}")
+        lines += ["", f"pool: {db.pool_stats()}", f"write queue: {db.write_queue_stats()}",
+                  f"background image: {self.bg_load_time if self.bg_load_time is not None else '-'} s",
+                  f"database init: {self.db_init_time if self.db_init_time is not None else '-'} s"]
+        self.diagnostics_text.config(state="normal")
+        self.diagnostics_text.delete("1.0", tk.END)
+        self.diagnostics_text.insert("1.0", "\n".join(lines))
+        self.diagnostics_text.config(state="disabled")
+
+    def toggle_profiling(self):
+        if profiler.enabled:
+            profiler.disable()
+        else:
+            profiler.enable()
+        self.refresh_diagnostics()
+
+    def reset_profile(self):
+        profiler.reset()
+        self.refresh_diagnostics()
+
+    def save_profile(self):
+        path = time.strftime("oceanguard_profile_%Y%m%d_%H%M%S.txt")
+        try:
+            profiler.dump(path)
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+            return
+        messagebox.showinfo("Diagnostics", f"Profile saved to {path}")
+
+    def leave_diagnostics(self):
+        back = getattr(self, "diagnostics_back", None)
+        if back in ("home", "records", "stats", "sdg", "report_form", "login", "signup"):
+            self.show_screen(back)
+        else:
+            self.show_home() if self.current_user_id else self.show_login()
+
+    # ============ SCREEN MANAGER ============
+    def show_screen(self, name, *args):
+        """
+        Raise screen `name`, building it with build_<name>(frame) on first use.
+        Screens are never destroyed; refresh_<name>(*args), when defined, loads
+        the data for this visit into the existing widgets.
+        """
+        self.leave_screen()
+        screen = self.screens.get(name)
+        if screen is None:
+            screen = tk.Frame(self.main_frame, bg=self.BG_COLOR)
+            screen.place(x=0, y=0, relwidth=1, relheight=1)
+            self.draw_bg(screen)
+            getattr(self, f"build_{name}")(screen)
+            self.screens[name] = screen
+        screen.tkraise()
+        self.current_screen = name
+        refresh = getattr(self, f"refresh_{name}", None)
+        if refresh:
+            refresh(*args)
+
+    def leave_screen(self):
+        # whatever the old screen was waiting on is no longer wanted
+        self.executor.cancel_all()
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+            self._search_job = None
+        if self.loading_label is not None:
+            self.loading_label.destroy()
+            self.loading_label = None
+        self.config(cursor="")
+
     # ============ HELPERS ============
-    def draw_bg(self):
-        if self.bg_photo:
-            bg = tk.Label(self.main_frame, image=self.bg_photo)
-            bg.place(x=0, y=0, relwidth=1, relheight=1)
-            bg.image = self.bg_photo
-
-    def clear_frame(self):
-        for widget in self.main_frame.winfo_children():
-            widget.destroy()
+    def apply_table_style(self):
+        style = ttk.Style()
+        style.theme_use("clam")
+        style.configure("Treeview", background="#1a2f4a", foreground=self.TEXT_COLOR,
+                        fieldbackground="#1a2f4a", font=("Arial", 10))
+        style.configure("Treeview.Heading", background=self.PRIMARY_COLOR, foreground=self.TEXT_COLOR,
+                        font=("Arial", 11, "bold"))
+        style.map("Treeview", background=[("selected", self.ACCENT_COLOR)])
+
+    def run_db(self, fn, *args, on_done=None, on_error=None, cancellable=True):
+        """
+        Run a db.* call on the executor and show the loading state until it
+        finishes. Callbacks run on the Tk thread; errors go to a message box
+        unless on_error is given. Leaving the screen cancels the call.
+        """
+        self.set_loading(True)
+
+        def done(result):
+            self.set_loading(False)
+            if on_done:
+                on_done(result)
+
+        def error(exc):
+            self.set_loading(False)
+            if on_error:
+                on_error(exc)
+            else:
+                messagebox.showerror("Error", str(exc))
+
+        return self.executor.submit(fn, *args, on_done=done, on_error=error, cancellable=cancellable)
+
+    def set_loading(self, loading):
+        if loading:
+            if self.loading_label is None:
+                self.loading_label = tk.Label(self.main_frame, text="⏳ Loading...", font=("Arial", 10, "italic"),
+                                              bg=self.BG_COLOR, fg=self.ACCENT_COLOR)
+                self.loading_label.place(relx=1.0, rely=1.0, anchor="se", x=-10, y=-10)
+            self.loading_label.lift()
+            self.config(cursor="watch")
+        elif not self.executor.busy():
+            if self.loading_label is not None:
+                self.loading_label.destroy()
+                self.loading_label = None
+            self.config(cursor="")
+
+    def start_database(self):
+        """Run db.initialize() off the Tk thread; report a failure once it is done."""
+        start = time.perf_counter()
+        result = {}
+
+        def work():
+            try:
+                # initialize will create DB & tables if needed
+                db.initialize()
+            except Exception as e:
+                result["error"] = e
+            finally:
+                # a failed initialize still lets queued calls run and report their own errors
+                self.db_ready.set()
+
+        threading.Thread(target=work, name="db-init", daemon=True).start()
+
+        def check():
+            if not self.db_ready.is_set():
+                self.after(DB_POLL_MS, check)
+                return
+            self.db_init_time = time.perf_counter() - start
+            if "error" in result:
+                messagebox.showerror("Database Error", str(result["error"]))
+
+        self.after(DB_POLL_MS, check)
+
+    def load_background(self):
+        """Resolve the pre-scaled background off the Tk thread, then show it on every screen."""
+        start = time.perf_counter()
+        result = {}
+
+        def work():
+            try:
+                result["path"] = assets.scaled_image(BG_IMAGE_FILE, (BG_WIDTH, BG_HEIGHT))
+            except Exception as e:
+                result["error"] = e
+
+        worker = threading.Thread(target=work, name="bg-image", daemon=True)
+        worker.start()
+
+        def check():
+            if worker.is_alive():
+                self.after(BG_POLL_MS, check)
+                return
+            if "error" in result:
+                print("Background image not found!")
+                return
+            # tk.PhotoImage reads the cached PPM directly; PhotoImages must be made on the Tk thread
+            self.bg_photo = tk.PhotoImage(file=result["path"])
+            for label in self.bg_labels:
+                label.config(image=self.bg_photo)
+            self.bg_load_time = time.perf_counter() - start
+
+        self.after(BG_POLL_MS, check)
+
+    def draw_bg(self, parent):
+        # one label per cached screen, made once when the screen is built; they all
+        # share the single PhotoImage
+        bg = tk.Label(parent, image=self.bg_photo or "", bg=self.BG_COLOR, bd=0)
+        bg.place(x=0, y=0, relwidth=1, relheight=1)
+        self.bg_labels.append(bg)
+
+    def on_close(self):
+        self.executor.shutdown()
+        db.close_pool()
+        self.destroy()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,410 @@
+# profiler.py
+"""
+Opt-in profiler for the data layer.
+enable() (or OCEANGUARD_PROFILE in the environment, see enable_from_env)
+wraps every public db.* function and makes db.connect() open connections
+that time their own statements:
+- functions: wall time per call (perf_counter), errors, rows for list results
+- statements: execute + fetch time and rows returned, per SQL text
+- trace: every statement start SQLite reports through set_trace_callback,
+  literals replaced by ?, including implicit BEGIN/COMMIT; a statement is
+  reported again for each trigger program it runs
+Each function/statement keeps a Histogram (count, total, max, and
+p50/p95/p99 over the most recent SAMPLES calls). Statements slower than
+SLOW_MS are logged with their EXPLAIN QUERY PLAN. report() formats it all;
+the app shows it on its hidden diagnostics screen (Ctrl+Shift+D).
+Profiling adds roughly 10 microseconds per db call, so it is off by default.
+"""
+import atexit
+import functools
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import types
+from collections import Counter, deque
+
+import db
+
+SLOW_MS = 100.0      # statements slower than this are logged with their query plan
+SAMPLES = 1000       # recent samples kept per function/statement for percentiles
+SLOW_KEEP = 50       # slow-query log entries kept for report()
+TRACE_KEEP = 500     # distinct traced statements kept (longest-running process safety)
+SLOW_LOG = None      # stream slow queries are printed to (None: sys.stderr)
+
+# db plumbing that is not worth timing on its own
+SKIP = frozenset({"connect", "connect_central", "get_connection", "get_pool", "get_schema", "invalidate_schema", "write_queue",
+                  "close_pool", "reset_pool", "pool_stats", "write_queue_stats", "main"})
+
+enabled = False
+_lock = threading.Lock()
+_functions = {}
+_statements = {}
+_traced = Counter()
+_slow = deque(maxlen=SLOW_KEEP)
+_plans = {}
+_originals = {}
+_started = None
+_atexit_registered = False
+
+_CO_GENERATOR = 0x20  # inspect.CO_GENERATOR; inspect itself is slow to import at app startup
+
+
+class Histogram:
+    """Count, total and max of every sample; percentiles over the most recent SAMPLES."""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.recent = deque(maxlen=SAMPLES)
+
+    def add(self, seconds, rows=0, failed=False):
+        self.count += 1
+        self.errors += 1 if failed else 0
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.rows += rows
+        self.recent.append(seconds)
+
+    def summary(self):
+        recent = sorted(self.recent)
+
+        def pct(p):
+            return recent[min(len(recent) - 1, int(len(recent) * p / 100))] * 1000 if recent else 0.0
+
+        return {"count": self.count, "errors": self.errors, "total_ms": self.total * 1000,
+                "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": self.max * 1000,
+                "rows": self.rows}
+
+
+def _record(table, key, seconds, rows=0, failed=False):
+    with _lock:
+        hist = table.get(key)
+        if hist is None:
+            hist = table[key] = Histogram()
+        hist.add(seconds, rows, failed)
+
+
+# loose on purpose (it runs for every statement): strings, blobs and numbers
+_LITERAL_RE = re.compile(r"[xX]?'[^']*'|\b\d[\d.eE+-]*")
+
+def _normalize(sql):
+    return " ".join(_LITERAL_RE.sub("?", sql).split())
+
+
+def _trace(sql):
+    key = _normalize(sql)
+    with _lock:
+        if key in _traced or len(_traced) < TRACE_KEEP:
+            _traced[key] += 1
+
+
+def _plan(sql, params):
+    """EXPLAIN QUERY PLAN detail lines for sql, computed once per statement text."""
+    plan = _plans.get(sql)
+    if plan is None:
+        # on a plain connection of its own: the statement's connection may be
+        # mid-transaction or in use by another thread, and the EXPLAIN is not profiled
+        try:
+            conn = sqlite3.connect(db.DB_FILE, timeout=db.BUSY_TIMEOUT_MS / 1000)
+            try:
+                plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params or ())]
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            plan = [f"(no plan: {e})"]
+        _plans[sql] = plan
+    return plan
+
+
+def _statement_done(sql, params, seconds, rows):
+    _record(_statements, sql, seconds, rows)
+    if seconds * 1000 < SLOW_MS:
+        return
+    plan = _plan(sql, params)
+    entry = {"time": time.strftime("%H:%M:%S"), "ms": seconds * 1000, "sql": " ".join(sql.split()),
+             "rows": rows, "plan": plan}
+    _slow.append(entry)
+    print(f"[profiler] slow query {entry['ms']:.1f} ms, {rows} rows: {entry['sql']}", file=SLOW_LOG or sys.stderr)
+    for detail in plan:
+        print(f"    {detail}", file=SLOW_LOG or sys.stderr)
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """
+    Cursor that times each statement from execute() until its rows run out
+    (or the cursor is re-executed or closed), counting the rows fetched.
+    """
+    _sql = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        try:
+            super().execute(sql, parameters)
+        except Exception:
+            _record(_statements, sql, time.perf_counter() - start, failed=True)
+            raise
+        self._sql, self._params = sql, parameters
+        self._elapsed = time.perf_counter() - start
+        self._rows = 0
+        if self.description is None:
+            # not a query: all the work is done
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        # no plan for executemany: there is no single set of parameters to explain
+        _record(_statements, sql, time.perf_counter() - start, max(self.rowcount, 0))
+        return self
+
+    def _timed(self, fetch, *args):
+        start = time.perf_counter()
+        result = fetch(*args)
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - start
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is None:
+            self._finish()
+        elif self._sql is not None:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        rows = self._timed(super().fetchmany, size)
+        if self._sql is not None:
+            self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        if self._sql is not None:
+            self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def __next__(self):
+        try:
+            row = self._timed(super().__next__)
+        except StopIteration:
+            self._finish()
+            raise
+        if self._sql is not None:
+            self._rows += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # a cursor dropped before its rows ran out (fetchone() of a single row)
+        self._finish()
+
+    def _finish(self):
+        if self._sql is None:
+            return
+        sql, self._sql = self._sql, None
+        _statement_done(sql, self._params, self._elapsed, self._rows)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose statements run on ProfiledCursors and are traced by SQLite."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.set_trace_callback(_trace)
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute does not go through cursor(), so route it there
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        super().commit()
+        _record(_statements, "COMMIT", time.perf_counter() - start)
+
+
+def _timed_rows(name, rows_iter, start):
+    # a generator's cost is its whole iteration
+    rows, failed = 0, False
+    try:
+        for row in rows_iter:
+            rows += 1
+            yield row
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _record(_functions, name, time.perf_counter() - start, rows, failed)
+
+
+def _wrap(name, fn):
+    if fn.__code__.co_flags & _CO_GENERATOR:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            yield from _timed_rows(name, fn(*args, **kwargs), time.perf_counter())
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                _record(_functions, name, time.perf_counter() - start, failed=True)
+                raise
+            if isinstance(result, types.GeneratorType):
+                # e.g. iter_reports: checks its arguments, then hands back a row generator
+                return _timed_rows(name, result, start)
+            _record(_functions, name, time.perf_counter() - start,
+                    len(result) if isinstance(result, list) else 0)
+            return result
+    return wrapper
+
+
+def _public_functions():
+    for name, fn in vars(db).items():
+        if isinstance(fn, types.FunctionType) and fn.__module__ == db.__name__ and not name.startswith("_") and name not in SKIP:
+            yield name, fn
+
+
+def enable(slow_ms=None, dump_on_exit=None):
+    """
+    Start profiling: wrap db's public functions and reopen the pool with
+    profiled connections (idle ones close now, busy ones when released). The
+    writer thread keeps its connection: switching must not wait for queued
+    writes, so it can run on the Tk thread.
+    dump_on_exit: None, True (print report() to stderr at exit) or a file path.
+    """
+    global enabled, SLOW_MS, _started, _atexit_registered
+    if slow_ms is not None:
+        SLOW_MS = float(slow_ms)
+    if dump_on_exit and not _atexit_registered:
+        atexit.register(dump, None if dump_on_exit is True else dump_on_exit)
+        _atexit_registered = True
+    if enabled:
+        return
+    for name, fn in _public_functions():
+        _originals[name] = fn
+        setattr(db, name, _wrap(name, fn))
+    db.CONNECTION_FACTORY = ProfiledConnection
+    db.reset_pool()
+    enabled = True
+    _started = _started or time.time()
+
+
+def disable():
+    """Stop profiling and restore db; collected numbers are kept until reset()."""
+    global enabled
+    if not enabled:
+        return
+    for name, fn in _originals.items():
+        setattr(db, name, fn)
+    _originals.clear()
+    db.CONNECTION_FACTORY = sqlite3.Connection
+    db.reset_pool()
+    enabled = False
+
+
+def enable_from_env():
+    """
+    OCEANGUARD_PROFILE=1 profiles and prints the report to stderr at exit;
+    OCEANGUARD_PROFILE=<file> writes it there instead. OCEANGUARD_SLOW_MS
+    overrides SLOW_MS. Returns whether profiling was enabled.
+    """
+    value = os.environ.get("OCEANGUARD_PROFILE", "").strip()
+    if not value or value == "0":
+        return False
+    slow_ms = os.environ.get("OCEANGUARD_SLOW_MS")
+    enable(slow_ms=float(slow_ms) if slow_ms else None, dump_on_exit=True if value == "1" else value)
+    return True
+
+
+def reset():
+    """Drop everything collected so far."""
+    global _started
+    with _lock:
+        _functions.clear()
+        _statements.clear()
+        _traced.clear()
+        _slow.clear()
+        _plans.clear()
+    _started = time.time() if enabled else None
+
+
+def snapshot():
+    """Everything collected so far as plain data (JSON-able)."""
+    with _lock:
+        return {
+            "enabled": enabled,
+            "since": _started,
+            "slow_ms": SLOW_MS,
+            "functions": {name: h.summary() for name, h in _functions.items()},
+            "statements": {" ".join(sql.split()): h.summary() for sql, h in _statements.items()},
+            "trace": dict(_traced.most_common()),
+            "slow": list(_slow),
+        }
+
+
+def _table(rows, label, width):
+    lines = [f"{label:{width}} {'calls':>7} {'errors':>6} {'total ms':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'rows':>8}"]
+    for name, s in rows:
+        name = name if len(name) <= width else name[:width - 3] + "..."
+        lines.append(f"{name:{width}} {s['count']:7} {s['errors']:6} {s['total_ms']:10.1f} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} "
+                     f"{s['p99_ms']:8.2f} {s['max_ms']:8.2f} {s['rows']:8}")
+    return lines
+
+
+def report(top=25):
+    """Human-readable profile: functions and statements by total time, trace counts, slow queries."""
+    snap = snapshot()
+    since = time.strftime("%H:%M:%S", time.localtime(snap["since"])) if snap["since"] else "-"
+    lines = [f"Data-layer profile ({'on' if snap['enabled'] else 'off'}, since {since}, "
+             f"slow queries > {snap['slow_ms']:g} ms)", ""]
+
+    by_total = lambda item: -item[1]["total_ms"]
+    lines += _table(sorted(snap["functions"].items(), key=by_total)[:top], "function", 28)
+    lines.append("")
+    lines += _table(sorted(snap["statements"].items(), key=by_total)[:top], "statement (execute + fetch)", 60)
+    lines += ["", f"{'starts':>7}  statement as traced by SQLite"]
+    for sql, count in list(snap["trace"].items())[:top]:
+        lines.append(f"{count:7}  {sql[:100]}")
+    lines += ["", "slow queries (newest last)"]
+    for entry in snap["slow"]:
+        lines.append(f"  {entry['time']} {entry['ms']:9.1f} ms {entry['rows']:7} rows  {entry['sql'][:100]}")
+        lines += [f"      {detail}" for detail in entry["plan"]]
+    if not snap["slow"]:
+        lines.append("  (none)")
+    return "\n".join(lines)
+
+
+def dump(path=None):
+    """Write report() to path, or print it to stderr."""
+    text = report()
+    if path:
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text, file=sys.stderr)
+    return text
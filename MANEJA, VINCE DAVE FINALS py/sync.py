@@ -0,0 +1,184 @@
+# sync.py
+"""
+Ship this device's outbox (see db.py) to a central database.
+
+    python sync.py central.db                   # a database file (shared drive, USB stick)
+    python sync.py http://hq.example:8080       # an api.py server
+    python sync.py --status
+
+Entries go out oldest first, SYNC_BATCH_SIZE at a time, as zlib-compressed
+JSON. The central applies each batch in one transaction, skipping entries it
+has already applied, and answers with the last seq it applied; only then are
+they dropped here. An interrupted sync (no connection, laptop closed) simply
+resumes from the last acknowledged entry on the next run, and resending a
+batch never applies anything twice.
+A new central database file is created with `python db.py --db central.db init`.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import urllib.error
+import urllib.request
+import zlib
+
+import db
+
+HTTP_TIMEOUT = 30.0   # seconds per batch request
+MIN_BATCH = 1         # a batch the server still refuses as too large at this size is an error
+
+
+class SyncError(Exception):
+    pass
+
+
+class TooLarge(SyncError):
+    pass
+
+
+def pack_batch(device_id, entries):
+    """The wire format: {"device": id, "entries": [[seq, uid, op, payload], ...]}, JSON, zlib-compressed."""
+    return zlib.compress(json.dumps({"device": device_id, "entries": entries}).encode(), 6)
+
+
+def unpack_batch(blob):
+    """(device_id, entries) from pack_batch output; ValueError if it is not one."""
+    try:
+        batch = json.loads(zlib.decompress(blob))
+        device_id, entries = batch["device"], batch["entries"]
+    except (zlib.error, KeyError, TypeError) as e:
+        raise ValueError(f"not a sync batch: {e}")
+    if not isinstance(device_id, str) or not isinstance(entries, list):
+        raise ValueError("not a sync batch")
+    return device_id, [tuple(entry) for entry in entries]
+
+
+class FileTarget:
+    """A central database file reachable from this machine."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    def send(self, blob):
+        device_id, entries = unpack_batch(blob)
+        try:
+            if self._conn is None:
+                if not os.path.exists(self.path):
+                    # sqlite3 would create an empty file
+                    raise SyncError(f"{self.path} does not exist (create it with: python db.py --db {self.path} init)")
+                self._conn = db.connect_central(self.path)
+            return db.apply_outbox(device_id, entries, conn=self._conn)
+        except sqlite3.Error as e:
+            raise SyncError(str(e))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __str__(self):
+        return self.path
+
+
+class HttpTarget:
+    """An api.py server: POST /sync with the batch as the body."""
+
+    def __init__(self, url):
+        self.url = url.rstrip("/") + "/sync"
+
+    def send(self, blob):
+        request = urllib.request.Request(self.url, data=blob, method="POST",
+                                         headers={"Content-Type": "application/octet-stream"})
+        try:
+            with urllib.request.urlopen(request, timeout=HTTP_TIMEOUT) as response:
+                return json.loads(response.read())["acked"]
+        except urllib.error.HTTPError as e:
+            if e.code == 413:
+                raise TooLarge(f"{self.url}: batch too large")
+            raise SyncError(f"{self.url}: {e.code} {e.read().decode(errors='replace')}")
+        except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+            raise SyncError(f"{self.url}: {e}")
+
+    def close(self):
+        pass
+
+    def __str__(self):
+        return self.url
+
+
+def target_for(spec):
+    return HttpTarget(spec) if spec.startswith(("http://", "https://")) else FileTarget(spec)
+
+
+def sync(target, batch_size=None, max_batches=None):
+    """
+    Ship the outbox to target until it is empty (or max_batches were sent).
+    A batch the server refuses as too large is retried at half the size.
+    Returns stats: batches, entries, raw/compressed bytes, seconds, pending.
+    Raises SyncError when the target cannot be reached or refuses a batch;
+    everything acknowledged before that stays acknowledged.
+    """
+    batch_size = batch_size or db.SYNC_BATCH_SIZE
+    stats = {"batches": 0, "entries": 0, "raw_bytes": 0, "sent_bytes": 0}
+    start = time.perf_counter()
+    while max_batches is None or stats["batches"] < max_batches:
+        device_id, entries = db.outbox_batch(batch_size)
+        if not entries:
+            break
+        blob = pack_batch(device_id, entries)
+        try:
+            acked = target.send(blob)
+        except TooLarge:
+            if len(entries) <= MIN_BATCH:
+                raise
+            batch_size = max(len(entries) // 2, MIN_BATCH)
+            continue
+        db.outbox_ack(acked)
+        stats["batches"] += 1
+        stats["entries"] += sum(1 for entry in entries if entry[0] <= acked)
+        stats["raw_bytes"] += len(zlib.decompress(blob))
+        stats["sent_bytes"] += len(blob)
+    stats["seconds"] = time.perf_counter() - start
+    stats["pending"] = db.outbox_status()[2]
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", nargs="?", help="central database file, or http(s):// URL of an api.py server")
+    parser.add_argument("--db", default=db.DB_FILE, help="this device's database (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=db.SYNC_BATCH_SIZE)
+    parser.add_argument("--status", action="store_true", help="show the device id and pending entries, then exit")
+    args = parser.parse_args(argv)
+    if not args.target and not args.status:
+        parser.error("a target is required unless --status is given")
+
+    db.DB_FILE = args.db
+    db.initialize()
+    try:
+        device_id, acked, pending = db.outbox_status()
+        if args.status:
+            print(f"device {device_id}: {pending} entries pending, acknowledged up to #{acked}")
+            return 0
+        target = target_for(args.target)
+        try:
+            stats = sync(target, args.batch_size)
+        except SyncError as e:
+            print(f"sync stopped: {e} ({db.outbox_status()[2]} entries still pending; run again to resume)",
+                  file=sys.stderr)
+            return 1
+        finally:
+            target.close()
+    finally:
+        db.close_pool()
+    ratio = stats["raw_bytes"] / stats["sent_bytes"] if stats["sent_bytes"] else 0.0
+    print(f"synced {stats['entries']} entries to {args.target} in {stats['batches']} batches, "
+          f"{stats['seconds']:.2f}s ({stats['sent_bytes']} bytes sent, {ratio:.1f}x compressed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
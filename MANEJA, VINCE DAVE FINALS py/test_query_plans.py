@@ -0,0 +1,68 @@
+# test_query_plans.py
+"""
+Query-plan regression check: every statement in db.planned_queries() must
+use an index (EXPLAIN QUERY PLAN without a full SCAN, unless the statement is
+in db.EXPECTED_SCANS) and must never sort in a temp B-tree.
+
+    python -m pytest test_query_plans.py
+"""
+import pytest
+
+import db
+
+
+@pytest.fixture
+def seeded_db(tmp_path, monkeypatch):
+    """A fresh database with users, dated and geotagged reports, edits and deletes."""
+    db.close_pool()
+    db.invalidate_schema()
+    monkeypatch.setattr(db, "DB_FILE", str(tmp_path / "plans.db"))
+    db.initialize()
+    user_ids = []
+    for name in ("alice", "bob", "carol"):
+        db.register_user(name, "correct horse")
+        user_ids.append(db.login_user(name, "correct horse"))
+    ids = []
+    for i in range(300):
+        ids.append(db.add_report(f"Beach {i % 17}", ("Plastic", "glass", "Net")[i % 3], f"debris pile {i}",
+                                 f"{i % 12 + 1:02d}/{i % 28 + 1:02d}/2025", user_ids[i % 3],
+                                 *((14.0 + i / 300, 120.5) if i % 2 else (None, None))))
+    for report_id in ids[::10]:
+        db.update_report(report_id, "Manila Bay", "Metal", "edited", "06/15/2025")
+    for report_id in ids[1::25]:
+        db.delete_report(report_id)
+    yield db.DB_FILE
+    db.close_pool()
+    db.invalidate_schema()
+
+
+def test_planned_queries_use_indexes(seeded_db):
+    results = db.check_query_plans()
+    failed = {name: details for name, status, details in results if status == "fail"}
+    skipped = {name: details for name, status, details in results if status == "skip"}
+    assert not failed, f"query plan regressions: {failed}"
+    assert not skipped, f"planned queries that no longer apply: {skipped}"
+
+
+def test_expected_scans_are_planned(seeded_db):
+    names = {name for name, _, _ in db.planned_queries(db.get_schema())}
+    assert set(db.EXPECTED_SCANS) <= names
+
+
+def test_missing_index_is_reported(seeded_db):
+    with db.get_connection() as conn:
+        conn.execute("DROP INDEX idx_reports_date_iso")
+        conn.commit()
+    failed = [name for name, status, _ in db.check_query_plans() if status == "fail"]
+    assert "get_reports_between" in failed
+
+
+@pytest.mark.parametrize("plan, problem", [
+    (["SCAN reports"], "full table scan"),
+    (["SEARCH r USING INDEX idx_reports_user_id (user_id=?)", "USE TEMP B-TREE FOR ORDER BY"], "temp sort"),
+])
+def test_plan_problems(plan, problem):
+    assert any(p.startswith(problem) for p in db._plan_problems(plan))
+    if problem == "temp sort":
+        # an expected scan never excuses a sort
+        assert db._plan_problems(plan, scan_ok=True)
@@ -1,5 +1,10 @@
 # utils.py
+import calendar
+import os
+import re
+import time
 from datetime import datetime
+from functools import lru_cache
 
 def validate(location, waste, date):
     """
@@ -20,3 +25,112 @@ def validate(location, waste, date):
             return False
 
     return True
+
+
+# Reason codes returned by validate_batch (None means the row is valid)
+MISSING_LOCATION = "missing_location"
+MISSING_WASTE_TYPE = "missing_waste_type"
+BAD_DATE_FORMAT = "bad_date_format"
+BAD_DATE = "bad_date"
+
+REASON_MESSAGES = {
+    MISSING_LOCATION: "location is required",
+    MISSING_WASTE_TYPE: "waste type is required",
+    BAD_DATE_FORMAT: "date must be MM/DD/YYYY",
+    BAD_DATE: "date does not exist",
+}
+
+# the same fields strptime("%m/%d/%Y") accepts: 1-2 digit month and day, 4 digit year
+_DATE_RE = re.compile(r"(1[0-2]|0[1-9]|[1-9])/(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])/(\d\d\d\d)")
+
+@lru_cache(maxsize=4096)
+def _date_reason(date):
+    """Reason code for a stripped, non-empty date string; cached since imports repeat dates."""
+    match = _DATE_RE.fullmatch(date)
+    if not match:
+        return BAD_DATE_FORMAT
+    month, day, year = int(match[1]), int(match[2]), int(match[3])
+    if year < 1 or day > calendar.monthrange(year, month)[1]:
+        return BAD_DATE
+    return None
+
+@lru_cache(maxsize=4096)
+def iso_date(date):
+    """
+    'YYYY-MM-DD' for a date validate() accepts as MM/DD/YYYY, else None
+    (blank, malformed or impossible dates). Used for the sortable date_iso column.
+    """
+    if date is None:
+        return None
+    date = str(date).strip()
+    if not date or _date_reason(date) is not None:
+        return None
+    month, day, year = _DATE_RE.fullmatch(date).groups()
+    return f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
+
+def _column(values, size):
+    """A plain list from a list, tuple, NumPy array or pandas Series; None repeated when values is None."""
+    if values is None:
+        return [None] * size
+    if hasattr(values, "tolist"):
+        values = values.tolist()
+    return list(values)
+
+def _blank(value):
+    # None, pandas/NumPy NaN (NaN != NaN) and whitespace-only strings count as missing
+    return value is None or value != value or not str(value).strip()
+
+def validate_batch(locations, waste_types, dates=None):
+    """
+    validate() for whole columns at once, for bulk imports.
+    Columns may be lists, tuples, NumPy arrays or pandas Series of equal length;
+    dates may be None when no row has a date. Returns (mask, reasons): mask[i]
+    is True when row i is valid, reasons[i] is None or the first failing reason
+    code (MISSING_LOCATION, MISSING_WASTE_TYPE, BAD_DATE_FORMAT, BAD_DATE).
+    Dates are checked with a precompiled regex plus a calendar lookup, cached
+    per distinct value, instead of strptime per row.
+    """
+    locations = _column(locations, 0)
+    waste_types = _column(waste_types, len(locations))
+    dates = _column(dates, len(locations))
+    if not len(locations) == len(waste_types) == len(dates):
+        raise ValueError("validate_batch columns must have the same length")
+
+    reasons = []
+    for location, waste, date in zip(locations, waste_types, dates):
+        if _blank(location):
+            reasons.append(MISSING_LOCATION)
+        elif _blank(waste):
+            reasons.append(MISSING_WASTE_TYPE)
+        elif _blank(date):
+            reasons.append(None)
+        else:
+            reasons.append(_date_reason(str(date).strip()))
+    mask = [reason is None for reason in reasons]
+    return mask, reasons
+
+def coordinates(latitude, longitude):
+    """
+    (latitude, longitude) as floats, or (None, None) when both are blank.
+    Raises ValueError when only one is given, either is not a number, or they
+    are outside -90..90 / -180..180.
+    """
+    if _blank(latitude) and _blank(longitude):
+        return None, None
+    if _blank(latitude) or _blank(longitude):
+        raise ValueError("latitude and longitude must be given together")
+    latitude, longitude = float(latitude), float(longitude)
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError("latitude must be within -90..90 and longitude within -180..180")
+    return latitude, longitude
+
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def new_uid():
+    """
+    A new globally unique id: a ULID (48-bit millisecond timestamp + 80 random
+    bits, 26 Crockford base32 characters). Ids sort by creation time, so a
+    unique index on them grows at its end like an AUTOINCREMENT key would.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    return "".join(_CROCKFORD[(value >> shift) & 31] for shift in range(125, -1, -5))